@@ -0,0 +1,112 @@
+import argparse
+import re
+import time
+
+from parentnode import ParentNode
+from processing import (
+    BlockType, block_to_block_type, block_to_html_node, code_to_html_node, heading_to_html_node,
+    markdown_to_blocks, text_to_html_nodes, HEADING_RE, UNORDERED_LIST_RE,
+)
+
+# Compares the line-scanning block parser (block_to_html_node) with the
+# previous approach of classifying a block with block_to_block_type and then
+# re-splitting it in the matching *_to_html_node function.  Both use the same
+# inline tokenizer, so the difference is block-level work only.
+# Run with: python3 src/bench_blocks.py --blocks 20000
+
+def legacy_block_to_block_type(block: str) -> BlockType:
+    lines = block.split("\n")
+    if re.match(HEADING_RE, block):
+        return BlockType.HEADING
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return BlockType.CODE
+    if all(line.startswith(">") for line in lines):
+        return BlockType.QUOTE
+    is_unordered_list = True
+    for line in lines:
+        line = line.strip()
+        if line != "" and not re.match(UNORDERED_LIST_RE, line):
+            is_unordered_list = False
+            break
+    if is_unordered_list:
+        return BlockType.UNORDERED_LIST
+    expected_num = 1
+    for line in lines:
+        line = line.strip()
+        if line == "":
+            continue
+        if not line.startswith(f"{expected_num}. "):
+            return BlockType.PARAGRAPH
+        expected_num += 1
+    return BlockType.ORDERED_LIST
+
+def legacy_block_to_html_node(block: str):
+    block_type = legacy_block_to_block_type(block)
+    if block_type == BlockType.HEADING:
+        return heading_to_html_node(block)
+    if block_type == BlockType.CODE:
+        return code_to_html_node(block)
+    lines = block.split("\n")
+    if block_type == BlockType.QUOTE:
+        return ParentNode("blockquote", text_to_html_nodes(" ".join(line.lstrip(">").strip() for line in lines)))
+    if block_type == BlockType.UNORDERED_LIST:
+        return ParentNode("ul", [ParentNode("li", text_to_html_nodes(line[2:])) for line in lines])
+    if block_type == BlockType.ORDERED_LIST:
+        return ParentNode("ol", [ParentNode("li", text_to_html_nodes(line.split(". ", 1)[1])) for line in lines])
+    return ParentNode("p", text_to_html_nodes(" ".join(lines)))
+
+def list_heavy(blocks: int) -> str:
+    out = []
+    for i in range(blocks):
+        if i % 2:
+            out.append("\n".join(f"{n}. ordered item {n}" for n in range(1, 31)))
+        else:
+            out.append("\n".join(f"- unordered item {n}" for n in range(30)))
+    return "\n\n".join(out)
+
+def quote_heavy(blocks: int) -> str:
+    return "\n\n".join("\n".join(f"> quoted line {n} of block {i}" for n in range(20)) for i in range(blocks))
+
+def mixed(blocks: int) -> str:
+    samples = [
+        "A paragraph\nthat spans\nthree lines",
+        "- a\n- b\n- c",
+        "> quote\n> more",
+        "1. one\n2. two\n3. three",
+        "## Heading",
+    ]
+    return "\n\n".join(samples[i % len(samples)] for i in range(blocks))
+
+def best_of(fn, blocks: list[str], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for block in blocks:
+            fn(block)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark block parsing")
+    parser.add_argument("--blocks", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'corpus':<12} {'stage':<9} {'legacy ms':>10} {'scan ms':>10} {'speedup':>8}")
+    for name, make in (("list-heavy", list_heavy), ("quote-heavy", quote_heavy), ("mixed", mixed)):
+        blocks = markdown_to_blocks(make(args.blocks))
+        for block in blocks[:50]:
+            assert legacy_block_to_html_node(block) == block_to_html_node(block)
+            assert legacy_block_to_block_type(block) == block_to_block_type(block)
+        stages = (
+            ("classify", legacy_block_to_block_type, block_to_block_type),
+            ("build", legacy_block_to_html_node, block_to_html_node),
+        )
+        for stage, legacy_fn, scan_fn in stages:
+            legacy = best_of(legacy_fn, blocks, args.repeat)
+            scan = best_of(scan_fn, blocks, args.repeat)
+            print(f"{name:<12} {stage:<9} {legacy * 1000:10.1f} {scan * 1000:10.1f} {legacy / scan:7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from static_files import copy_tree, parallel_copy_tree
+
+# Compares the original copy_tree against parallel_copy_tree on a synthetic
+# static tree.  Run with: python3 src/bench_copy.py --files 5000 --size 65536
+
+def make_tree(root: str, files: int, size: int, per_dir: int = 200):
+    payload = os.urandom(size)
+    for i in range(files):
+        directory = os.path.join(root, f"dir{i // per_dir:04d}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"asset{i:06d}.bin"), "wb") as f:
+            f.write(payload)
+
+def time_copy(copy_fn, src: str, dst: str) -> float:
+    if os.path.exists(dst):
+        shutil.rmtree(dst)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        copy_fn(src, dst)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark static asset copiers")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per file")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="where to create the tree (defaults to a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        src = os.path.join(tmp, "static")
+        dst = os.path.join(tmp, "public")
+        make_tree(src, args.files, args.size)
+        total_mb = args.files * args.size / (1 << 20)
+        print(f"{args.files} files, {total_mb:.1f} MiB")
+
+        candidates = [("copy_tree", copy_tree)]
+        for workers in args.workers:
+            candidates.append((f"parallel_copy_tree[{workers}]", lambda s, d, w=workers: parallel_copy_tree(s, d, w)))
+
+        baseline = None
+        for name, copy_fn in candidates:
+            best = min(time_copy(copy_fn, src, dst) for _ in range(args.repeat))
+            baseline = baseline or best
+            print(f"{name:<26} {best * 1000:9.1f} ms  {total_mb / best:8.1f} MiB/s  {baseline / best:5.2f}x")
+
+if __name__ == "__main__":
+    main()
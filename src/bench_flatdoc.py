@@ -0,0 +1,56 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from corpus import PROFILES, generate_page
+from flatdoc import parse_document
+from processing import markdown_to_html_node
+
+# Compares the HTMLNode tree with the array-backed FlatDocument: the memory
+# each keeps alive per page (measured with tracemalloc, with every page's
+# document held at once as a build holding parsed pages would), and the time
+# to parse and to serialize.  The markdown itself is allocated before
+# measuring, since the flat document references it rather than copying it.
+# Run with: python3 src/bench_flatdoc.py --pages 500
+
+def retained(parse, sources: list[str]) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    documents = [parse(source) for source in sources]
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    del documents
+    return sum(stat.count for stat in stats), sum(stat.size for stat in stats)
+
+def timed(function, items: list) -> tuple[float, list]:
+    start = time.perf_counter()
+    results = [function(item) for item in items]
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flat document against the node tree")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--profile", choices=PROFILES, default="mixed")
+    args = parser.parse_args()
+
+    sources = [generate_page(index, args.profile) for index in range(args.pages)]
+    variants = {"tree": markdown_to_html_node, "flat": parse_document}
+
+    results = {}
+    for name, parse in variants.items():
+        parse_seconds, documents = timed(parse, sources)
+        render_seconds, html = timed(lambda document: document.to_html(), documents)
+        blocks, size = retained(parse, sources)
+        results[name] = (parse_seconds, render_seconds, blocks, size, html)
+    if results["tree"][4] != results["flat"][4]:
+        raise SystemExit("variants rendered different output")
+
+    print(f"{args.pages} {args.profile} pages, {sum(map(len, sources)) / 1024:.0f} KiB of markdown")
+    print(f"{'variant':<8} {'parse ms':>9} {'render ms':>10} {'blocks/page':>12} {'KiB/page':>9}")
+    for name, (parse_seconds, render_seconds, blocks, size, _) in results.items():
+        print(f"{name:<8} {parse_seconds * 1000:9.1f} {render_seconds * 1000:10.1f} {blocks / args.pages:12.1f} {size / 1024 / args.pages:9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import tempfile
+import time
+
+from corpus import WORDS, page_path, write_corpus
+from flatdoc import parse_document
+from linkcheck import PathIndex, check_pages_parallel, page_url, resolve_reference
+from pages import read_file
+
+# Measures the link checker on a synthetic link-heavy site: the validation
+# of each reference against the path index on its own (resolving it and one
+# dict probe), and the whole check (parsing every page for its references,
+# then validating them) on jobs worker processes.  The index holds every
+# page plus one in two of the link targets the corpus uses, so about half
+# the links are broken.  Parsing the pages dominates the full check, so it,
+# not validation alone, is the figure to quote for how long checking a site
+# takes.  The corpus has about 110 references a page, so --pages 9000 checks
+# about 1M end to end.
+# Run with: python3 src/bench_linkcheck.py --pages 9000 --jobs 4
+
+def synthetic_index(pages: int) -> PathIndex:
+    index = PathIndex()
+    for number in range(pages):
+        index.add(page_url(page_path(number, "link-heavy")))
+    for word in WORDS:
+        index.add(f"/images/{word}.png")
+        for number in range(0, 1000, 2):
+            index.add(f"/{word}/{number}")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the link checker")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--references", type=int, default=1_000_000, help="references to validate in the lookup-only measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        write_corpus(root, args.pages, "link-heavy")
+        content = os.path.join(root, "content")
+        pages = [(os.path.join(content, *page_path(number, "link-heavy").split("/")), page_url(page_path(number, "link-heavy"))) for number in range(args.pages)]
+        index = synthetic_index(args.pages)
+
+        references = []
+        for src_path, url in pages:
+            document = parse_document(read_file(src_path))
+            references.extend((document.url(node), url) for node in range(len(document)) if document.url_starts[node] >= 0)
+        workload = (references * (args.references // len(references) + 1))[:args.references]
+
+        start = time.perf_counter()
+        broken = 0
+        for reference, url in workload:
+            target = resolve_reference(reference, url)
+            if target is not None and index.check_target(*target) is not None:
+                broken += 1
+        lookup_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report = check_pages_parallel(pages, index, args.jobs)
+        check_seconds = time.perf_counter() - start
+
+    print(f"{len(index)} indexed paths, {len(references)} references in {args.pages} pages")
+    print(f"validate only: {len(workload)} references in {lookup_seconds:.2f} s ({len(workload) / lookup_seconds / 1e6:.2f} M/s), {broken} broken")
+    print(f"full check:    {report.references} references in {check_seconds:.2f} s ({report.references / check_seconds / 1e6:.2f} M/s) on {args.jobs} jobs, {len(report.broken)} broken")
+    print(f"full check per 1M references: {check_seconds / report.references * 1e6:.1f} s on {args.jobs} jobs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import leafnode
+import parentnode
+import processing
+import textnode
+from processing import markdown_to_html_node, text_to_nodes
+
+# Reports bytes per node and peak RSS for a large synthetic document, with the
+# compact __slots__ node classes ("slots") and with subclasses that bring back
+# a per-instance __dict__ ("dict"), which is how the classes were laid out
+# before.  Each variant runs in its own interpreter so peak RSS isn't shared.
+# Run with: python3 src/bench_memory.py --blocks 20000
+
+SAMPLE_BLOCKS = [
+    "# Heading with **bold** text",
+    "A paragraph with **bold**, _italic_ and `code` spans and a [link](https://example.com/page).\nIt continues on a second line with an ![image](/images/tolkien.png).",
+    "- first item with _emphasis_\n- second item with `code`\n- third item with a [link](/about)",
+    "1. one\n2. two **strong**\n3. three",
+    "> a quoted line\n> with a second _line_",
+    "```\ncode block\n  indented\n```",
+]
+
+def synthetic_markdown(blocks: int) -> str:
+    return "\n\n".join(SAMPLE_BLOCKS[i % len(SAMPLE_BLOCKS)] for i in range(blocks))
+
+def use_dict_nodes():
+    class DictLeafNode(leafnode.LeafNode):
+        pass
+
+    class DictParentNode(parentnode.ParentNode):
+        pass
+
+    class DictTextNode(textnode.TextNode):
+        pass
+
+    textnode.LeafNode = DictLeafNode
+    processing.ParentNode = DictParentNode
+    processing.TextNode = DictTextNode
+
+def count_nodes(root) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+def instance_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def measure(variant: str, blocks: int) -> dict:
+    if variant == "dict":
+        use_dict_nodes()
+    markdown = synthetic_markdown(blocks)
+    paragraph = SAMPLE_BLOCKS[1].replace("\n", " ")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    root = markdown_to_html_node(markdown)
+    elapsed = time.perf_counter() - start
+    tree_bytes, _ = tracemalloc.get_traced_memory()
+    text_nodes = [node for _ in range(blocks) for node in text_to_nodes(paragraph)]
+    all_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    html_nodes = count_nodes(root)
+    return {
+        "variant": variant,
+        "html_nodes": html_nodes,
+        "html_bytes_per_node": tree_bytes / html_nodes,
+        "html_instance_bytes": instance_size(root.children[1].children[0]),
+        "text_nodes": len(text_nodes),
+        "text_bytes_per_node": (all_bytes - tree_bytes) / len(text_nodes),
+        "text_instance_bytes": instance_size(text_nodes[0]),
+        "build_seconds": elapsed,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark node memory use")
+    parser.add_argument("--blocks", type=int, default=20000)
+    parser.add_argument("--variant", choices=["slots", "dict"], help="measure one variant in this process and print JSON")
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.blocks)))
+        return
+
+    results = []
+    for variant in ("dict", "slots"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant, "--blocks", str(args.blocks)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+
+    print(f"{args.blocks} blocks, {results[0]['html_nodes']} HTML nodes, {results[0]['text_nodes']} text nodes")
+    print(f"{'variant':<8} {'html B/node':>12} {'html inst B':>12} {'text B/node':>12} {'text inst B':>12} {'peak RSS MiB':>13} {'build s':>8}")
+    for r in results:
+        print(
+            f"{r['variant']:<8} {r['html_bytes_per_node']:12.1f} {r['html_instance_bytes']:12d} "
+            f"{r['text_bytes_per_node']:12.1f} {r['text_instance_bytes']:12d} "
+            f"{r['peak_rss_kb'] / 1024:13.1f} {r['build_seconds']:8.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
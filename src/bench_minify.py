@@ -0,0 +1,44 @@
+import argparse
+import gzip
+import time
+
+from corpus import PROFILES, generate_page
+from processing import markdown_to_html_node
+
+# Compares plain and minified serialization of the same trees: output size
+# (raw and gzipped, since that is what goes over the wire) and throughput.
+# Minification happens inside the serializer, so the minified column is
+# the whole cost, with no second pass over the finished HTML.
+# Run with: python3 src/bench_minify.py --pages 5000
+
+def best_of(fn, trees: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tree in trees:
+            fn(tree)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark minified HTML serialization")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'corpus':<11} {'mode':<7} {'bytes':>11} {'gzip bytes':>11} {'ms':>9} {'MB/s':>7}")
+    for profile in PROFILES:
+        trees = [markdown_to_html_node(generate_page(i, profile, args.blocks, args.seed)) for i in range(args.pages)]
+        sizes = {}
+        for mode, minify in (("plain", False), ("minify", True)):
+            html = "".join(tree.to_html(minify) for tree in trees).encode("utf-8")
+            seconds = best_of(lambda tree: tree.to_html(minify), trees, args.repeat)
+            sizes[mode] = len(html)
+            print(f"{profile:<11} {mode:<7} {len(html):>11} {len(gzip.compress(html, 6)):>11} {seconds * 1000:>9.1f} {len(html) / seconds / 1e6:>7.1f}")
+        print(f"{profile:<11} saved {1 - sizes['minify'] / sizes['plain']:.1%}")
+
+if __name__ == "__main__":
+    main()
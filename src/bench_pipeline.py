@@ -0,0 +1,86 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+import pages
+import pipeline
+from corpus import DEFAULT_TEMPLATE, page_path, write_corpus
+from pages import output_path, render_pages, render_pages_pipelined
+from static_files import walk_files
+
+# Compares rendering pages with the synchronous read -> render -> write loop
+# (render_pages) and with the asyncio pipeline that overlaps reads and
+# writes with rendering (render_pages_pipelined), on a cold page cache: the
+# sources are evicted before every run, with posix_fadvise(DONTNEED) or,
+# with --drop-caches (root only), by dropping the whole page cache.
+# --read-latency adds a fixed delay to every read in both variants, to
+# stand in for network or cloud block storage where a cold read costs
+# milliseconds.  Both variants must produce byte-identical output.
+# Run with: python3 src/bench_pipeline.py --pages 2000 --read-latency 2
+
+def evict(paths: list[str], drop_caches: bool):
+    os.sync()
+    if drop_caches:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+def with_latency(read, seconds: float):
+    def slow_read(path: str) -> str:
+        time.sleep(seconds)
+        return read(path)
+    return slow_read
+
+def tree_digest(root: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for rel_path, path, _ in sorted(walk_files(root)):
+        with open(path, "rb") as f:
+            digest.update(rel_path.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio page pipeline against the synchronous path")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--profile", default="mixed")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--read-latency", type=float, default=0.0, metavar="MS", help="extra milliseconds per source read")
+    parser.add_argument("--drop-caches", action="store_true", help="drop the whole page cache before each run (needs root)")
+    args = parser.parse_args()
+
+    if args.read_latency:
+        pages.read_file = with_latency(pages.read_file, args.read_latency / 1000)
+        pipeline.read_text = with_latency(pipeline.read_text, args.read_latency / 1000)
+
+    with tempfile.TemporaryDirectory() as root:
+        write_corpus(root, args.pages, args.profile)
+        rel_paths = [page_path(index, args.profile) for index in range(args.pages)]
+        sources = [os.path.join(root, "content", *rel_path.split("/")) for rel_path in rel_paths]
+        variants = {"sync": render_pages, "pipeline": render_pages_pipelined}
+        times = {name: [] for name in variants}
+        digests = {}
+        for _ in range(args.runs):
+            for name, render in variants.items():
+                dest_dir = os.path.join(root, f"public-{name}")
+                jobs = [(src_path, output_path(rel_path, dest_dir)) for rel_path, src_path in zip(rel_paths, sources)]
+                evict(sources, args.drop_caches)
+                start = time.perf_counter()
+                render(DEFAULT_TEMPLATE, jobs)
+                times[name].append(time.perf_counter() - start)
+                digests[name] = tree_digest(dest_dir)
+        if digests["sync"] != digests["pipeline"]:
+            raise SystemExit("variants wrote different output")
+
+    print(f"{args.pages} {args.profile} pages, read latency {args.read_latency} ms, {pipeline.IO_WORKERS} I/O threads, queue {pipeline.QUEUE_SIZE}")
+    for name, runs in times.items():
+        print(f"{name:<9} best {min(runs) * 1000:8.1f} ms  mean {sum(runs) / len(runs) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
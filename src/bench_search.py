@@ -0,0 +1,75 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import search
+from corpus import DEFAULT_TEMPLATE, page_path, write_corpus
+from manifest import file_digest
+from pages import output_path, render_pages
+
+# Measures a full build of the search index (update_index over every page of
+# a synthetic site) at several site sizes: its time, from the terms the
+# renders left behind, and its peak traced memory, rebuilding from the
+# sources, with postings spilled to disk every SPILL_POSITIONS positions and
+# with spilling off (everything held until the shards are written, as
+# before spilling).  With spilling the peak is the spill buffer plus the
+# largest shard plus the manifest, so it should grow with the largest shard
+# rather than with the whole index.
+# Run with: python3 src/bench_search.py --pages 500 1000 2000 4000
+
+def measure(pages: int, profile: str, spill_positions: int) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        write_corpus(root, pages, profile)
+        public = os.path.join(root, "public")
+        terms_dir = os.path.join(root, "terms")
+        manifest_path = os.path.join(root, "search.json")
+        jobs = []
+        for index in range(pages):
+            rel_path = page_path(index, profile)
+            jobs.append((os.path.join(root, "content", *rel_path.split("/")), output_path(rel_path, public)))
+        search.set_terms_dir(terms_dir)
+        render_pages(DEFAULT_TEMPLATE, jobs)
+        search.set_terms_dir(None)
+        site = [(src_path, dest_path, file_digest(src_path)) for src_path, dest_path in jobs]
+
+        start = time.perf_counter()
+        search.update_index(site, public, {dest_path for _, dest_path in jobs}, manifest_path, terms_dir)
+        seconds = time.perf_counter() - start
+
+        search_dir = os.path.join(public, search.SEARCH_DIR_NAME)
+        sizes = [os.path.getsize(os.path.join(search_dir, name)) for name in os.listdir(search_dir)]
+        results = {
+            "source": sum(os.path.getsize(src_path) for src_path, _ in jobs),
+            "index": sum(sizes),
+            "largest": max(sizes),
+            "seconds": seconds,
+        }
+        for name, limit in (("spill", spill_positions), ("no spill", sys.maxsize)):
+            shutil.rmtree(search_dir)
+            os.remove(manifest_path)
+            search.SPILL_POSITIONS = limit
+            tracemalloc.start()
+            search.update_index(site, public, set(), manifest_path, terms_dir)
+            results[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        search.SPILL_POSITIONS = spill_positions
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building the search index")
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--profile", default="mixed")
+    parser.add_argument("--spill-positions", type=int, default=search.SPILL_POSITIONS)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'source':>9} {'index':>9} {'largest':>9} {'time':>7} {'peak':>9} {'no spill':>9}")
+    for pages in args.pages:
+        r = measure(pages, args.profile, args.spill_positions)
+        print(f"{pages:>6} {r['source'] / 1e6:>7.1f}MB {r['index'] / 1e6:>7.1f}MB {r['largest'] / 1e6:>7.2f}MB {r['seconds']:>6.1f}s {r['spill'] / 1e6:>7.1f}MB {r['no spill'] / 1e6:>7.1f}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import htmlnode
+import leafnode
+import parentnode
+import textnode
+from corpus import PROFILES, generate_page
+from processing import markdown_to_blocks, text_to_nodes
+
+# Measures what converting and serializing inline spans costs with shared
+# props and cached tag strings ("shared") and with a fresh props dict per
+# link/image and tags formatted on every call, as before ("fresh").  Memory
+# is measured with tracemalloc: the blocks and bytes allocated per span by
+# to_html_node, and by to_html with the output kept, on a second pass over
+# the spans (a long build renders the same links on many pages).  Each
+# variant runs in its own interpreter.
+# Run with: python3 src/bench_spans.py --pages 500
+
+def use_fresh_props():
+    textnode.link_props = lambda url: {"href": textnode.rewrite_url(url)}
+    textnode.image_props = textnode.build_image_props
+    htmlnode.start_tag = lambda tag: f"<{tag}>"
+    leafnode.end_tag = parentnode.end_tag = lambda tag: f"</{tag}>"
+
+def traced() -> tuple[int, int]:
+    snapshot = tracemalloc.take_snapshot()
+    stats = snapshot.statistics("filename")
+    return sum(stat.count for stat in stats), sum(stat.size for stat in stats)
+
+def measure(variant: str, pages: int, profile: str) -> dict:
+    if variant == "fresh":
+        use_fresh_props()
+    spans = []
+    for index in range(pages):
+        for block in markdown_to_blocks(generate_page(index, profile)):
+            if not block.startswith(("#", "```")):
+                spans.extend(text_to_nodes(" ".join(block.split("\n"))))
+
+    # Timed without tracemalloc, which slows allocation down, on a first
+    # pass that also fills the caches the way earlier pages of a build do.
+    start = time.perf_counter()
+    nodes = [span.to_html_node() for span in spans]
+    convert_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    html = [node.to_html() for node in nodes]
+    render_seconds = time.perf_counter() - start
+    del nodes, html
+
+    tracemalloc.start()
+    nodes = [span.to_html_node() for span in spans]
+    node_blocks, node_bytes = traced()
+    html = [node.to_html() for node in nodes]
+    html_blocks, html_bytes = traced()
+    tracemalloc.stop()
+
+    return {
+        "variant": variant,
+        "spans": len(spans),
+        "node_blocks_per_span": node_blocks / len(spans),
+        "node_bytes_per_span": node_bytes / len(spans),
+        "html_blocks_per_span": (html_blocks - node_blocks) / len(spans),
+        "html_bytes_per_span": (html_bytes - node_bytes) / len(spans),
+        "convert_us_per_span": convert_seconds * 1e6 / len(spans),
+        "render_us_per_span": render_seconds * 1e6 / len(spans),
+        "output_chars": sum(map(len, html)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark allocations per inline span")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--profile", choices=PROFILES, default="link-heavy")
+    parser.add_argument("--variant", choices=["fresh", "shared"], help="measure one variant in this process and print JSON")
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.variant, args.pages, args.profile)))
+        return
+
+    results = []
+    for variant in ("fresh", "shared"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant, "--pages", str(args.pages), "--profile", args.profile],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+    if results[0]["output_chars"] != results[1]["output_chars"]:
+        sys.exit("variants rendered different output")
+
+    print(f"{args.pages} {args.profile} pages, {results[0]['spans']} spans")
+    print(f"{'variant':<8} {'node blk/span':>14} {'node B/span':>12} {'html blk/span':>14} {'html B/span':>12} {'convert us':>11} {'render us':>10}")
+    for r in results:
+        print(
+            f"{r['variant']:<8} {r['node_blocks_per_span']:14.2f} {r['node_bytes_per_span']:12.1f} "
+            f"{r['html_blocks_per_span']:14.2f} {r['html_bytes_per_span']:12.1f} "
+            f"{r['convert_us_per_span']:11.2f} {r['render_us_per_span']:10.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
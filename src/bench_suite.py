@@ -0,0 +1,168 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from corpus import PROFILES, generate_page, write_corpus
+from processing import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node, scan_block, text_to_nodes
+from static_files import copy_tree
+
+# Times the core pipeline on a synthetic corpus (see corpus.py) and writes
+# the results as JSON.  Given a baseline from an earlier run on the same
+# corpus, it compares every benchmark and exits with status 1 if any got
+# slower than the threshold allows, so it can gate CI.
+#
+#   python3 src/bench_suite.py --pages 2000 --output baseline.json
+#   ... change things ...
+#   python3 src/bench_suite.py --pages 2000 --baseline baseline.json
+#
+# Each benchmark reports the best of --repeat runs, which is the figure least
+# disturbed by other load on the machine.
+DEFAULT_THRESHOLD = 0.10
+
+def best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmarks(pages: int, profile: str, blocks: int, assets: int, repeat: int, seed: int = 0, tmp_dir: str = None) -> dict:
+    documents = [generate_page(i, profile, blocks, seed) for i in range(pages)]
+    all_blocks = [block for document in documents for block in markdown_to_blocks(document)]
+    inline_texts = []
+    for block in all_blocks:
+        block_type, lines, quote_items = scan_block(block)
+        if block_type == BlockType.PARAGRAPH:
+            inline_texts.append(" ".join(lines))
+        elif block_type == BlockType.QUOTE:
+            inline_texts.append(" ".join(quote_items))
+        elif block_type in (BlockType.ORDERED_LIST, BlockType.UNORDERED_LIST):
+            inline_texts.extend(line.split(" ", 1)[1] for line in lines)
+    trees = [markdown_to_html_node(document) for document in documents]
+
+    def run_text_to_nodes():
+        for text in inline_texts:
+            text_to_nodes(text)
+
+    def run_markdown_to_blocks():
+        for document in documents:
+            markdown_to_blocks(document)
+
+    def run_block_to_block_type():
+        for block in all_blocks:
+            block_to_block_type(block)
+
+    def run_markdown_to_html_node():
+        for document in documents:
+            markdown_to_html_node(document)
+
+    def run_to_html():
+        for tree in trees:
+            tree.to_html()
+
+    benchmarks = [
+        ("text_to_nodes", run_text_to_nodes, len(inline_texts)),
+        ("markdown_to_blocks", run_markdown_to_blocks, len(documents)),
+        ("block_to_block_type", run_block_to_block_type, len(all_blocks)),
+        ("markdown_to_html_node", run_markdown_to_html_node, len(documents)),
+        ("ParentNode.to_html", run_to_html, len(trees)),
+    ]
+    results = {}
+    for name, fn, items in benchmarks:
+        seconds = best_of(fn, repeat)
+        results[name] = {"seconds": seconds, "items": items, "us_per_item": seconds * 1e6 / max(items, 1)}
+
+    if assets:
+        with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+            write_corpus(tmp, 0, profile, assets=assets, seed=seed)
+            src = os.path.join(tmp, "static")
+            dst = os.path.join(tmp, "public")
+
+            def run_copy_tree():
+                if os.path.exists(dst):
+                    shutil.rmtree(dst)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    copy_tree(src, dst)
+
+            seconds = best_of(run_copy_tree, repeat)
+            results["copy_tree"] = {"seconds": seconds, "items": assets + 1, "us_per_item": seconds * 1e6 / (assets + 1)}
+    return results
+
+# Returns (name, baseline seconds, current seconds, ratio, regressed) for
+# every benchmark present in both runs.
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[tuple[str, float, float, float, bool]]:
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        rows.append((name, base["seconds"], result["seconds"], ratio, ratio > 1 + threshold))
+    return rows
+
+def corpus_key(meta: dict) -> tuple:
+    return (meta["pages"], meta["profile"], meta["blocks"], meta["assets"], meta["seed"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the build pipeline and check for regressions")
+    parser.add_argument("--pages", type=int, default=1000, help="synthetic pages, 1 to 100000")
+    parser.add_argument("--profile", choices=PROFILES, default="mixed")
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--assets", type=int, default=1000, help="static files for the copy_tree benchmark (0 skips it)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results from an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown before failing (default: %(default)s, i.e. 10%%)")
+    parser.add_argument("--dir", default=None, help="where to create the asset tree (defaults to a temp dir)")
+    args = parser.parse_args()
+    if not 1 <= args.pages <= 100_000:
+        parser.error("--pages must be between 1 and 100000")
+
+    meta = {
+        "pages": args.pages,
+        "profile": args.profile,
+        "blocks": args.blocks,
+        "assets": args.assets,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if corpus_key(baseline["meta"]) != corpus_key(meta):
+            parser.error(f"baseline was measured on a different corpus: {baseline['meta']}")
+
+    current = {"meta": meta, "results": run_benchmarks(args.pages, args.profile, args.blocks, args.assets, args.repeat, args.seed, args.dir)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if baseline is None:
+        print(f"{'benchmark':<24} {'items':>9} {'ms':>10} {'us/item':>10}")
+        for name, result in current["results"].items():
+            print(f"{name:<24} {result['items']:>9} {result['seconds'] * 1000:>10.1f} {result['us_per_item']:>10.2f}")
+        return
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<24} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for name, base, now, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<24} {base * 1000:>10.1f} {now * 1000:>10.1f} {(ratio - 1) * 100:>+7.1f}%{flag}")
+    if any(row[4] for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
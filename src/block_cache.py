@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_BLOCK_CACHE_SIZE = 4096
+
+# Memoizes rendered blocks by a hash of their markdown, so a block repeated
+# across many pages (a license notice, a shared list) is parsed once.  The
+# cache holds at most maxsize nodes and evicts the least recently used one
+# when full.  Cached nodes are shared by every page that contains the block,
+# so callers must not modify them.
+class BlockCache:
+    def __init__(self, maxsize: int = DEFAULT_BLOCK_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("BlockCache maxsize must be positive")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self) -> str:
+        return f"BlockCache({len(self.entries)}/{self.maxsize}, hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
+
+    @staticmethod
+    def key(block: str) -> bytes:
+        return hashlib.blake2b(block.encode("utf-8"), digest_size=16).digest()
+
+    def get_or_render(self, block: str, render):
+        key = self.key(block)
+        with self.lock:
+            node = self.entries.get(key)
+            if node is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return node
+            self.misses += 1
+
+        node = render(block)
+
+        with self.lock:
+            self.entries[key] = node
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return node
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
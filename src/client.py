@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Thin client for daemon.py: forwards a build to the warm daemon and relays
+# its output and exit status, importing nothing beyond the standard library
+# so it starts as fast as the interpreter can.  When no daemon is running it
+# falls back to running main.py itself, so scripts can always call it.
+#
+# Run with: python3 src/client.py [--root DIR] [--socket PATH] -- [main.py args]
+DEFAULT_SOCKET_PATH = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"site-generator-{os.getuid()}.sock")
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+def request_build(socket_path: str, root: str, argv: list[str], stdout=None, stderr=None) -> int:
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    streams = {"stdout": stdout, "stderr": stderr}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        request = {"root": os.path.abspath(root), "args": argv, "tty": stderr.isatty()}
+        conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with conn.makefile("rb") as replies:
+            for line in replies:
+                message = json.loads(line)
+                if "exit" in message:
+                    return message["exit"]
+                stream = streams[message["stream"]]
+                stream.write(message["data"])
+                stream.flush()
+    stderr.write("client: daemon closed the connection before the build finished\n")
+    return 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a build on the warm build daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="daemon socket (default: %(default)s)")
+    parser.add_argument("--root", default=".", help="site directory containing static/ and content/ (default: current directory)")
+    parser.add_argument("--no-fallback", action="store_true", help="fail instead of building in-process when no daemon is running")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments for main.py, after --")
+    args = parser.parse_args()
+    argv = args.args[1:] if args.args[:1] == ["--"] else args.args
+
+    try:
+        sys.exit(request_build(args.socket, args.root, argv))
+    except (FileNotFoundError, ConnectionRefusedError):
+        if args.no_fallback:
+            parser.exit(3, f"client: no build daemon listening on {args.socket}\n")
+    os.chdir(args.root)
+    os.execv(sys.executable, [sys.executable, MAIN_PATH, *argv])
+
+if __name__ == "__main__":
+    main()
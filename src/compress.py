@@ -0,0 +1,144 @@
+import gzip
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+from manifest import Manifest
+from static_files import SyncReport, remove_if_exists, stat_or_none, walk_files
+
+# compression.zstd is in the standard library from Python 3.14; before that
+# only .gz siblings are written.
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+COMPRESS_MANIFEST_PATH = os.path.join(".cache", "compress-manifest.json")
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".map", ".ico", ".webmanifest")
+# Below this a compressed response saves less than the headers cost.
+MIN_COMPRESS_SIZE = 256
+# A sibling is only kept if it is at least this much smaller than the file.
+MIN_SAVING = 0.10
+# Files larger than this are first probed with a fast compression of their
+# head, and skipped without compressing the rest if even that falls short.
+PROBE_SIZE = 1 << 16
+GZIP_LEVEL = 9
+ZSTD_LEVEL = 19
+
+def gzip_compress(data: bytes) -> bytes:
+    # mtime=0 keeps the output byte-identical from build to build.
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+def zstd_compress(data: bytes) -> bytes:
+    return zstd.compress(data, level=ZSTD_LEVEL)
+
+ENCODINGS = {".gz": gzip_compress}
+if zstd is not None:
+    ENCODINGS[".zst"] = zstd_compress
+
+def compressible(rel_path: str, size: int) -> bool:
+    return size >= MIN_COMPRESS_SIZE and rel_path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+def saves_enough(size: int, compressed_size: int, min_saving: float) -> bool:
+    return size - compressed_size >= size * min_saving
+
+# Writes path + suffix for each encoding in suffixes that saves at least
+# min_saving, and removes the sibling for each that doesn't.  Returns
+# {suffix: compressed size} for the siblings written.  Runs in the worker
+# processes, so it takes and returns only plain data.
+def compress_file(path: str, suffixes: list[str], min_saving: float = MIN_SAVING) -> dict[str, int]:
+    with open(path, "rb") as f:
+        data = f.read()
+    written = {}
+    if len(data) > PROBE_SIZE:
+        head = data[:PROBE_SIZE]
+        if not saves_enough(len(head), len(zlib.compress(head, 1)), min_saving):
+            suffixes = []
+    for suffix in ENCODINGS:
+        sibling = path + suffix
+        compressed = ENCODINGS[suffix](data) if suffix in suffixes else None
+        if compressed is None or not saves_enough(len(data), len(compressed), min_saving):
+            remove_if_exists(sibling)
+            continue
+        # A new file replaces the old sibling, which may be open in a server.
+        tmp_path = sibling + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, sibling)
+        written[suffix] = len(compressed)
+    return written
+
+def _compress_paths(paths: list[str], suffixes: list[str], min_saving: float, workers: int) -> list[dict[str, int]]:
+    if workers <= 1 or len(paths) <= 1:
+        return [compress_file(path, suffixes, min_saving) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        return list(executor.map(compress_file, paths, [suffixes] * len(paths), [min_saving] * len(paths), chunksize=chunksize))
+
+# Writes precompressed .gz (and, where available, .zst) siblings next to
+# every compressible file below root, so a server can send them as they are
+# instead of compressing each response.
+#
+# The manifest remembers each file's hash and which siblings it got, so a
+# file whose content is unchanged is never compressed again even when the
+# build rewrote it; compression runs on a process pool for the rest.  The
+# siblings of files that were deleted or stopped qualifying are removed.
+# In the report, a file counts as added the first time it is compressed.
+def precompress_tree(root: str, manifest_path: str = COMPRESS_MANIFEST_PATH, workers: int = None, min_saving: float = MIN_SAVING) -> SyncReport:
+    workers = workers or os.cpu_count() or 1
+    suffixes = list(ENCODINGS)
+    manifest = Manifest(manifest_path)
+    report = SyncReport()
+    seen = set()
+    dirty = []
+    for rel_path, path, stat in walk_files(root):
+        if not compressible(rel_path, stat.st_size):
+            continue
+        seen.add(rel_path)
+        entry = manifest.get(rel_path)
+        digest = manifest.digest(rel_path, path, stat)
+        if (
+            entry is not None
+            and entry["hash"] == digest
+            and entry["encodings"] == suffixes
+            and entry["min_saving"] == min_saving
+            and all(_sibling_size(path + suffix) == size for suffix, size in entry["outputs"].items())
+        ):
+            report.unchanged += 1
+            if entry["mtime_ns"] != stat.st_mtime_ns:
+                manifest.set(rel_path, dict(entry, mtime_ns=stat.st_mtime_ns))
+            continue
+        (report.added if entry is None else report.updated).append(rel_path)
+        dirty.append((rel_path, path, stat, digest))
+
+    results = _compress_paths([path for _, path, _, _ in dirty], suffixes, min_saving, workers)
+    for (rel_path, _, stat, digest), outputs in zip(dirty, results):
+        manifest.set(rel_path, {
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "encodings": suffixes,
+            "min_saving": min_saving,
+            "outputs": outputs,
+        })
+    instrument.count("files precompressed", len(dirty))
+
+    for rel_path in manifest.paths():
+        if rel_path in seen:
+            continue
+        path = os.path.join(root, *rel_path.split("/"))
+        for suffix in manifest.get(rel_path)["outputs"]:
+            remove_if_exists(path + suffix)
+        manifest.remove(rel_path)
+        report.removed.append(rel_path)
+
+    manifest.save()
+    report.added.sort()
+    report.updated.sort()
+    report.removed.sort()
+    return report
+
+def _sibling_size(path: str) -> int:
+    stat = stat_or_none(path)
+    return stat and stat.st_size
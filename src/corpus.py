@@ -0,0 +1,141 @@
+import argparse
+import os
+import random
+
+# Generates deterministic synthetic sites for benchmarks: the same seed,
+# profile and size always produce byte-identical markdown, so timings from
+# different commits are measured on the same input.
+#
+# Profiles:
+#   mixed       every block type in roughly the proportions of real pages
+#   link-heavy  paragraphs dense with links, images and inline markup
+#   list-heavy  long ordered and unordered lists
+#   nested      pages and assets in deeply nested directories
+PROFILES = ("mixed", "link-heavy", "list-heavy", "nested")
+DEFAULT_TEMPLATE = '<!DOCTYPE html>\n<html>\n<head>\n<title>{{ Title }}</title>\n<link href="/index.css" rel="stylesheet" />\n</head>\n<body>\n<article>{{ Content }}</article>\n</body>\n</html>\n'
+NESTED_DEPTH = 12
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog hobbit ring shire wizard mountain river "
+    "forest road journey elf dwarf king tower gate song fire shadow light stone door"
+).split()
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def _inline(rng: random.Random, count: int, density: float) -> str:
+    parts = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll >= density:
+            parts.append(_words(rng, rng.randint(1, 4)))
+            continue
+        kind = rng.randrange(5)
+        text = _words(rng, rng.randint(1, 3))
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"_{text}_")
+        elif kind == 2:
+            parts.append(f"`{text}`")
+        elif kind == 3:
+            parts.append(f"[{text}](/{rng.choice(WORDS)}/{rng.randrange(1000)})")
+        else:
+            parts.append(f"![{text}](/images/{rng.choice(WORDS)}.png)")
+    return " ".join(parts)
+
+def _paragraph(rng: random.Random, density: float) -> str:
+    return "\n".join(_inline(rng, rng.randint(4, 10), density) for _ in range(rng.randint(1, 4)))
+
+def _unordered_list(rng: random.Random, items: int) -> str:
+    return "\n".join(f"{rng.choice('-*+')} {_inline(rng, rng.randint(2, 5), 0.3)}" for _ in range(items))
+
+def _ordered_list(rng: random.Random, items: int) -> str:
+    return "\n".join(f"{n}. {_inline(rng, rng.randint(2, 5), 0.3)}" for n in range(1, items + 1))
+
+def _block(rng: random.Random, profile: str) -> str:
+    if profile == "link-heavy":
+        return _paragraph(rng, 0.8)
+    if profile == "list-heavy":
+        items = rng.randint(10, 40)
+        return _ordered_list(rng, items) if rng.random() < 0.5 else _unordered_list(rng, items)
+    roll = rng.random()
+    if roll < 0.45:
+        return _paragraph(rng, 0.3)
+    if roll < 0.6:
+        return f"{'#' * rng.randint(2, 6)} {_inline(rng, 2, 0.2)}"
+    if roll < 0.72:
+        return _unordered_list(rng, rng.randint(2, 8))
+    if roll < 0.84:
+        return _ordered_list(rng, rng.randint(2, 8))
+    if roll < 0.92:
+        return "\n".join(f"> {_inline(rng, rng.randint(2, 6), 0.3)}" for _ in range(rng.randint(1, 4)))
+    return "```\n" + "\n".join(f"    {_words(rng, rng.randint(2, 8))}" for _ in range(rng.randint(1, 6))) + "\n```"
+
+def generate_page(index: int, profile: str = "mixed", blocks: int = 20, seed: int = 0) -> str:
+    if profile not in PROFILES:
+        raise ValueError(f"unknown corpus profile: {profile}")
+    rng = random.Random(f"{seed}:{profile}:{index}")
+    out = [f"# Page {index}: {_words(rng, 3)}"]
+    out.extend(_block(rng, profile) for _ in range(blocks))
+    return "\n\n".join(out) + "\n"
+
+def page_path(index: int, profile: str = "mixed") -> str:
+    if profile == "nested":
+        parts = [f"level{depth}-{index % (depth + 2)}" for depth in range(NESTED_DEPTH)]
+        return "/".join(parts + [f"page{index:06d}.md"])
+    return f"section{index // 1000:03d}/page{index:06d}.md"
+
+def asset_path(index: int, profile: str = "mixed") -> str:
+    if profile == "nested":
+        parts = [f"level{depth}-{index % (depth + 2)}" for depth in range(NESTED_DEPTH)]
+        return "/".join(parts + [f"asset{index:06d}.bin"])
+    return f"assets{index // 500:03d}/asset{index:06d}.bin"
+
+# Writes a complete site below root: content/ with the pages, static/ with
+# index.css and the assets, and template.html.
+def write_corpus(root: str, pages: int, profile: str = "mixed", blocks: int = 20, assets: int = 0, asset_size: int = 4096, seed: int = 0):
+    content = os.path.join(root, "content")
+    static = os.path.join(root, "static")
+    os.makedirs(content, exist_ok=True)
+    os.makedirs(static, exist_ok=True)
+    with open(os.path.join(root, "template.html"), "w", encoding="utf-8") as f:
+        f.write(DEFAULT_TEMPLATE)
+    with open(os.path.join(static, "index.css"), "w", encoding="utf-8") as f:
+        f.write("body { font-family: serif; }\n")
+
+    made_dirs = set()
+    for index in range(pages):
+        path = os.path.join(content, *page_path(index, profile).split("/"))
+        directory = os.path.dirname(path)
+        if directory not in made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            made_dirs.add(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_page(index, profile, blocks, seed))
+
+    rng = random.Random(f"{seed}:assets")
+    payload = rng.randbytes(asset_size)
+    for index in range(assets):
+        path = os.path.join(static, *asset_path(index, profile).split("/"))
+        directory = os.path.dirname(path)
+        if directory not in made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            made_dirs.add(directory)
+        with open(path, "wb") as f:
+            f.write(index.to_bytes(8, "little") + payload)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic site for benchmarking")
+    parser.add_argument("root", help="directory to write content/, static/ and template.html into")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--profile", choices=PROFILES, default="mixed")
+    parser.add_argument("--blocks", type=int, default=20, help="blocks per page")
+    parser.add_argument("--assets", type=int, default=0)
+    parser.add_argument("--asset-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_corpus(args.root, args.pages, args.profile, args.blocks, args.assets, args.asset_size, args.seed)
+
+if __name__ == "__main__":
+    main()
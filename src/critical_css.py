@@ -0,0 +1,299 @@
+import os
+import posixpath
+import re
+
+import textnode
+from htmlnode import HTMLNode
+
+CRITICAL_CSS_PLACEHOLDER = "{{ Critical CSS }}"
+
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+STYLESHEET_LINK_PATTERN = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+TEMPLATE_TAG_PATTERN = re.compile(r"<([a-zA-Z][\w-]*)([^>]*)>")
+URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+# Parts of a selector that never make it require anything: attribute
+# selectors, pseudo-classes and pseudo-elements.  Functional pseudo-classes
+# are removed with their arguments first (see _strip_functions), so :not(.x)
+# doesn't make a rule require .x.
+SELECTOR_IGNORED_PATTERN = re.compile(r"\[[^\]]*\]|::?[\w-]+")
+SELECTOR_TOKEN_PATTERN = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*)")
+WHITESPACE_OUTSIDE_STRINGS_PATTERN = re.compile(r"""("[^"]*"|'[^']*')|\s+""")
+
+# A stylesheet broken into rules and indexed by what each selector needs the
+# page to contain: its tag names, classes ("." prefix) and ids ("#"
+# prefix).  Every selector is filed under one of the tokens it needs, so
+# picking the rules for a page looks up the tokens the page has instead of
+# testing every selector; selectors that need nothing (*, ::-webkit-...)
+# always apply.  The check is deliberately loose (combinators, attributes
+# and pseudo-classes are ignored), so a rule that can match is never left
+# out.  Block at-rules other than @media and @supports (@font-face,
+# @keyframes...) are always kept, and so are rules whose selectors it can't
+# read.  Statement at-rules such as @import are left to the full sheet,
+# since inlining them would block rendering on another request.
+class StyleIndex:
+    def __init__(self, stylesheets: list[tuple[str, str]], template: str = ""):
+        self.hrefs = []
+        # (group, selectors, body): group is the enclosing "@media ..."
+        # prelude or None; selectors is None for rules kept whole.
+        self.rules = []
+        self.always = set()
+        self.by_token: dict[str, list[tuple[int, int, frozenset[str]]]] = {}
+        self.template_tokens = template_tokens(template)
+        self.selections: dict[frozenset[str], str] = {}
+        for href, css in stylesheets:
+            self.hrefs.append(href)
+            for group, prelude, body in parse_rules(rewrite_relative_urls(css, href)):
+                self.add_rule(group, prelude, body)
+
+    def add_rule(self, group: str, prelude: str, body: str):
+        rule = len(self.rules)
+        if body is None:
+            return
+        if prelude.startswith("@") or "\\" in prelude:
+            self.rules.append((group, None, f"{prelude}{{{body}}}"))
+            self.always.add((rule, None))
+            return
+        selectors = split_selectors(prelude)
+        self.rules.append((group, selectors, body))
+        for position, selector in enumerate(selectors):
+            required = selector_tokens(selector)
+            if not required:
+                self.always.add((rule, position))
+                continue
+            key = max(required, key=lambda token: (token[0] == "#", token[0] == ".", token))
+            self.by_token.setdefault(key, []).append((rule, position, required))
+
+    # The rules that can apply to a page made of the template and node, with
+    # only their matching selectors, in stylesheet order.  Pages using the
+    # same tags and classes share the result.
+    def critical_css(self, node: HTMLNode) -> str:
+        used = frozenset(node_tokens(node) | self.template_tokens)
+        css = self.selections.get(used)
+        if css is None:
+            css = self.selections[used] = self.select(used)
+        return css
+
+    def select(self, used: frozenset[str]) -> str:
+        matched = set(self.always)
+        for token in used:
+            for rule, position, required in self.by_token.get(token, ()):
+                if required <= used:
+                    matched.add((rule, position))
+        positions: dict[int, list[int]] = {}
+        for rule, position in matched:
+            positions.setdefault(rule, []).append(position)
+
+        out = []
+        open_group = None
+        for rule in sorted(positions):
+            group, selectors, body = self.rules[rule]
+            if group != open_group:
+                if open_group is not None:
+                    out.append("}")
+                if group is not None:
+                    out.append(f"{group}{{")
+                open_group = group
+            if selectors is None:
+                out.append(body)
+            else:
+                chosen = ",".join(selectors[position] for position in sorted(positions[rule]))
+                out.append(f"{chosen}{{{body}}}")
+        if open_group is not None:
+            out.append("}")
+        return "".join(out)
+
+    # Replaces the template's links to the indexed stylesheets with a <style>
+    # placeholder for the page's critical rules, and loads the full sheets
+    # without blocking rendering (rel="preload" swapped to "stylesheet"
+    # once loaded, with a <noscript> fallback).
+    def defer_stylesheets(self, template: str) -> str:
+        placed = False
+
+        def replace(match: re.Match) -> str:
+            nonlocal placed
+            attributes = link_attributes(match.group(0))
+            href = attributes.get("href")
+            if attributes.get("rel", "").lower() != "stylesheet" or href not in self.hrefs:
+                return match.group(0)
+            loader = (
+                f'<link href="{href}" rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+                f'<noscript><link href="{href}" rel="stylesheet"></noscript>'
+            )
+            if placed:
+                return loader
+            placed = True
+            return f"<style>{CRITICAL_CSS_PLACEHOLDER}</style>{loader}"
+
+        return STYLESHEET_LINK_PATTERN.sub(replace, template)
+
+# The index pages are rendered with; None (the default) leaves stylesheet
+# links alone.  Set it with pages built from the same template.
+_style_index = None
+
+def set_style_index(index: StyleIndex):
+    global _style_index
+    _style_index = index
+
+def get_style_index() -> StyleIndex:
+    return _style_index
+
+# Indexes the local stylesheets the template links to, as published in
+# public_dir (so a fingerprinted sheet is read with its rewritten
+# references).  Their hrefs are looked up through the current URL map.
+def build_style_index(template_path: str, public_dir: str) -> StyleIndex:
+    with open(template_path, "r", encoding="utf-8") as f:
+        template = f.read()
+    stylesheets = []
+    for match in STYLESHEET_LINK_PATTERN.finditer(template):
+        attributes = link_attributes(match.group(0))
+        href = attributes.get("href", "")
+        if attributes.get("rel", "").lower() != "stylesheet" or not href.startswith("/") or href.startswith("//"):
+            continue
+        href = textnode.rewrite_url(href)
+        path = os.path.join(public_dir, *textnode.split_url_suffix(href)[0].lstrip("/").split("/"))
+        if not os.path.isfile(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            stylesheets.append((href, f.read()))
+    return StyleIndex(stylesheets, template)
+
+def link_attributes(tag: str) -> dict[str, str]:
+    return {match.group(1).lower(): next(value for value in match.group(2, 3, 4) if value is not None) for match in ATTRIBUTE_PATTERN.finditer(tag)}
+
+# Splits a stylesheet into (group, prelude, body) rules in order.  Rules
+# inside @media and @supports blocks get the block's prelude as their
+# group; other blocks are returned whole, as are statement at-rules such as
+# @import (with a body of None).
+def parse_rules(css: str, group: str = None) -> list[tuple[str, str, str]]:
+    css = COMMENT_PATTERN.sub("", css)
+    rules = []
+    pos = 0
+    while pos < len(css):
+        end = _find_top_level(css, pos, "{;}")
+        prelude = compact(css[pos:end])
+        if end == len(css) or css[end] != "{":
+            # A statement at-rule (@import, @charset...); anything else
+            # here is a stray "}" or junk, which browsers skip too.
+            if prelude.startswith("@"):
+                rules.append((group, prelude, None))
+            pos = end + 1
+            continue
+        close = _matching_brace(css, end)
+        body = css[end + 1:close]
+        keyword = prelude.split(None, 1)[0].lower() if prelude else ""
+        if keyword in ("@media", "@supports") and group is None:
+            rules.extend(parse_rules(body, prelude))
+        elif prelude:
+            # Nested conditional groups are rare and are kept whole.
+            rules.append((group, prelude, compact(body)))
+        pos = close + 1
+    return rules
+
+def _find_top_level(css: str, pos: int, stops: str) -> int:
+    quote = None
+    depth = 0
+    while pos < len(css):
+        char = css[pos]
+        if quote:
+            if char == "\\":
+                pos += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif depth <= 0 and char in stops:
+            return pos
+        pos += 1
+    return len(css)
+
+def _matching_brace(css: str, open_pos: int) -> int:
+    depth = 0
+    pos = open_pos
+    while pos < len(css):
+        pos = _find_top_level(css, pos, "{}")
+        if pos == len(css):
+            return pos
+        depth += 1 if css[pos] == "{" else -1
+        if depth == 0:
+            return pos
+        pos += 1
+    return len(css)
+
+# Collapses whitespace outside quoted strings.
+def compact(css: str) -> str:
+    return WHITESPACE_OUTSIDE_STRINGS_PATTERN.sub(lambda match: match.group(1) or " ", css).strip()
+
+# "h1, h2 > a:is(.x, .y)" -> ["h1", "h2 > a:is(.x, .y)"]
+def split_selectors(prelude: str) -> list[str]:
+    selectors = []
+    pos = 0
+    while pos <= len(prelude):
+        end = _find_top_level(prelude, pos, ",")
+        selector = prelude[pos:end].strip()
+        if selector:
+            selectors.append(selector)
+        pos = end + 1
+    return selectors
+
+def selector_tokens(selector: str) -> frozenset[str]:
+    selector = SELECTOR_IGNORED_PATTERN.sub(" ", _strip_functions(selector))
+    tokens = set()
+    for prefix, name in SELECTOR_TOKEN_PATTERN.findall(selector):
+        tokens.add(prefix + name if prefix else name.lower())
+    return frozenset(tokens)
+
+# Removes :name(...) pseudo-classes, arguments included.
+def _strip_functions(selector: str) -> str:
+    while (start := selector.find("(")) != -1:
+        name_start = selector.rfind(":", 0, start)
+        end = _find_top_level(selector, start + 1, ")")
+        selector = selector[:max(name_start, 0)] + " " + selector[end + 1:]
+    return selector
+
+# Relative url() references in a sheet resolve against the sheet's own URL;
+# inlined into a page they would resolve against the page's, so they are
+# made absolute.
+def rewrite_relative_urls(css: str, href: str) -> str:
+    base_dir = posixpath.dirname(textnode.split_url_suffix(href)[0])
+
+    def replace(match: re.Match) -> str:
+        ref = match.group(2)
+        if ref.startswith(("/", "#", "data:")) or ":" in ref.split("/", 1)[0]:
+            return match.group(0)
+        path, suffix = textnode.split_url_suffix(ref)
+        absolute = posixpath.normpath(posixpath.join(base_dir, path))
+        return match.group(0).replace(ref, absolute + suffix, 1)
+
+    return URL_PATTERN.sub(replace, css)
+
+def template_tokens(template: str) -> frozenset[str]:
+    tokens = set()
+    for match in TEMPLATE_TAG_PATTERN.finditer(template):
+        tokens.add(match.group(1).lower())
+        attributes = link_attributes(match.group(2))
+        tokens.update(f".{name}" for name in attributes.get("class", "").split())
+        if attributes.get("id"):
+            tokens.add(f"#{attributes['id']}")
+    return frozenset(tokens)
+
+def node_tokens(node: HTMLNode) -> set[str]:
+    tokens = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag is not None:
+            tokens.add(node.tag)
+        if node.props:
+            classes = node.props.get("class")
+            if classes:
+                tokens.update(f".{name}" for name in classes.split())
+            if node.props.get("id"):
+                tokens.add(f"#{node.props['id']}")
+        if node.children:
+            stack.extend(node.children)
+    return tokens
@@ -0,0 +1,159 @@
+import argparse
+import contextlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+import main as cli
+import processing
+from block_cache import BlockCache
+from client import DEFAULT_SOCKET_PATH
+
+# A long-running build server.  Every `python3 src/main.py` pays for
+# interpreter startup, imports and a cold block cache before it renders
+# anything; the daemon pays that once, then runs builds sent by client.py
+# over a Unix socket with the modules loaded and the block cache warm.
+#
+# Protocol: the client sends one JSON line, {"root": site directory, "args":
+# main.py arguments, "tty": whether its stderr is a terminal}.  The daemon
+# answers with JSON lines, {"stream": "stdout"|"stderr", "data": text} for
+# build output as it happens, then {"exit": status}.
+#
+# Builds run one at a time: each one changes into its site root, since the
+# build resolves static/, content/ and .cache/ relative to the working
+# directory, and redirects stdout/stderr to the client.
+#
+# Run with: python3 src/daemon.py [--socket PATH] [--log]
+DAEMON_BLOCK_CACHE_SIZE = 1 << 16
+
+# File-like object that forwards whatever the build prints to the client.
+class ClientStream:
+    def __init__(self, send, name: str, tty: bool):
+        self.send = send
+        self.name = name
+        self.tty = tty
+
+    def write(self, data: str) -> int:
+        if data:
+            self.send({"stream": self.name, "data": data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return self.tty
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    def send(self, message: dict):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            root = request["root"]
+            argv = list(request.get("args", []))
+        except (ValueError, KeyError, TypeError):
+            self.send({"stream": "stderr", "data": "daemon: malformed request\n"})
+            self.send({"exit": 2})
+            return
+        try:
+            status = self.server.build(root, argv, self.send, bool(request.get("tty")))
+            self.send({"exit": status})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class BuildDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    # log=True prints a line per build (root, status, time, cache stats) to
+    # the daemon's own stderr.
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, cache_size: int = DAEMON_BLOCK_CACHE_SIZE, log: bool = False):
+        self.socket_path = socket_path
+        self.log = log
+        self.build_lock = threading.Lock()
+        self.block_cache = BlockCache(cache_size)
+        self.builds = 0
+        processing.set_block_cache(self.block_cache)
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, BuildHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.socket_path)
+
+    # Runs main.py's build for argv inside root and returns its exit status.
+    def build(self, root: str, argv: list[str], send, tty: bool = False) -> int:
+        stdout = ClientStream(send, "stdout", tty)
+        stderr = ClientStream(send, "stderr", tty)
+        with self.build_lock:
+            start = time.perf_counter()
+            cwd = os.getcwd()
+            status = 0
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    os.chdir(root)
+                    args = cli.parse_args(argv)
+                    if args.watch or args.serve:
+                        print("daemon: --watch and --serve are not available through the daemon", file=sys.stderr)
+                        status = 2
+                    else:
+                        cli.run_build(args)
+                except SystemExit as e:
+                    status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except (BrokenPipeError, ConnectionResetError):
+                    raise
+                except Exception:
+                    traceback.print_exc()
+                    status = 1
+                finally:
+                    os.chdir(cwd)
+            self.builds += 1
+            if self.log:
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"build #{self.builds} in {root}: exit {status}, {elapsed:.0f} ms, {self.block_cache!r}", file=sys.stderr)
+            return status
+
+# A socket file left behind by a daemon that died is removed; one that a
+# live daemon still answers on is an error.
+def remove_stale_socket(socket_path: str):
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+    raise RuntimeError(f"a build daemon is already listening on {socket_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the site builder warm and run builds sent by client.py")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket to listen on (default: %(default)s)")
+    parser.add_argument("--cache-size", type=int, default=DAEMON_BLOCK_CACHE_SIZE, help="rendered blocks to keep between builds")
+    parser.add_argument("--log", action="store_true", help="print a line per build with its status, time and block cache stats")
+    args = parser.parse_args()
+    try:
+        server = BuildDaemon(args.socket, args.cache_size, args.log)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    print(f"Listening on {args.socket}", file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
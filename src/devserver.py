@@ -0,0 +1,259 @@
+import http.server
+import os
+import sys
+import threading
+import time
+import traceback
+
+from critical_css import build_style_index, set_style_index
+from fingerprint import ASSET_MAP_NAME, FINGERPRINT_MANIFEST_PATH, fingerprint_tree
+from images import IMAGE_SIZES_PATH, image_sizes, image_sources, process_images, write_image_sizes
+from manifest import Manifest
+from pages import PAGES_MANIFEST_PATH, template_dependencies, update_pages
+from processing import set_asset_map, set_image_sizes
+from static_files import LINK_MANIFEST_PATH, OBJECT_STORE_PATH, STATIC_MANIFEST_PATH, SyncReport, sync_paths, walk_files
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = f'<script>new EventSource("{LIVE_RELOAD_PATH}").onmessage = () => location.reload();</script>'
+KEEPALIVE_SECONDS = 15
+
+# A snapshot maps each file below root to its (mtime, size).  Polling
+# snapshots costs one scandir per directory and one stat per file, needs no
+# platform-specific notification API, and catches edits made by any tool.
+def snapshot(root: str) -> dict[str, tuple[int, int]]:
+    if not os.path.isdir(root):
+        return {}
+    return {rel_path: (stat.st_mtime_ns, stat.st_size) for rel_path, _, stat in walk_files(root)}
+
+def diff_snapshots(old: dict[str, tuple[int, int]], new: dict[str, tuple[int, int]]) -> list[str]:
+    changed = [rel_path for rel_path, signature in new.items() if old.get(rel_path) != signature]
+    changed.extend(rel_path for rel_path in old if rel_path not in new)
+    return sorted(changed)
+
+# Watches static/, content/ and the template, and applies each change with
+# the smallest possible rebuild: a touched asset is synced on its own, a
+# touched page is re-rendered on its own, and only a change to the template
+# or one of its stylesheets re-renders every page.  The manifests stay in
+# memory between rebuilds and are written back by save().
+#
+# With fingerprint=True a static change re-runs fingerprint_tree instead
+# (which only hashes what changed), and when that changes the asset map
+# every page is re-rendered, since any of them may link to a renamed file.
+# optimize_images=True likewise re-runs process_images (which only looks at
+# changed images) and re-renders every page when an image's size changes.
+# With a store directory, synced assets are hardlinked from that object
+# store as in PublishMode.LINK.
+class SiteWatcher:
+    def __init__(self, static_dir: str = "static", content_dir: str = "content", template_path: str = "template.html", public_dir: str = "public",
+                 static_manifest_path: str = STATIC_MANIFEST_PATH, pages_manifest_path: str = PAGES_MANIFEST_PATH,
+                 fingerprint: bool = False, fingerprint_manifest_path: str = FINGERPRINT_MANIFEST_PATH, optimize_images: bool = False,
+                 minify: bool = False, critical_css: bool = False, store: str = None):
+        self.static_dir = static_dir
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.public_dir = public_dir
+        self.fingerprint = fingerprint
+        self.fingerprint_manifest_path = fingerprint_manifest_path
+        self.optimize_images = optimize_images
+        self.minify = minify
+        self.critical_css = critical_css
+        self.store = store
+        self.static_manifest = Manifest(static_manifest_path)
+        self.pages_manifest = Manifest(pages_manifest_path)
+        self.static_snapshot = snapshot(static_dir)
+        self.content_snapshot = snapshot(content_dir)
+        self.deps = self.dependencies()
+        self.deps_snapshot = self.deps_signature(self.deps)
+
+    def dependencies(self) -> list[str]:
+        deps = template_dependencies(self.template_path, self.static_dir)
+        if self.fingerprint:
+            deps.append(os.path.join(self.public_dir, ASSET_MAP_NAME))
+        if self.optimize_images:
+            deps.append(IMAGE_SIZES_PATH)
+        return deps
+
+    def deps_signature(self, deps: list[str]) -> list[tuple[int, int]]:
+        signature = []
+        for dep in deps:
+            try:
+                stat = os.stat(dep)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return signature
+
+    # Checks for changes once and rebuilds what they affect.  Returns the
+    # (static, pages) reports, or None if nothing changed.  The snapshots only
+    # move on once the rebuild succeeds, so if it raises (a page that
+    # doesn't parse, say) the next poll sees the same changes and retries;
+    # pages rendered before the failure are in the manifest and are skipped.
+    def poll(self) -> tuple[SyncReport, SyncReport]:
+        static_snapshot = snapshot(self.static_dir)
+        content_snapshot = snapshot(self.content_dir)
+        static_changes = diff_snapshots(self.static_snapshot, static_snapshot)
+        page_changes = diff_snapshots(self.content_snapshot, content_snapshot)
+
+        static_report = SyncReport()
+        if static_changes:
+            sources = None
+            if self.optimize_images:
+                images = process_images(self.static_dir)
+                sizes = image_sizes(images)
+                write_image_sizes(sizes)
+                set_image_sizes(sizes)
+                sources = image_sources(images)
+            if self.fingerprint:
+                static_report, asset_map = fingerprint_tree(self.static_dir, self.public_dir, self.fingerprint_manifest_path, sources=sources)
+                set_asset_map(asset_map)
+            else:
+                static_report = sync_paths(self.static_dir, self.public_dir, static_changes, self.static_manifest, self.store, sources)
+
+        deps = self.deps
+        deps_snapshot = self.deps_signature(deps)
+        template_changed = os.path.exists(self.template_path) and deps_snapshot != self.deps_snapshot
+        if template_changed:
+            deps = self.dependencies()
+            deps_snapshot = self.deps_signature(deps)
+            if self.critical_css:
+                set_style_index(build_style_index(self.template_path, self.public_dir))
+            page_changes = sorted(content_snapshot)
+
+        pages_report = None
+        if static_changes or page_changes:
+            pages_report = update_pages(self.content_dir, self.template_path, self.public_dir, page_changes, self.pages_manifest, deps, self.minify)
+        self.static_snapshot = static_snapshot
+        self.content_snapshot = content_snapshot
+        self.deps = deps
+        self.deps_snapshot = deps_snapshot
+        if pages_report is None:
+            return None
+        return static_report, pages_report
+
+    def save(self):
+        self.static_manifest.save()
+        self.pages_manifest.save()
+
+# Lets request threads wait for the next rebuild.
+class LiveReload:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+def inject_live_reload(html: str) -> str:
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+
+# Serves public/ like SimpleHTTPRequestHandler, adds the live reload script
+# to HTML pages, and streams a server-sent event to /__livereload clients
+# after every rebuild.  Requests are only logged with log_requests=True, and
+# the live reload stream never is.
+class DevRequestHandler(http.server.SimpleHTTPRequestHandler):
+    live_reload: LiveReload = None
+    log_requests: bool = False
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            body = inject_live_reload(f.read()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self):
+        version = self.live_reload.version
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        try:
+            while True:
+                new_version = self.live_reload.wait(version, KEEPALIVE_SECONDS)
+                if new_version != version:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_request(self, code="-", size="-"):
+        if self.log_requests and self.path != LIVE_RELOAD_PATH:
+            super().log_request(code, size)
+
+def start_server(public_dir: str, host: str, port: int, live_reload: LiveReload, log_requests: bool = False) -> http.server.ThreadingHTTPServer:
+    class Handler(DevRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=public_dir, **kwargs)
+    Handler.live_reload = live_reload
+    Handler.log_requests = log_requests
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(serve: bool = False, host: str = "127.0.0.1", port: int = 8888, interval: float = 0.1, public_dir: str = "public", fingerprint: bool = False, link: bool = False, optimize_images: bool = False,
+        minify: bool = False, critical_css: bool = False, log_requests: bool = False):
+    if link:
+        watcher = SiteWatcher(public_dir=public_dir, static_manifest_path=LINK_MANIFEST_PATH, optimize_images=optimize_images, minify=minify, critical_css=critical_css, store=OBJECT_STORE_PATH)
+    else:
+        watcher = SiteWatcher(public_dir=public_dir, fingerprint=fingerprint, optimize_images=optimize_images, minify=minify, critical_css=critical_css)
+    live_reload = LiveReload()
+    server = None
+    if serve:
+        server = start_server(public_dir, host, port, live_reload, log_requests)
+        print(f"Serving {public_dir}/ at http://{host}:{server.server_address[1]}/")
+    print("Watching for changes (Ctrl-C to stop)...")
+    # A failed rebuild is retried on every poll until it succeeds, so the
+    # same error is only printed once.
+    last_error = None
+    try:
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+            try:
+                reports = watcher.poll()
+            except Exception:
+                error = traceback.format_exc()
+                if error != last_error:
+                    print(error, end="", file=sys.stderr)
+                last_error = error
+                continue
+            last_error = None
+            if reports is None:
+                continue
+            static_report, pages_report = reports
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt in {elapsed:.0f} ms: static {static_report.summary()}; pages {pages_report.summary()}")
+            live_reload.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.save()
+        if server is not None:
+            server.shutdown()
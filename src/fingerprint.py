@@ -0,0 +1,230 @@
+import hashlib
+import os
+import posixpath
+import re
+from urllib.parse import urlsplit
+
+from manifest import Manifest, write_json_if_changed
+from static_files import CopyPool, SyncReport, place_copy, prune_empty_dirs, remove_if_exists, stat_or_none, walk_files
+from textnode import split_url_suffix
+
+FINGERPRINT_MANIFEST_PATH = os.path.join(".cache", "fingerprint-manifest.json")
+ASSET_MAP_NAME = "asset-manifest.json"
+FINGERPRINT_LENGTH = 12
+# Files that are fetched by well-known names and so must keep them.
+UNHASHED_NAMES = {"robots.txt", "favicon.ico", "CNAME", "_headers", "_redirects", ASSET_MAP_NAME}
+
+CSS_REFERENCE_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)|@import\s+(['"])([^'"]+)\3""")
+HTML_REFERENCE_PATTERN = re.compile(r"""\b(href|src)=(["'])([^"']+)\2""")
+
+# "images/logo.png" -> "images/logo.<hash>.png".  Files with well-known
+# names, dotfiles and HTML keep their names.
+def fingerprinted_path(rel_path: str, digest: str) -> str:
+    directory, name = posixpath.split(rel_path)
+    root, ext = posixpath.splitext(name)
+    if name in UNHASHED_NAMES or name.startswith(".") or ext == ".html":
+        return rel_path
+    return posixpath.join(directory, f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}")
+
+# The source path (relative to the static root) a reference made from
+# base_dir points at, or None for external, data: and fragment-only URLs.
+def resolve_reference(ref: str, base_dir: str) -> str:
+    parts = urlsplit(ref)
+    if parts.scheme or parts.netloc:
+        return None
+    path, _ = split_url_suffix(ref)
+    if not path:
+        return None
+    if path.startswith("/"):
+        rel_path = posixpath.normpath(path.lstrip("/"))
+    else:
+        rel_path = posixpath.normpath(posixpath.join(base_dir, path))
+    if rel_path.startswith(".."):
+        return None
+    return rel_path
+
+# Rewrites url(...) and @import references in a stylesheet at css_rel to the
+# published names in outputs (source path -> output path).  Absolute
+# references stay absolute and relative ones stay relative; query strings
+# and fragments are kept.
+def rewrite_css(css: str, css_rel: str, outputs: dict[str, str]) -> str:
+    base_dir = posixpath.dirname(css_rel)
+
+    def replace(match: re.Match) -> str:
+        ref = match.group(2) or match.group(4)
+        target = resolve_reference(ref, base_dir)
+        published = outputs.get(target)
+        if published is None or published == target:
+            return match.group(0)
+        path, suffix = split_url_suffix(ref)
+        if path.startswith("/"):
+            new_ref = "/" + published
+        else:
+            new_ref = posixpath.relpath(published, base_dir or ".")
+        return match.group(0).replace(ref, new_ref + suffix, 1)
+
+    return CSS_REFERENCE_PATTERN.sub(replace, css)
+
+# Rewrites absolute href/src attributes (such as the template's stylesheet
+# link) through rewrite, e.g. textnode.rewrite_url.
+def rewrite_html_references(html: str, rewrite) -> str:
+    def replace(match: re.Match) -> str:
+        url = match.group(3)
+        if not url.startswith("/"):
+            return match.group(0)
+        return f"{match.group(1)}={match.group(2)}{rewrite(url)}{match.group(2)}"
+
+    return HTML_REFERENCE_PATTERN.sub(replace, html)
+
+# Publishes every file below src into dst under a content-hashed name
+# (name.<hash>.ext), so the files can be served with far-future cache
+# headers: a file's name changes exactly when its content does, and an
+# unchanged file keeps its name from build to build.
+#
+# Each file is streamed through the hash once; the manifest remembers the
+# hash against the file's size and mtime, so later builds only stat it.
+# Stylesheets are the exception: their references are rewritten to the
+# hashed names first and the rewritten text is what gets hashed and
+# written, so a stylesheet's name also changes when an asset it uses does.
+# Stylesheets they @import are handled first for the same reason.
+#
+# Writes dst/asset-manifest.json mapping each renamed file's URL to its
+# published URL, and returns (report, that map).  Outputs of changed and
+# deleted sources are removed.  sources works as for sync_tree; a file is
+# still named after the hash of its source.
+def fingerprint_tree(src: str, dst: str, manifest_path: str = FINGERPRINT_MANIFEST_PATH, workers: int = None, sources: dict[str, tuple[str, str]] = None) -> tuple[SyncReport, dict[str, str]]:
+    sources = sources or {}
+    manifest = Manifest(manifest_path)
+    files = {rel_path: (src_path, stat) for rel_path, src_path, stat in walk_files(src)}
+
+    outputs = {}
+    digests = {}
+    stylesheets = []
+    for rel_path, (src_path, stat) in files.items():
+        if rel_path.endswith(".css"):
+            stylesheets.append(rel_path)
+            continue
+        digests[rel_path] = manifest.digest(rel_path, src_path, stat)
+        outputs[rel_path] = fingerprinted_path(rel_path, digests[rel_path])
+
+    rewritten = {}
+    visiting = set()
+
+    def publish_stylesheet(rel_path: str):
+        if rel_path in outputs or rel_path in visiting:
+            return
+        visiting.add(rel_path)
+        with open(files[rel_path][0], "r", encoding="utf-8", errors="surrogateescape") as f:
+            css = f.read()
+        base_dir = posixpath.dirname(rel_path)
+        for match in CSS_REFERENCE_PATTERN.finditer(css):
+            target = resolve_reference(match.group(2) or match.group(4), base_dir)
+            if target is not None and target.endswith(".css") and target in files:
+                publish_stylesheet(target)
+        data = rewrite_css(css, rel_path, outputs).encode("utf-8", errors="surrogateescape")
+        rewritten[rel_path] = data
+        digests[rel_path] = hashlib.blake2b(data, digest_size=16).hexdigest()
+        outputs[rel_path] = fingerprinted_path(rel_path, digests[rel_path])
+
+    for rel_path in stylesheets:
+        publish_stylesheet(rel_path)
+
+    report = SyncReport()
+    copies = []
+    for rel_path, (src_path, stat) in files.items():
+        out_rel = outputs[rel_path]
+        dst_path = os.path.join(dst, *out_rel.split("/"))
+        entry = manifest.get(rel_path)
+        dst_stat = stat_or_none(dst_path)
+        published = sources[rel_path][1] if rel_path in sources else None
+        if (
+            entry is not None
+            and entry["output"] == out_rel
+            and entry.get("published") == published
+            and dst_stat is not None
+            and dst_stat.st_size == entry["dst_size"]
+            and dst_stat.st_mtime_ns == entry["dst_mtime_ns"]
+            and dst_stat.st_ino == entry["dst_ino"]
+        ):
+            report.unchanged += 1
+            if entry["mtime_ns"] != stat.st_mtime_ns:
+                manifest.set(rel_path, dict(entry, mtime_ns=stat.st_mtime_ns))
+            continue
+
+        if entry is None:
+            report.added.append(rel_path)
+        else:
+            report.updated.append(rel_path)
+            if entry["output"] != out_rel:
+                remove_if_exists(os.path.join(dst, *entry["output"].split("/")))
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        copies.append((rel_path, src_path, dst_path, stat))
+
+    with CopyPool(workers) as pool:
+        for rel_path, src_path, dst_path, _ in copies:
+            if rel_path in rewritten:
+                pool.submit(_write_output, rewritten[rel_path], dst_path)
+            elif rel_path in sources:
+                pool.submit(place_copy, sources[rel_path][0], dst_path)
+            else:
+                pool.submit(place_copy, src_path, dst_path)
+    for rel_path, _, dst_path, stat in copies:
+        dst_stat = os.stat(dst_path)
+        entry = {
+            # For stylesheets this is the hash of the rewritten output, which
+            # is re-read every build, so it is never reused as a source hash.
+            "hash": digests[rel_path],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "output": outputs[rel_path],
+            "dst_size": dst_stat.st_size,
+            "dst_mtime_ns": dst_stat.st_mtime_ns,
+            "dst_ino": dst_stat.st_ino,
+        }
+        if rel_path in sources:
+            entry["published"] = sources[rel_path][1]
+        manifest.set(rel_path, entry)
+
+    for rel_path in manifest.paths():
+        if rel_path in files:
+            continue
+        dst_path = os.path.join(dst, *manifest.get(rel_path)["output"].split("/"))
+        remove_if_exists(dst_path)
+        prune_empty_dirs(os.path.dirname(dst_path), dst)
+        manifest.remove(rel_path)
+        report.removed.append(rel_path)
+
+    manifest.save()
+    asset_map = {f"/{rel_path}": f"/{out_rel}" for rel_path, out_rel in sorted(outputs.items()) if out_rel != rel_path}
+    write_json_if_changed(os.path.join(dst, ASSET_MAP_NAME), asset_map)
+    report.added.sort()
+    report.updated.sort()
+    report.removed.sort()
+    return report, asset_map
+
+def _write_output(data: bytes, dst_path: str):
+    tmp_path = dst_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dst_path)
+
+# Undoes fingerprint_tree once a build stops fingerprinting: removes every
+# output recorded in the manifest, the asset map and the manifest itself,
+# so no name.<hash>.ext files are left behind and a later fingerprinted
+# build starts from scratch.  Returns a report of the sources whose outputs
+# were removed (empty if dst was never fingerprinted).
+def remove_fingerprinted(dst: str, manifest_path: str = FINGERPRINT_MANIFEST_PATH) -> SyncReport:
+    report = SyncReport()
+    manifest = Manifest(manifest_path)
+    if not (os.path.exists(manifest_path) or os.path.exists(manifest.journal_path)):
+        return report
+    for rel_path in manifest.paths():
+        dst_path = os.path.join(dst, *manifest.get(rel_path)["output"].split("/"))
+        remove_if_exists(dst_path)
+        prune_empty_dirs(os.path.dirname(dst_path), dst)
+        report.removed.append(rel_path)
+    report.removed.sort()
+    remove_if_exists(os.path.join(dst, ASSET_MAP_NAME))
+    remove_if_exists(manifest.journal_path)
+    remove_if_exists(manifest_path)
+    return report
@@ -0,0 +1,308 @@
+from array import array
+
+import textnode
+from htmlnode import HTMLNode, SharedProps, end_tag, render_props, start_tag
+from leafnode import LeafNode
+from parentnode import ParentNode
+from processing import HEADING_TAGS, BlockType, _ordered_list_items, scan_block, tokenize_inline
+from textnode import TextType
+
+# Tag names by id; id 0 is a text node.  Tags seen in converted trees are
+# added as they come.
+TAG_NAMES = [None, "div", "p", "pre", "code", "blockquote", "ul", "ol", "li", "b", "i", "a", "img", *HEADING_TAGS]
+TAG_IDS = {tag: tag_id for tag_id, tag in enumerate(TAG_NAMES)}
+TEXT, DIV, P, PRE, CODE, BLOCKQUOTE, UL, OL, LI, B, I, A, IMG = range(13)
+INLINE_TAGS = {TextType.PLAIN: TEXT, TextType.BOLD: B, TextType.ITALIC: I, TextType.CODE: CODE, TextType.LINK: A, TextType.IMAGE: IMG}
+
+# Flags on a node's text span.
+NEWLINES_AS_SPACES = 1  # a paragraph's lines are joined with spaces
+DERIVED = 2             # the span is in the derived buffer, not the source
+
+def tag_id(tag: str) -> int:
+    tag_id = TAG_IDS.get(tag)
+    if tag_id is None:
+        tag_id = TAG_IDS[tag] = len(TAG_NAMES)
+        TAG_NAMES.append(tag)
+    return tag_id
+
+# A document as parallel arrays instead of a tree of node objects: one entry
+# per node in document order (pre-order), so a node's subtree is the range
+# up to subtree_end and its children are found by hopping from one child's
+# subtree_end to the next.  Text isn't sliced out: a node's text is a
+# (start, end) span of the markdown it was parsed from, as is a link's or
+# image's URL.  The only text copied is quote content, whose lines lose
+# their ">" markers, into the derived buffer.
+#
+# to_html() produces exactly what the equivalent HTMLNode tree would, and
+# to_tree()/from_tree() convert to and from that tree.
+class FlatDocument:
+    def __init__(self, source: str = ""):
+        self.source = source
+        self.derived = ""
+        self.tags = array("H")
+        self.parents = array("i")
+        self.subtree_ends = array("i")
+        self.starts = array("i")
+        self.ends = array("i")
+        self.url_starts = array("i")
+        self.url_ends = array("i")
+        self.flags = array("B")
+        # Props for nodes converted from a tree; props_refs indexes this
+        # list, -1 meaning none.
+        self.props = []
+        self.props_refs = array("i")
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    # Appends a node and returns its index; subtree_end is set by close().
+    def add(self, tag: int, parent: int, start: int = -1, end: int = -1, flags: int = 0, url_start: int = -1, url_end: int = -1, props_ref: int = -1) -> int:
+        index = len(self.tags)
+        self.tags.append(tag)
+        self.parents.append(parent)
+        self.subtree_ends.append(index + 1)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.flags.append(flags)
+        self.url_starts.append(url_start)
+        self.url_ends.append(url_end)
+        self.props_refs.append(props_ref)
+        return index
+
+    def close(self, index: int):
+        self.subtree_ends[index] = len(self.tags)
+
+    def children(self, index: int):
+        child = index + 1
+        end = self.subtree_ends[index]
+        while child < end:
+            yield child
+            child = self.subtree_ends[child]
+
+    def text(self, index: int) -> str:
+        start = self.starts[index]
+        if start < 0:
+            return None
+        flags = self.flags[index]
+        buffer = self.derived if flags & DERIVED else self.source
+        text = buffer[start:self.ends[index]]
+        if flags & NEWLINES_AS_SPACES and "\n" in text:
+            text = text.replace("\n", " ")
+        return text
+
+    def url(self, index: int) -> str:
+        start = self.url_starts[index]
+        if start < 0:
+            return None
+        flags = self.flags[index]
+        url = (self.derived if flags & DERIVED else self.source)[start:self.url_ends[index]]
+        if flags & NEWLINES_AS_SPACES and "\n" in url:
+            url = url.replace("\n", " ")
+        return url
+
+    def node_props(self, index: int) -> dict[str, str]:
+        tag = self.tags[index]
+        if self.url_starts[index] >= 0:
+            url = self.url(index)
+            return textnode.image_props(url) if tag == IMG else textnode.link_props(url)
+        ref = self.props_refs[index]
+        return self.props[ref] if ref >= 0 else None
+
+    def start_tag(self, index: int) -> str:
+        tag = TAG_NAMES[self.tags[index]]
+        props = self.node_props(index)
+        if props is None:
+            return start_tag(tag)
+        if type(props) is SharedProps:
+            return props.start_tag(tag)
+        return f"<{tag}{render_props(props)}>"
+
+    # Yields the markup in order with one pass over the arrays: a node is
+    # opened when reached, and the elements it isn't inside are closed
+    # first.  Plain text, the bulk of a page, is sliced here rather than
+    # through text().
+    def iter_html(self):
+        source = self.source
+        derived = self.derived
+        tags = self.tags
+        parents = self.parents
+        starts = self.starts
+        ends = self.ends
+        flags = self.flags
+        url_starts = self.url_starts
+        props_refs = self.props_refs
+        open_nodes = []
+        open_node = -1
+        for index, (tag, parent, start, end, node_flags) in enumerate(zip(tags, parents, starts, ends, flags)):
+            while open_node != parent:
+                yield end_tag(TAG_NAMES[tags[open_nodes.pop()]])
+                open_node = open_nodes[-1] if open_nodes else -1
+            if start < 0:
+                yield self.start_tag(index)
+                open_nodes.append(index)
+                open_node = index
+                continue
+            text = (derived if node_flags & DERIVED else source)[start:end]
+            if node_flags & NEWLINES_AS_SPACES and "\n" in text:
+                text = text.replace("\n", " ")
+            if tag == TEXT:
+                yield text
+            elif url_starts[index] < 0 and props_refs[index] < 0:
+                name = TAG_NAMES[tag]
+                yield f"{start_tag(name)}{text}{end_tag(name)}"
+            else:
+                yield f"{self.start_tag(index)}{text}{end_tag(TAG_NAMES[tag])}"
+        while open_nodes:
+            yield end_tag(TAG_NAMES[tags[open_nodes.pop()]])
+
+    def to_html(self) -> str:
+        return "".join(self.iter_html())
+
+    def write_html(self, fp) -> int:
+        written = 0
+        for chunk in self.iter_html():
+            written += fp.write(chunk)
+        return written
+
+    def to_tree(self) -> HTMLNode:
+        if not len(self):
+            return None
+        return self._to_node(0)
+
+    def _to_node(self, root: int) -> HTMLNode:
+        nodes = [None] * (self.subtree_ends[root] - root)
+        for index in range(self.subtree_ends[root] - 1, root - 1, -1):
+            tag = TAG_NAMES[self.tags[index]]
+            if self.starts[index] >= 0:
+                nodes[index - root] = LeafNode(tag, self.text(index), self.node_props(index))
+            else:
+                children = [nodes[child - root] for child in self.children(index)]
+                nodes[index - root] = ParentNode(tag, children, self.node_props(index))
+        return nodes[0]
+
+    @classmethod
+    def from_tree(cls, root: HTMLNode) -> "FlatDocument":
+        document = cls()
+        texts = []
+        length = 0
+        stack = [(root, -1)]
+        opened = []
+        while stack:
+            node, parent = stack.pop()
+            while opened and opened[-1] != parent:
+                document.close(opened.pop())
+            props_ref = -1
+            if node.props is not None:
+                props_ref = len(document.props)
+                document.props.append(node.props)
+            if node.children is None:
+                value = node.value if node.value is not None else ""
+                texts.append(value)
+                document.add(tag_id(node.tag), parent, length, length + len(value), DERIVED, props_ref=props_ref)
+                length += len(value)
+                continue
+            index = document.add(tag_id(node.tag), parent, props_ref=props_ref)
+            opened.append(index)
+            stack.extend((child, index) for child in reversed(node.children))
+        while opened:
+            document.close(opened.pop())
+        document.derived = "".join(texts)
+        return document
+
+# Parses markdown straight into a FlatDocument, block by block, with the
+# same result as markdown_to_html_node.  Blocks are found by offset rather
+# than split out, and each block's inline text is tokenized in place.
+def parse_document(markdown: str) -> FlatDocument:
+    document = FlatDocument(markdown)
+    derived = []
+    derived_length = 0
+    root = document.add(DIV, -1)
+    for start, end in block_spans(markdown):
+        block = markdown[start:end]
+        block_type, lines, items = scan_block(block)
+        if block_type == BlockType.PARAGRAPH:
+            node = document.add(P, root)
+            add_inline(document, node, markdown, start, end, NEWLINES_AS_SPACES)
+        elif block_type == BlockType.HEADING:
+            level = len(block) - len(block.lstrip("#"))
+            if level + 1 >= len(block):
+                raise ValueError(f"Invalid heading level: {level}")
+            node = document.add(tag_id(HEADING_TAGS[level - 1] if level <= len(HEADING_TAGS) else f"h{level}"), root)
+            add_inline(document, node, markdown, start + level + 1, end)
+        elif block_type == BlockType.CODE:
+            if not block.endswith("```"):
+                raise ValueError("invalid code block")
+            node = document.add(PRE, root)
+            code = document.add(CODE, node)
+            document.add(TEXT, code, start + 4, max(start + 4, end - 3))
+            document.close(code)
+        elif block_type == BlockType.QUOTE:
+            node = document.add(BLOCKQUOTE, root)
+            content = " ".join(items)
+            derived.append(content)
+            add_inline(document, node, content, 0, len(content), DERIVED, derived_length)
+            derived_length += len(content)
+        else:
+            ordered = block_type == BlockType.ORDERED_LIST
+            node = document.add(OL if ordered else UL, root)
+            line_start = start
+            texts = _ordered_list_items(lines) if ordered else None
+            for number, line in enumerate(lines):
+                line_end = line_start + len(line)
+                text_start = line_end - len(texts[number]) if ordered else min(line_start + 2, line_end)
+                item = document.add(LI, node)
+                add_inline(document, item, markdown, text_start, line_end)
+                document.close(item)
+                line_start = line_end + 1
+        document.close(node)
+    document.close(root)
+    document.derived = "".join(derived)
+    return document
+
+# Adds the inline nodes for text[start:end] below parent.  offset is added
+# to every span, for text that is later appended to the derived buffer.
+# Inline nodes are most of a page, so this appends to the arrays itself
+# rather than through add().
+def add_inline(document: FlatDocument, parent: int, text: str, start: int, end: int, flags: int = 0, offset: int = 0):
+    index = len(document.tags)
+    for text_type, span_start, span_end, url_start, url_end in tokenize_inline(text, start, end):
+        index += 1
+        if text_type is TextType.PLAIN:
+            tag = TEXT
+        elif text_type is TextType.IMAGE:
+            # The alt text isn't rendered (see TextNode.to_html_node).
+            tag = IMG
+            span_end = span_start
+        else:
+            tag = INLINE_TAGS[text_type]
+        document.tags.append(tag)
+        document.parents.append(parent)
+        document.subtree_ends.append(index)
+        document.starts.append(span_start + offset)
+        document.ends.append(span_end + offset)
+        document.flags.append(flags)
+        if url_start is None:
+            document.url_starts.append(-1)
+            document.url_ends.append(-1)
+        else:
+            document.url_starts.append(url_start + offset)
+            document.url_ends.append(url_end + offset)
+        document.props_refs.append(-1)
+
+# The (start, end) offsets of the blocks markdown_to_blocks would return.
+def block_spans(markdown: str):
+    pos = 0
+    size = len(markdown)
+    while pos <= size:
+        end = markdown.find("\n\n", pos)
+        if end == -1:
+            end = size
+        start = pos
+        stop = end
+        while start < stop and markdown[start].isspace():
+            start += 1
+        while stop > start and markdown[stop - 1].isspace():
+            stop -= 1
+        if start < stop:
+            yield start, stop
+        pos = end + 2
@@ -1,4 +1,30 @@
+import re
+import sys
+
+WRITE_BUFFER_SIZE = 1 << 16
+
+# Serialization with minify=True: runs of whitespace in text collapse to one
+# space, attribute values that need no quotes lose them, and closing tags
+# the HTML parser infers are left out.  Text inside these elements is
+# written verbatim, since there whitespace is content.
+PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "code", "textarea", "script", "style"})
+VOID_TAGS = frozenset({"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"})
+# A </p> may be left out before any of these, or at the end of a parent
+# that isn't one of P_END_UNSAFE_PARENTS (HTML spec, "optional tags").
+P_CLOSING_SIBLINGS = frozenset({
+    "address", "article", "aside", "blockquote", "details", "div", "dl", "fieldset", "figcaption", "figure",
+    "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr", "main", "menu", "nav",
+    "ol", "p", "pre", "section", "table", "ul",
+})
+P_END_UNSAFE_PARENTS = frozenset({"a", "audio", "del", "ins", "map", "noscript", "video"})
+OPTIONAL_CLOSING_TAGS = frozenset({"li", "p"})
+# HTML's whitespace, which unlike \s doesn't include non-breaking spaces.
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+UNQUOTED_VALUE_PATTERN = re.compile(r"[^\s\"'=<>`]+")
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str = None, value: str = None, children: list["HTMLNode"] = None, props: dict[str, str] = None):
         self.tag = tag
         self.value = value
@@ -18,10 +44,215 @@ class HTMLNode:
             and self.children == other.children
         )
 
-    def to_html(self) -> str:
+    def to_html(self, minify: bool = False) -> str:
         raise NotImplementedError
 
-    def props_to_html(self) -> str:
-        if self.props is None:
+    # Returns (opening chunk, children, closing chunk) for the streaming
+    # serializer.  Leaves return their whole markup as the opening chunk.
+    def html_parts(self, minify: bool = False) -> tuple[str, list["HTMLNode"], str]:
+        raise NotImplementedError
+
+    def iter_html(self, minify: bool = False):
+        return iter_html(self, minify)
+
+    def write_html(self, fp, minify: bool = False) -> int:
+        return write_html(self, fp, minify)
+
+    def props_to_html(self, minify: bool = False) -> str:
+        props = self.props
+        if props is None:
             return ""
-        return " " + " ".join([f"{key}=\"{value}\"" for key, value in self.props.items()])
+        if type(props) is SharedProps:
+            return props.html(minify)
+        return render_props(props, minify)
+
+    # The opening tag, taken from a cache when the props allow it.
+    def start_tag(self, minify: bool = False) -> str:
+        props = self.props
+        if props is None:
+            return start_tag(self.tag)
+        if type(props) is SharedProps:
+            return props.start_tag(self.tag, minify)
+        return f"<{self.tag}{render_props(props, minify)}>"
+
+def render_props(props: dict[str, str], minify: bool = False) -> str:
+    if minify:
+        return "".join([f" {key}={minify_attribute(value)}" for key, value in props.items()])
+    return " " + " ".join([f"{key}=\"{value}\"" for key, value in props.items()])
+
+# Props that can't be modified, so one instance can be shared by every node
+# with the same attributes (every link to the same URL, say).  The rendered
+# attribute string and opening tags are built on first use and kept, so
+# serializing such a node builds no attribute strings at all.  Being a dict,
+# it compares equal to a plain dict with the same items.
+class SharedProps(dict):
+    __slots__ = ("_html", "_minified_html", "_start_tags")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._html = None
+        self._minified_html = None
+        self._start_tags = {}
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("SharedProps cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return SharedProps, (dict(self),)
+
+    def html(self, minify: bool = False) -> str:
+        if minify:
+            if self._minified_html is None:
+                self._minified_html = render_props(self, True)
+            return self._minified_html
+        if self._html is None:
+            self._html = render_props(self)
+        return self._html
+
+    def start_tag(self, tag: str, minify: bool = False) -> str:
+        key = (tag, minify)
+        html = self._start_tags.get(key)
+        if html is None:
+            html = self._start_tags[key] = f"<{tag}{self.html(minify)}>"
+        return html
+
+# "<p>" and "</p>" for each tag seen so far, so attribute-less nodes reuse
+# one string per tag instead of formatting a new one per node.
+_start_tags: dict[str, str] = {}
+_end_tags: dict[str, str] = {}
+
+def start_tag(tag: str) -> str:
+    html = _start_tags.get(tag)
+    if html is None:
+        html = _start_tags[sys.intern(tag)] = f"<{tag}>"
+    return html
+
+def end_tag(tag: str) -> str:
+    html = _end_tags.get(tag)
+    if html is None:
+        html = _end_tags[sys.intern(tag)] = f"</{tag}>"
+    return html
+
+def minify_attribute(value: str) -> str:
+    if UNQUOTED_VALUE_PATTERN.fullmatch(value):
+        return value
+    return f"\"{value}\""
+
+def collapse_whitespace(text: str) -> str:
+    # Most text has nothing to collapse, and these checks are cheaper than
+    # a regex substitution that finds nothing.
+    if "  " in text or "\n" in text or "\t" in text or "\r" in text or "\f" in text:
+        return WHITESPACE_PATTERN.sub(" ", text)
+    return text
+
+# Whether node's closing tag can be left out when it is followed by
+# next_node (None at the end of its parent) inside a parent_tag element.
+def closing_tag_optional(node: HTMLNode, next_node: HTMLNode, parent_tag: str) -> bool:
+    if node.tag == "li":
+        return next_node is None or next_node.tag == "li"
+    if node.tag == "p":
+        if next_node is None:
+            return parent_tag is not None and parent_tag not in P_END_UNSAFE_PARENTS
+        return next_node.tag in P_CLOSING_SIBLINGS
+    return False
+
+# Walks the tree depth first with an explicit stack and yields the markup in
+# order.  No subtree's text is joined and copied into its parent, and
+# arbitrarily deep trees don't hit the recursion limit.  The stack holds
+# nodes still to be opened and closing tags still to be emitted.
+def iter_html(node: HTMLNode, minify: bool = False):
+    return iter_html_nodes([node], minify)
+
+def iter_html_nodes(nodes: list[HTMLNode], minify: bool = False, parent_tag: str = None):
+    if minify:
+        return iter_minified_html_nodes(nodes, parent_tag)
+    return _iter_html_nodes(nodes)
+
+def _iter_html_nodes(nodes: list[HTMLNode]):
+    stack = list(reversed(nodes))
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            yield item
+            continue
+        open_chunk, children, close_chunk = item.html_parts()
+        if open_chunk:
+            yield open_chunk
+        if children:
+            stack.append(close_chunk)
+            stack.extend(reversed(children))
+        elif close_chunk:
+            yield close_chunk
+
+# The minifying walk.  A node whose closing tag can be left out is pushed
+# as a (node,) tuple; deciding that needs its next sibling and its parent,
+# which are known when the siblings are pushed.  A None entry marks the end
+# of a <pre> or other whitespace-preserving element, inside which leaves
+# are written unminified.
+def iter_minified_html_nodes(nodes: list[HTMLNode], parent_tag: str = None):
+    stack = _minified_children(nodes, parent_tag)
+    preserve_depth = 0
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            yield item
+            continue
+        if item is None:
+            preserve_depth -= 1
+            continue
+        if type(item) is tuple:
+            node = item[0]
+            omit_close = True
+        else:
+            node = item
+            omit_close = False
+        if node.children is None:
+            yield node.to_html(not preserve_depth)
+            continue
+        open_chunk, children, close_chunk = node.html_parts(True)
+        if open_chunk:
+            yield open_chunk
+        if omit_close:
+            close_chunk = ""
+        if children:
+            if node.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve_depth += 1
+                stack.append(None)
+            if close_chunk:
+                stack.append(close_chunk)
+            stack.extend(_minified_children(children, node.tag))
+        elif close_chunk:
+            yield close_chunk
+
+def _minified_children(nodes: list[HTMLNode], parent_tag: str) -> list:
+    entries = []
+    next_node = None
+    for node in reversed(nodes):
+        if node.tag in OPTIONAL_CLOSING_TAGS and closing_tag_optional(node, next_node, parent_tag):
+            entries.append((node,))
+        else:
+            entries.append(node)
+        next_node = node
+    return entries
+
+# Streams the markup for node into a text file-like object (a file, a
+# socket's makefile("w"), io.StringIO...), batching small chunks into larger
+# writes.  Returns the number of characters written.
+def write_html(node: HTMLNode, fp, minify: bool = False) -> int:
+    written = 0
+    buffer = []
+    buffered = 0
+    for chunk in iter_html(node, minify):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= WRITE_BUFFER_SIZE:
+            fp.write("".join(buffer))
+            written += buffered
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        fp.write("".join(buffer))
+        written += buffered
+    return written
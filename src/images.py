@@ -0,0 +1,180 @@
+import os
+import struct
+import zlib
+
+from manifest import Manifest, file_digest, write_json_if_changed
+from static_files import walk_files
+
+IMAGE_MANIFEST_PATH = os.path.join(".cache", "image-manifest.json")
+IMAGE_CACHE_PATH = os.path.join(".cache", "images")
+IMAGE_SIZES_PATH = os.path.join(".cache", "image-sizes.json")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Ancillary PNG chunks that change how the image is displayed (transparency
+# and colour management) and so survive optimization; every other ancillary
+# chunk (text, timestamps, physical size, thumbnails...) is metadata and is
+# dropped.  Critical chunks are always kept.
+PNG_KEPT_ANCILLARY = {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT"}
+# JPEG start-of-frame markers, which carry the image dimensions.
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Reads the intrinsic (width, height) of a PNG, GIF or JPEG from its header
+# without decoding it.  Returns None for other or malformed files.
+def image_size(path: str) -> tuple[int, int]:
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+# Walks the JPEG marker segments up to the first start-of-frame, seeking
+# over everything else (EXIF blocks and embedded thumbnails can be large).
+def _jpeg_size(f) -> tuple[int, int]:
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker == 0xD9:
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def iter_png_chunks(data: bytes):
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            raise ValueError("truncated PNG chunk")
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        if len(body) != length:
+            raise ValueError("truncated PNG chunk")
+        yield chunk_type, body
+        offset += 12 + length
+
+def png_chunk(chunk_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+# Losslessly shrinks a PNG: drops metadata chunks and recompresses the image
+# data as a single IDAT at zlib's maximum level, keeping whichever strategy
+# compresses best.  The decompressed scanlines are untouched, so every
+# pixel is identical.  Returns data unchanged when that doesn't make it
+# smaller, or for animated or malformed PNGs.
+def optimize_png(data: bytes) -> bytes:
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    try:
+        chunks = list(iter_png_chunks(data))
+        if any(chunk_type == b"acTL" for chunk_type, _ in chunks):
+            return data
+        raw = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+    except (ValueError, zlib.error):
+        return data
+
+    compressed = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidate = compressor.compress(raw) + compressor.flush()
+        if compressed is None or len(candidate) < len(compressed):
+            compressed = candidate
+
+    out = [PNG_SIGNATURE]
+    wrote_idat = False
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if not wrote_idat:
+                out.append(png_chunk(b"IDAT", compressed))
+                wrote_idat = True
+        elif chunk_type[0] & 0x20 == 0 or chunk_type in PNG_KEPT_ANCILLARY:
+            out.append(png_chunk(chunk_type, body))
+    optimized = b"".join(out)
+    return optimized if len(optimized) < len(data) else data
+
+def _write_bytes(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# Processes every image below src once per distinct content: reads its
+# dimensions and, with optimize=True, writes an optimized copy of each PNG
+# to cache_dir/<hash>.png.  The manifest remembers each image's hash,
+# dimensions and the hash of its optimized copy, so an unchanged image
+# costs a stat and is never decoded or recompressed again; an image whose
+# mtime changed but content didn't costs one hash.  Cached copies of images
+# that no longer exist are removed.
+#
+# Returns {relative path: entry}; entries have "width" and "height" (None if
+# unknown) and, for PNGs, "output" (the optimized copy to publish instead
+# of the source) and "output_hash".
+def process_images(src: str, manifest_path: str = IMAGE_MANIFEST_PATH, cache_dir: str = IMAGE_CACHE_PATH, optimize: bool = True) -> dict[str, dict]:
+    manifest = Manifest(manifest_path)
+    images = {}
+    for rel_path, src_path, stat in walk_files(src):
+        if not rel_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        entry = manifest.get(rel_path)
+        digest = manifest.digest(rel_path, src_path, stat)
+        if entry is None or entry["hash"] != digest:
+            size = image_size(src_path)
+            entry = {"hash": digest, "width": size and size[0], "height": size and size[1]}
+        entry = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+        if optimize and rel_path.lower().endswith(".png"):
+            output = os.path.join(cache_dir, f"{digest}.png")
+            if "output_hash" not in entry or not os.path.exists(output):
+                with open(src_path, "rb") as f:
+                    data = optimize_png(f.read())
+                os.makedirs(cache_dir, exist_ok=True)
+                _write_bytes(output, data)
+                entry["output_hash"] = file_digest(output)
+            images[rel_path] = dict(entry, output=output)
+        else:
+            entry.pop("output_hash", None)
+            images[rel_path] = entry
+        manifest.set(rel_path, entry)
+
+    for rel_path in manifest.paths():
+        if rel_path not in images:
+            manifest.remove(rel_path)
+    if os.path.isdir(cache_dir):
+        live = {f"{entry['hash']}.png" for entry in images.values() if "output" in entry}
+        for name in os.listdir(cache_dir):
+            if name not in live:
+                os.remove(os.path.join(cache_dir, name))
+    manifest.save()
+    return images
+
+# {site URL: [width, height]} for the images whose size is known, the form
+# textnode.set_image_sizes takes.
+def image_sizes(images: dict[str, dict]) -> dict[str, list[int]]:
+    return {f"/{rel_path}": [entry["width"], entry["height"]] for rel_path, entry in sorted(images.items()) if entry["width"]}
+
+# The optimized copies to publish in place of their sources, as
+# {relative path: (path, hash)} for sync_tree and fingerprint_tree.
+def image_sources(images: dict[str, dict]) -> dict[str, tuple[str, str]]:
+    return {rel_path: (entry["output"], entry["output_hash"]) for rel_path, entry in images.items() if "output" in entry}
+
+def write_image_sizes(sizes: dict[str, list[int]], path: str = IMAGE_SIZES_PATH) -> bool:
+    return write_json_if_changed(path, sizes)
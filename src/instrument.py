@@ -0,0 +1,237 @@
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+# Functions timed while a profiler is enabled, as (module, function, stage,
+# traced).  They are wrapped by replacing the module attribute, so callers
+# that look them up through the module's globals (every caller in this
+# repo) go through the timer, and a build without --profile runs the
+# original functions with no overhead at all.  Stages marked traced also
+# emit one Chrome trace event per call; the rest run once per block or per
+# text run, far too often to trace, and are only totalled.
+INSTRUMENTED = [
+    ("processing", "markdown_to_blocks", "split", True),
+    ("processing", "scan_block", "classify", False),
+    ("processing", "block_to_html_node", "build", False),
+    ("processing", "text_to_nodes", "inline", False),
+    ("htmlnode", "write_html", "serialize", True),
+]
+MAX_TRACE_EVENTS = 500_000
+PROGRESS_INTERVAL = 0.1
+_NULL_STAGE = nullcontext()
+
+_active = None
+_originals = {}
+
+# Collects, per stage, the number of calls and the total and self time (the
+# time not spent in nested stages), named counters, and Chrome trace events.
+# Nesting is tracked per thread, so stages entered from copy worker threads
+# don't get charged to whatever the main thread is doing.
+class Profiler:
+    def __init__(self, trace: bool = True, progress=None):
+        self.trace = trace
+        self.progress = progress
+        self.stages: dict[str, list] = {}
+        self.counters: dict[str, int] = {}
+        self.events: list[dict] = []
+        self.dropped_events = 0
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_progress = 0.0
+
+    def stage(self, name: str, traced: bool = True):
+        return _Stage(self, name, traced)
+
+    def record(self, name: str, start: float, elapsed: float, self_time: float, traced: bool):
+        with self.lock:
+            totals = self.stages.get(name)
+            if totals is None:
+                totals = self.stages[name] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] += self_time
+            if traced and self.trace:
+                if len(self.events) < MAX_TRACE_EVENTS:
+                    self.events.append({
+                        "name": name,
+                        "ph": "X",
+                        "ts": start * 1e6,
+                        "dur": elapsed * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                    })
+                else:
+                    self.dropped_events += 1
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        if self.progress is not None:
+            self.show_progress()
+
+    # Redraws the counters on one status line, at most every
+    # PROGRESS_INTERVAL.  A stream that isn't a terminal only gets the final
+    # line, rather than a log full of carriage returns.
+    def show_progress(self, final: bool = False):
+        now = time.perf_counter()
+        if not final and now - self.last_progress < PROGRESS_INTERVAL:
+            return
+        self.last_progress = now
+        line = ", ".join(f"{value} {name}" for name, value in self.counters.items())
+        if self.progress.isatty():
+            self.progress.write(f"\r\033[K{line}" + ("\n" if final else ""))
+        elif final:
+            self.progress.write(line + "\n")
+        self.progress.flush()
+
+    # Stage totals, counters and trace events as plain data, for sending
+    # from a worker process back to the parent.
+    def snapshot(self) -> dict:
+        return {"stages": self.stages, "counters": self.counters, "events": self.events, "dropped_events": self.dropped_events}
+
+    def merge(self, data: dict):
+        with self.lock:
+            for name, (calls, total, self_time) in data["stages"].items():
+                totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+                totals[0] += calls
+                totals[1] += total
+                totals[2] += self_time
+            room = MAX_TRACE_EVENTS - len(self.events)
+            self.events.extend(data["events"][:room])
+            self.dropped_events += data["dropped_events"] + max(0, len(data["events"]) - room)
+        for name, value in data["counters"].items():
+            self.count(name, value)
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<12} {'calls':>9} {'total ms':>10} {'self ms':>10}"]
+        for name, (calls, total, self_time) in sorted(self.stages.items(), key=lambda item: -item[1][2]):
+            lines.append(f"{name:<12} {calls:>9} {total * 1000:>10.1f} {self_time * 1000:>10.1f}")
+        for name, value in self.counters.items():
+            lines.append(f"{name}: {value}")
+        if self.dropped_events:
+            lines.append(f"({self.dropped_events} trace events dropped)")
+        return "\n".join(lines)
+
+    # Writes a Chrome trace (load it in chrome://tracing or ui.perfetto.dev)
+    # that also carries the stage totals and counters as extra keys, so the
+    # same file serves as the JSON report.  perf_counter is the system-wide
+    # monotonic clock on Linux, so worker process events line up with ours.
+    def write_trace(self, path: str):
+        events = [dict(event, ts=event["ts"] - self.origin * 1e6) for event in self.events]
+        stages = {
+            name: {"calls": calls, "total_ms": total * 1000, "self_ms": self_time * 1000}
+            for name, (calls, total, self_time) in self.stages.items()
+        }
+        data = {"traceEvents": events, "displayTimeUnit": "ms", "stages": stages, "counters": self.counters}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+class _Stage:
+    __slots__ = ("profiler", "name", "traced", "start", "child_time")
+
+    def __init__(self, profiler: Profiler, name: str, traced: bool):
+        self.profiler = profiler
+        self.name = name
+        self.traced = traced
+
+    def __enter__(self):
+        local = self.profiler.local
+        stack = getattr(local, "stack", None)
+        if stack is None:
+            stack = local.stack = []
+        stack.append(self)
+        self.child_time = 0.0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler.local.stack
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+        self.profiler.record(self.name, self.start, elapsed, elapsed - self.child_time, self.traced)
+        return False
+
+def _timed(function, name: str, traced: bool):
+    def timed(*args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return function(*args, **kwargs)
+        with profiler.stage(name, traced):
+            return function(*args, **kwargs)
+    timed.__wrapped__ = function
+    return timed
+
+# Starts collecting.  Returns the new profiler, which replaces any active
+# one (a forked worker process starts afresh rather than adding to a copy of
+# its parent's totals).
+def enable(trace: bool = True, progress=None) -> Profiler:
+    global _active
+    _active = Profiler(trace, progress)
+    for module_name, function_name, stage_name, traced in INSTRUMENTED:
+        module = importlib.import_module(module_name)
+        if (module_name, function_name) not in _originals:
+            function = getattr(module, function_name)
+            _originals[(module_name, function_name)] = function
+            setattr(module, function_name, _timed(function, stage_name, traced))
+    return _active
+
+# Stops collecting, restores the original functions and returns the
+# profiler that was active.
+def disable() -> Profiler:
+    global _active
+    profiler = _active
+    _active = None
+    for (module_name, function_name), function in _originals.items():
+        setattr(sys.modules[module_name], function_name, function)
+    _originals.clear()
+    if profiler is not None and profiler.progress is not None and profiler.counters:
+        profiler.show_progress(final=True)
+    return profiler
+
+def active() -> Profiler:
+    return _active
+
+def stage(name: str, traced: bool = True):
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name, traced)
+
+def count(name: str, n: int = 1):
+    if _active is not None:
+        _active.count(name, n)
+
+# Wraps a file object so time spent in its write() calls and in closing it
+# is charged to the "write" stage rather than to whoever is serializing into
+# it.
+class TimedWriter:
+    __slots__ = ("fp",)
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        with stage("write", traced=False):
+            self.fp.close()
+        return False
+
+    def write(self, data) -> int:
+        with stage("write", traced=False):
+            return self.fp.write(data)
+
+def writer(fp):
+    if _active is None:
+        return fp
+    return TimedWriter(fp)
@@ -1,16 +1,31 @@
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, PRESERVE_WHITESPACE_TAGS, VOID_TAGS, collapse_whitespace, end_tag
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str, props: dict[str, str] = None):
         super().__init__(tag, value, None, props)
 
     def __repr__(self) -> str:
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
-    def to_html(self) -> str:
+    def to_html(self, minify: bool = False) -> str:
         if self.value is None:
             raise ValueError("LeafNode value cannot be None")
+        if minify:
+            return self.minified_html()
         if self.tag is None:
             return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"{self.start_tag()}{self.value}{end_tag(self.tag)}"
+
+    def minified_html(self) -> str:
+        if self.tag is None:
+            return collapse_whitespace(self.value)
+        if self.tag in VOID_TAGS and not self.value:
+            return self.start_tag(True)
+        value = self.value if self.tag in PRESERVE_WHITESPACE_TAGS else collapse_whitespace(self.value)
+        return f"{self.start_tag(True)}{value}{end_tag(self.tag)}"
+
+    def html_parts(self, minify: bool = False) -> tuple[str, list[HTMLNode], str]:
+        return self.to_html(minify), None, ""
         
\ No newline at end of file
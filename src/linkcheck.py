@@ -0,0 +1,217 @@
+import json
+import os
+import posixpath
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import unquote
+
+import textnode
+from critical_css import template_tokens
+from flatdoc import DERIVED, IMG, parse_document
+from pages import chunk_pages, output_path, read_file
+from static_files import walk_files
+
+SCHEME_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*:")
+ID_PATTERN = re.compile(r"""\bid=(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+# Fragments browsers resolve without a matching id.
+IMPLICIT_ANCHORS = frozenset(("", "top"))
+MISSING = object()
+EXTERNAL = object()
+
+@dataclass
+class LinkReport:
+    references: int = 0
+    external: int = 0
+    broken: list[dict] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return f"{self.references} references checked, {self.external} external skipped, {len(self.broken)} broken"
+
+# Every URL path the output serves, mapped to the ids a fragment can point
+# at on it (None for files other than HTML, whose fragments aren't checked).
+# "dir/index.html" is also served as "dir/" and "dir".  Pages rendered from
+# markdown only have the template's ids, since the renderer adds none, so
+# only other HTML files are read.  Lookups are a single dict probe.
+class PathIndex:
+    def __init__(self, paths: dict[str, frozenset[str]] = None):
+        self.paths = paths if paths is not None else {}
+
+    def add(self, url: str, anchors: frozenset[str] = None):
+        self.paths[url] = anchors
+        if url.endswith("/index.html"):
+            directory = url[:-len("index.html")]
+            self.paths[directory] = anchors
+            if directory != "/":
+                self.paths[directory[:-1]] = anchors
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    # Why the reference at url on the page at page_url is broken, or None
+    # if it isn't; external references are never broken.
+    def check(self, url: str, page_url: str) -> str:
+        target = resolve_reference(url, page_url)
+        if target is None:
+            return None
+        return self.check_target(*target)
+
+    def check_target(self, path: str, fragment: str) -> str:
+        anchors = self.paths.get(path, MISSING)
+        if anchors is MISSING:
+            return "missing"
+        if anchors is not None and fragment not in anchors and fragment not in IMPLICIT_ANCHORS:
+            return "missing-anchor"
+        return None
+
+def html_anchors(html: str) -> frozenset[str]:
+    return frozenset(next(value for value in match.groups() if value is not None) for match in ID_PATTERN.finditer(html))
+
+def build_path_index(dest_dir: str, page_urls: set[str], template: str = "") -> PathIndex:
+    index = PathIndex()
+    page_anchors = frozenset(token[1:] for token in template_tokens(template) if token.startswith("#"))
+    for rel_path, path, _ in walk_files(dest_dir):
+        url = f"/{rel_path}"
+        if url in page_urls:
+            index.add(url, page_anchors)
+        elif rel_path.endswith(".html"):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                index.add(url, html_anchors(f.read()))
+        else:
+            index.add(url)
+    return index
+
+# (path, fragment) of the URL path a reference on page_url points at, or
+# None for external references (any scheme, or "//host/...").  Relative
+# references are resolved against the page; percent-escapes are decoded.
+def resolve_reference(url: str, page_url: str) -> tuple[str, str]:
+    if url[:1] == "/":
+        if url[1:2] == "/":
+            return None
+    elif SCHEME_PATTERN.match(url):
+        return None
+    path = url
+    fragment = ""
+    if "#" in url or "?" in url:
+        path, suffix = textnode.split_url_suffix(url)
+        fragment = suffix.partition("#")[2]
+    if "%" in path:
+        path = unquote(path)
+    if not path:
+        return page_url, fragment
+    if path[0] != "/" or "/." in path:
+        if path[0] != "/":
+            path = posixpath.join(posixpath.dirname(page_url), path)
+        normalized = posixpath.normpath(path)
+        if path.endswith("/") and normalized != "/":
+            normalized += "/"
+        path = normalized
+    return path, fragment
+
+def page_url(rel_path: str) -> str:
+    return output_path(rel_path, "")
+
+# The index and URL map a worker process checks with, set by init_worker.
+_index = None
+
+def init_worker(index: PathIndex, url_map: dict[str, str]):
+    global _index
+    _index = index
+    textnode.set_url_map(url_map)
+
+# Checks the link and image references of each (source, page URL) against
+# the index; runs in the worker processes.  References are found by parsing
+# the page into a FlatDocument, which yields the same links and images as
+# rendering it without building nodes for them.  Sites link to the same
+# targets over and over, so verdicts are remembered by URL (and, for
+# relative URLs, the page's directory).  Returns (references, external,
+# broken).
+def check_pages(pages: list[tuple[str, str]], index: PathIndex = None) -> tuple[int, int, list[dict]]:
+    if index is None:
+        index = _index
+    references = 0
+    external = 0
+    broken = []
+    verdicts = {}
+    for src_path, url in pages:
+        markdown = read_file(src_path)
+        if "](" not in markdown:
+            continue
+        document = parse_document(markdown)
+        url_starts = document.url_starts
+        page_dir = None
+        for node in range(len(document)):
+            if url_starts[node] < 0:
+                continue
+            references += 1
+            reference = document.url(node)
+            if reference[:1] == "/":
+                key = reference
+            else:
+                if page_dir is None:
+                    page_dir = posixpath.dirname(url)
+                key = (reference, url if reference[:1] in "#?" else page_dir)
+            verdict = verdicts.get(key, MISSING)
+            if verdict is MISSING:
+                target = resolve_reference(textnode.rewrite_url(reference), url)
+                verdict = verdicts[key] = EXTERNAL if target is None else index.check_target(*target)
+            if verdict is None:
+                continue
+            if verdict is EXTERNAL:
+                external += 1
+                continue
+            line = None
+            if not document.flags[node] & DERIVED:
+                line = document.source.count("\n", 0, url_starts[node]) + 1
+            broken.append({
+                "source": src_path,
+                "line": line,
+                "type": "image" if document.tags[node] == IMG else "link",
+                "url": reference,
+                "reason": verdict,
+            })
+    return references, external, broken
+
+# Checks every link and image in the markdown below content_dir against
+# what was published to dest_dir, spreading the pages over jobs worker
+# processes.  URLs are checked as published, so a reference the asset map
+# rewrites is checked under its fingerprinted name.  The broken references
+# come back sorted by source and line.
+def check_links(content_dir: str, dest_dir: str, template_path: str, jobs: int = 1) -> LinkReport:
+    pages = []
+    for rel_path, src_path, _ in walk_files(content_dir):
+        if rel_path.endswith(".md"):
+            pages.append((src_path, page_url(rel_path)))
+    pages.sort()
+    template = read_file(template_path) if os.path.exists(template_path) else ""
+    index = build_path_index(dest_dir, {url for _, url in pages}, template)
+    return check_pages_parallel(pages, index, jobs)
+
+def check_pages_parallel(pages: list[tuple[str, str]], index: PathIndex, jobs: int = 1) -> LinkReport:
+    if jobs <= 1 or len(pages) <= 1:
+        results = [check_pages(pages, index)]
+    else:
+        chunks = chunk_pages(pages, jobs)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(chunks)), initializer=init_worker, initargs=(index, textnode.get_url_map())) as executor:
+            results = list(executor.map(check_pages, chunks))
+    report = LinkReport()
+    for references, external, broken in results:
+        report.references += references
+        report.external += external
+        report.broken.extend(broken)
+    report.broken.sort(key=lambda entry: (entry["source"], entry["line"] or 0, entry["url"]))
+    return report
+
+# Writes the broken references as a JSON list to path, or for "-" to stdout
+# (sys.stdout unless given).
+def write_link_report(report: LinkReport, path: str, stdout=None):
+    text = json.dumps(report.broken, indent=1) + "\n"
+    if path == "-":
+        (stdout or sys.stdout).write(text)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
@@ -1,8 +1,126 @@
-from static_files import copy_to_public
+import argparse
+import contextlib
+import os
+import sys
 
-def main():
-  copy_to_public()
+import devserver
+import instrument
+from critical_css import build_style_index, set_style_index
+from compress import precompress_tree
+from fingerprint import ASSET_MAP_NAME, fingerprint_tree, remove_fingerprinted
+from images import IMAGE_SIZES_PATH, image_sizes, image_sources, process_images, write_image_sizes
+from linkcheck import check_links, write_link_report
+from pages import generate_pages, template_dependencies
+from processing import set_asset_map, set_image_sizes
+from search import SEARCH_TERMS_DIR, set_terms_dir
+from static_files import copy_to_public, print_report, PublishMode
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(prog="main.py", description="Build the site from static/ and content/ into public/")
+  parser.add_argument("-o", "--output", default="public", help="directory to build into (default: %(default)s)")
+  parser.add_argument("-j", "--jobs", type=int, default=1, help="render pages on N worker processes (0 means one per CPU)")
+  parser.add_argument("--copy-workers", type=int, metavar="N", help="copy static files on N threads (default: 4 per CPU, at most 32)")
+  parser.add_argument("--async-io", action="store_true", help="overlap reading sources and writing pages with rendering, on I/O threads")
+  parser.add_argument("--fingerprint", action="store_true", help="publish static files under content-hashed names and rewrite references to them")
+  parser.add_argument("--link", action="store_true", help="publish static files as hardlinks into a content-addressed store in .cache/ instead of copies")
+  parser.add_argument("--optimize-images", action="store_true", help="losslessly shrink PNGs and give <img> tags their dimensions and lazy loading")
+  parser.add_argument("--minify", action="store_true", help="minify the HTML rendered from markdown (whitespace, attribute quotes, optional closing tags)")
+  parser.add_argument("--critical-css", action="store_true", help="inline the stylesheet rules each page uses and load the full stylesheet without blocking")
+  parser.add_argument("--search", action="store_true", help="build a sharded client-side search index of the pages into search/ in the output")
+  parser.add_argument("--check-links", metavar="PATH", help="check every link and image in the pages against the output and write the broken ones to PATH as JSON (- for stdout)")
+  parser.add_argument("--precompress", action="store_true", help="write .gz (and .zst, where available) siblings of compressible files in the output")
+  parser.add_argument("--profile", metavar="PATH", help="time each build stage, print a summary table and write a Chrome trace to PATH")
+  parser.add_argument("-q", "--quiet", action="store_true", help="don't list each copied file")
+  parser.add_argument("--progress", action="store_true", help="show running counts on one status line instead of listing each file")
+  parser.add_argument("--watch", action="store_true", help="after building, rebuild whatever changes until interrupted")
+  parser.add_argument("--serve", action="store_true", help="like --watch, and also serve public/ with live reload")
+  parser.add_argument("--log-requests", action="store_true", help="with --serve, print a line per request served")
+  parser.add_argument("--host", default="127.0.0.1", help="address for --serve (default: %(default)s)")
+  parser.add_argument("--port", type=int, default=8888, help="port for --serve (default: %(default)s)")
+  parser.add_argument("--interval", type=float, default=0.1, help="seconds between change checks (default: %(default)s)")
+  args = parser.parse_args(argv)
+  if args.jobs < 0:
+    parser.error("--jobs must be 0 or more")
+  if args.jobs == 0:
+    args.jobs = os.cpu_count() or 1
+  if args.link and args.fingerprint:
+    parser.error("--link can't be combined with --fingerprint")
+  if args.copy_workers is not None and args.copy_workers < 1:
+    parser.error("--copy-workers must be 1 or more")
+  return args
+
+# stdout is where --check-links - writes its report (sys.stdout by default).
+def build(args: argparse.Namespace, stdout=None):
+  verbose = not (args.quiet or args.progress)
+  asset_map = None
+  sizes = None
+  sources = None
+  if args.optimize_images:
+    with instrument.stage("images"):
+      images = process_images("static")
+    sizes = image_sizes(images)
+    sources = image_sources(images)
+    write_image_sizes(sizes)
+  with instrument.stage("static"):
+    if args.fingerprint:
+      print("Fingerprinting static files into public directory...")
+      report, asset_map = fingerprint_tree("static", args.output, workers=args.copy_workers, sources=sources)
+      print_report(report, verbose)
+    else:
+      report = remove_fingerprinted(args.output)
+      if report.changed():
+        print("Removing fingerprinted static files from public directory...")
+        print_report(report, verbose)
+      copy_to_public(PublishMode.LINK if args.link else PublishMode.SYNC, workers=args.copy_workers, verbose=verbose, public_dir=args.output, sources=sources)
+  set_asset_map(asset_map)
+  set_image_sizes(sizes)
+  set_style_index(build_style_index("template.html", args.output) if args.critical_css else None)
+  set_terms_dir(SEARCH_TERMS_DIR if args.search else None)
+  if os.path.isdir("content"):
+    print("Generating pages...")
+    deps = template_dependencies("template.html")
+    if args.fingerprint:
+      deps.append(os.path.join(args.output, ASSET_MAP_NAME))
+    if args.optimize_images:
+      deps.append(IMAGE_SIZES_PATH)
+    with instrument.stage("pages"):
+      report = generate_pages("content", "template.html", args.output, deps=deps, jobs=args.jobs, minify=args.minify, async_io=args.async_io)
+    print(report.summary())
+    if args.check_links:
+      print("Checking links...")
+      with instrument.stage("links"):
+        report = check_links("content", args.output, "template.html", jobs=args.jobs)
+      write_link_report(report, args.check_links, stdout)
+      print(report.summary())
+  if args.precompress:
+    print("Precompressing output files...")
+    with instrument.stage("compress"):
+      report = precompress_tree(args.output)
+    print_report(report, verbose)
+
+# Runs one build with the --profile/--progress instrumentation the
+# arguments ask for.  Shared by main and the build daemon.  With
+# --check-links - stdout carries only the link report, so everything else
+# the build prints goes to stderr.
+def run_build(args: argparse.Namespace):
+  stdout = sys.stdout
+  with contextlib.redirect_stdout(sys.stderr if args.check_links == "-" else stdout):
+    if args.profile or args.progress:
+      instrument.enable(trace=bool(args.profile), progress=sys.stderr if args.progress else None)
+    try:
+      build(args, stdout)
+    finally:
+      profiler = instrument.disable()
+    if args.profile:
+      print(profiler.summary())
+      profiler.write_trace(args.profile)
+      print(f"Wrote trace to {args.profile}")
+
+def main(argv: list[str] = None):
+  args = parse_args(argv)
+  run_build(args)
+  if args.watch or args.serve:
+    devserver.run(serve=args.serve, host=args.host, port=args.port, interval=args.interval, public_dir=args.output, fingerprint=args.fingerprint, link=args.link, optimize_images=args.optimize_images, minify=args.minify, critical_css=args.critical_css, log_requests=args.log_requests)
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
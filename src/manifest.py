@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# save() appends to the journal until it holds this many changes, or an
+# eighth of the entries if that is more, and then rewrites the manifest.
+JOURNAL_MIN_LINES = 256
+
+# A Manifest is a small JSON file mapping a relative path to whatever we
+# remember about it from the last build: at least its size, mtime and content
+# hash.  The size/mtime pair lets us skip re-reading a file that has not been
+# touched, so a no-op build costs one stat per file and no reads.
+#
+# Rewriting the whole file costs as much as building the entries, which on a
+# 50k-page site is most of a one-page rebuild, so small saves append the
+# changed entries to a journal next to it ("<path>.log", one JSON
+# [path, entry or null] per line) instead.  Loading replays the journal;
+# once it is long enough the next save folds it back into the manifest,
+# which is written with sorted keys so it stays stable and diffable.
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.journal_path = path + ".log"
+        self.entries: dict[str, dict] = {}
+        self.changes: dict[str, dict] = {}
+        self.journaled = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        if os.path.exists(self.journal_path):
+            self.replay_journal()
+
+    # A line cut short by a crash ends the replay; its change is lost, which
+    # at worst redoes some work, and the next save rewrites the manifest.
+    def replay_journal(self):
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rel_path, entry = json.loads(line)
+                except ValueError:
+                    self.journaled = -1
+                    return
+                if entry is None:
+                    self.entries.pop(rel_path, None)
+                else:
+                    self.entries[rel_path] = entry
+                self.journaled += 1
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.changes)
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self.entries
+
+    def get(self, rel_path: str) -> dict:
+        return self.entries.get(rel_path)
+
+    def set(self, rel_path: str, entry: dict):
+        if self.entries.get(rel_path) != entry:
+            self.entries[rel_path] = entry
+            self.changes[rel_path] = entry
+
+    def remove(self, rel_path: str):
+        if self.entries.pop(rel_path, None) is not None:
+            self.changes[rel_path] = None
+
+    def paths(self) -> list[str]:
+        return list(self.entries)
+
+    def digest(self, rel_path: str, path: str, stat: os.stat_result) -> str:
+        entry = self.entries.get(rel_path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+        return file_digest(path)
+
+    def save(self):
+        if not self.changes:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        journaled = self.journaled + len(self.changes)
+        if 0 <= self.journaled and os.path.exists(self.path) and journaled <= max(JOURNAL_MIN_LINES, len(self.entries) // 8):
+            lines = "".join(json.dumps([rel_path, entry], separators=(",", ":"), sort_keys=True) + "\n" for rel_path, entry in self.changes.items())
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.journaled = journaled
+        else:
+            tmp_path = self.path + ".tmp"
+            data = json.dumps(self.entries, separators=(",", ":"), sort_keys=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            # The journal goes first: if we stop in between, the old manifest
+            # without its journal only makes the next build redo some work,
+            # while an old journal replayed over the new manifest would undo
+            # changes.
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            os.replace(tmp_path, self.path)
+            self.journaled = 0
+        self.changes = {}
+
+# Writes data as JSON unless the file already holds exactly that, so a file
+# other outputs depend on keeps its mtime (and they stay up to date) when
+# its content is unchanged.  Returns whether it wrote.  compact=True drops
+# the indentation, for files that are served rather than read.
+def write_json_if_changed(path: str, data, compact: bool = False) -> bool:
+    if compact:
+        text = json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    else:
+        text = json.dumps(data, indent=1, sort_keys=True)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,366 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import critical_css
+import instrument
+import search
+import textnode
+from fingerprint import rewrite_html_references
+from htmlnode import HTMLNode
+from manifest import Manifest
+from pipeline import run_pipeline
+from processing import markdown_to_html_node, set_asset_map, set_image_sizes
+from static_files import SyncReport, walk_files, prune_empty_dirs, stat_or_none
+
+PAGES_MANIFEST_PATH = os.path.join(".cache", "pages-manifest.json")
+MAX_CHUNK_SIZE = 256
+STYLESHEET_HREF_RE = re.compile(r"<link[^>]*href=\"/([^\"]+\.css)\"")
+
+def extract_title(markdown: str) -> str:
+    for line in markdown.split("\n"):
+        if line.startswith("# "):
+            return line[2:].strip()
+    raise ValueError("page has no h1 title")
+
+def read_file(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+# The template with its own asset references (stylesheets, scripts, icons)
+# rewritten through the current asset map, like the links in the pages, and
+# its stylesheets deferred while a critical CSS index is set.
+def load_template(template_path: str) -> str:
+    template = read_file(template_path)
+    if textnode.get_url_map() is not None:
+        template = rewrite_html_references(template, textnode.rewrite_url)
+    style_index = critical_css.get_style_index()
+    if style_index is not None:
+        template = style_index.defer_stylesheets(template)
+    return template
+
+# Renders a page's markdown into the template, returning the (head, node,
+# tail) to write: the template around the content, with the title and any
+# critical CSS filled in, and the content's tree.  While a search terms
+# directory is set, the page's terms are left there too.
+def render_page(markdown: str, template: str, dest_path: str) -> tuple[str, HTMLNode, str]:
+    title = extract_title(markdown)
+    node = markdown_to_html_node(markdown)
+    head, _, tail = template.replace("{{ Title }}", title).partition("{{ Content }}")
+    style_index = critical_css.get_style_index()
+    if style_index is not None:
+        with instrument.stage("critical css", traced=False):
+            head = head.replace(critical_css.CRITICAL_CSS_PLACEHOLDER, style_index.critical_css(node), 1)
+    terms_dir = search.get_terms_dir()
+    if terms_dir is not None:
+        with instrument.stage("search terms", traced=False):
+            search.write_page_terms(terms_dir, dest_path, node)
+    return head, node, tail
+
+# Writes through a temporary file so a reader (or a dev server) never sees a
+# half-written page, and an output that is a hardlink is replaced rather than
+# written through.  minify=True minifies the rendered markdown as it is
+# serialized; the template is written as it is.
+def write_page(markdown: str, template: str, dest_path: str, minify: bool = False):
+    head, node, tail = render_page(markdown, template, dest_path)
+    directory = os.path.dirname(dest_path)
+    tmp_path = dest_path + ".tmp"
+    with instrument.stage("write", traced=False):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = instrument.writer(open(tmp_path, "w", encoding="utf-8"))
+    with f:
+        f.write(head)
+        node.write_html(f, minify)
+        f.write(tail)
+    with instrument.stage("write", traced=False):
+        os.replace(tmp_path, dest_path)
+
+# Each page whose output has been written is appended to rendered, when
+# given, so a caller whose build fails part way knows which pages made it.
+def render_pages(template: str, pages: list[tuple[str, str]], minify: bool = False, rendered: list[tuple[str, str]] = None) -> int:
+    for page in pages:
+        src_path, dest_path = page
+        with instrument.stage("page"):
+            with instrument.stage("read", traced=False):
+                markdown = read_file(src_path)
+            write_page(markdown, template, dest_path, minify)
+        instrument.count("pages rendered")
+        if rendered is not None:
+            rendered.append(page)
+    return len(pages)
+
+# render_pages with the reads and writes overlapping the rendering (see
+# pipeline.run_pipeline_async).  Pages are rendered to a string rather than
+# streamed to their file, and are written exactly as write_page would.
+def render_pages_pipelined(template: str, pages: list[tuple[str, str]], minify: bool = False, rendered: list[tuple[str, str]] = None) -> int:
+    def render(markdown: str, dest_path: str) -> str:
+        with instrument.stage("page"):
+            head, node, tail = render_page(markdown, template, dest_path)
+            html = f"{head}{node.to_html(minify)}{tail}"
+        instrument.count("pages rendered")
+        return html
+
+    return run_pipeline(pages, render, done=rendered)
+
+# Worker-side render_pages for a profiled build: collects this chunk's
+# stages and counters and hands them back with the page count.
+def render_pages_profiled(template: str, pages: list[tuple[str, str]], minify: bool = False, async_io: bool = False) -> tuple[int, dict]:
+    instrument.enable()
+    try:
+        count = (render_pages_pipelined if async_io else render_pages)(template, pages, minify)
+    finally:
+        profiler = instrument.disable()
+    return count, profiler.snapshot()
+
+# Splits the pages into chunks small enough to keep every worker busy until
+# the end (a few chunks per worker) but large enough that the per-task
+# overhead of pickling the template and paths stays negligible.
+def chunk_pages(pages: list[tuple[str, str]], jobs: int) -> list[list[tuple[str, str]]]:
+    size = max(1, min(MAX_CHUNK_SIZE, len(pages) // (jobs * 4)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+# Renders pages on a pool of worker processes.  Workers read their sources
+# and write their outputs themselves, so only paths travel between
+# processes, never rendered HTML.  Every page goes through the same
+# write_page as a serial build, so the output is byte-identical.  With
+# async_io=True each process renders through render_pages_pipelined.
+# rendered gets whole chunks, in order, as their workers finish them.
+def render_pages_parallel(template: str, pages: list[tuple[str, str]], jobs: int, minify: bool = False, async_io: bool = False, rendered: list[tuple[str, str]] = None) -> int:
+    render = render_pages_pipelined if async_io else render_pages
+    if jobs <= 1 or len(pages) <= 1:
+        return render(template, pages, minify, rendered)
+    chunks = chunk_pages(pages, jobs)
+    profiler = instrument.active()
+    initargs = (textnode.get_url_map(), textnode.get_image_sizes(), critical_css.get_style_index(), search.get_terms_dir())
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks)), initializer=init_worker, initargs=initargs) as executor:
+        if profiler is None:
+            results = executor.map(render, [template] * len(chunks), chunks, [minify] * len(chunks))
+        else:
+            results = executor.map(render_pages_profiled, [template] * len(chunks), chunks, [minify] * len(chunks), [async_io] * len(chunks))
+        total = 0
+        for chunk, result in zip(chunks, results):
+            if profiler is not None:
+                result, data = result
+                profiler.merge(data)
+            total += result
+            if rendered is not None:
+                rendered.extend(chunk)
+        return total
+
+# Gives a worker process the asset map, image sizes, stylesheet index and
+# search terms directory the parent renders with, for start methods where it
+# doesn't inherit them.
+def init_worker(url_map: dict[str, str], image_sizes: dict[str, list[int]], style_index: critical_css.StyleIndex, terms_dir: str = None):
+    set_asset_map(url_map)
+    set_image_sizes(image_sizes)
+    critical_css.set_style_index(style_index)
+    search.set_terms_dir(terms_dir)
+
+def generate_page(from_path: str, template_path: str, dest_path: str):
+    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    write_page(read_file(from_path), load_template(template_path), dest_path)
+
+# Stylesheets the template links to (href="/index.css" -> static/index.css),
+# which every page depends on along with the template itself.
+def template_dependencies(template_path: str, static_dir: str = "static") -> list[str]:
+    deps = [template_path]
+    for href in STYLESHEET_HREF_RE.findall(read_file(template_path)):
+        path = os.path.join(static_dir, *href.split("/"))
+        if os.path.exists(path):
+            deps.append(path)
+    return deps
+
+# rel_path uses "/" separators, as produced by walk_files.
+def output_path(rel_path: str, dest_dir: str) -> str:
+    if rel_path.endswith(".md"):
+        root = rel_path[:-3]
+    else:
+        root, _ = os.path.splitext(rel_path)
+    return f"{dest_dir}/{root}.html"
+
+# Incrementally renders every .md file below content_dir into dest_dir.
+#
+# The manifest records, for each source, its size, mtime and content hash,
+# its output path and a combined hash of the shared dependencies (the
+# template and its stylesheets) it was rendered with; dependencies get their
+# own size/mtime/hash entries.  A page is re-rendered only when its source or
+# one of its dependencies changed or its output is missing.  The manifest
+# also records the mtime of each directory pages are written to (keyed by
+# its path and a trailing "/"): removing a file changes its directory's
+# mtime, so the outputs in a directory whose mtime is unchanged are known to
+# exist without a stat each, and a rebuild after editing one page costs a
+# stat per source and output directory plus one render.  Outputs of
+# deleted sources are removed.  With jobs > 1 the pages that need
+# rendering are spread over that many worker processes; async_io=True
+# overlaps their reads and writes with rendering.  While a search terms
+# directory is set, the search index is updated too.  Switching minify
+# or critical CSS on or off re-renders every page.
+def generate_pages(content_dir: str, template_path: str, dest_dir: str, manifest_path: str = PAGES_MANIFEST_PATH, deps: list[str] = None, jobs: int = 1, minify: bool = False, async_io: bool = False) -> SyncReport:
+    manifest = Manifest(manifest_path)
+    if deps is None:
+        deps = template_dependencies(template_path)
+    deps_hash = dependencies_hash(deps, manifest, render_options(minify))
+
+    files = [file for file in walk_files(content_dir) if file[0].endswith(".md")]
+    report = SyncReport()
+    planned = plan_pages(files, content_dir, dest_dir, manifest, deps_hash, report)
+    dirty = list(planned)
+    rendered = []
+    try:
+        if dirty:
+            render_pages_parallel(load_template(template_path), dirty, jobs, minify, async_io, rendered)
+    finally:
+        record_pages(manifest, planned, rendered)
+
+    seen = {f"{content_dir}/{rel_path}" for rel_path, _, _ in files}
+    prefix = f"{content_dir}/"
+    stale = [key for key in manifest.paths() if key.startswith(prefix) and key not in seen]
+    remove_pages(stale, content_dir, dest_dir, manifest, report)
+    rel_dirs = {rel_path.rpartition("/")[0] for rel_path, _, _ in files}
+    record_output_dirs(manifest, dest_dir, {f"{dest_dir}/{rel_dir}" if rel_dir else dest_dir for rel_dir in rel_dirs})
+    if search.get_terms_dir() is not None:
+        index_pages(manifest, content_dir, dest_dir, dirty)
+
+    manifest.save()
+    report.added.sort()
+    report.updated.sort()
+    report.removed.sort()
+    return report
+
+# Re-renders only the given sources below content_dir, e.g. the ones a file
+# watcher saw change, removing the outputs of sources that no longer exist.
+# The caller owns the manifest and decides when to save it.
+def update_pages(content_dir: str, template_path: str, dest_dir: str, rel_paths: list[str], manifest: Manifest, deps: list[str], minify: bool = False) -> SyncReport:
+    deps_hash = dependencies_hash(deps, manifest, render_options(minify))
+    files = []
+    missing = []
+    for rel_path in rel_paths:
+        if not rel_path.endswith(".md"):
+            continue
+        src_path = os.path.join(content_dir, rel_path)
+        try:
+            files.append((rel_path, src_path, os.stat(src_path)))
+        except FileNotFoundError:
+            missing.append(f"{content_dir}/{rel_path}")
+    report = SyncReport()
+    planned = plan_pages(files, content_dir, dest_dir, manifest, deps_hash, report)
+    dirty = list(planned)
+    rendered = []
+    try:
+        if dirty:
+            render_pages(load_template(template_path), dirty, minify, rendered)
+    finally:
+        record_pages(manifest, planned, rendered)
+    remove_pages([key for key in missing if key in manifest], content_dir, dest_dir, manifest, report)
+    if search.get_terms_dir() is not None:
+        index_pages(manifest, content_dir, dest_dir, dirty)
+    return report
+
+# Brings the search index up to date with the pages the manifest has below
+# content_dir, of which dirty were just rendered.
+def index_pages(manifest: Manifest, content_dir: str, dest_dir: str, dirty: list[tuple[str, str]]) -> SyncReport:
+    prefix = f"{content_dir}/"
+    site = [(key, manifest.get(key)["output"], manifest.get(key)["hash"]) for key in manifest.paths() if key.startswith(prefix)]
+    with instrument.stage("search index"):
+        return search.update_index(site, dest_dir, {dest_path for _, dest_path in dirty})
+
+# The output options a page was rendered with, which count as dependencies.
+def render_options(minify: bool = False) -> list[str]:
+    options = []
+    if minify:
+        options.append("minify")
+    if critical_css.get_style_index() is not None:
+        options.append("critical-css")
+    return options
+
+# With no options nothing is added for them, so manifests written before an
+# option existed stay valid.
+def dependencies_hash(deps: list[str], manifest: Manifest, options: list[str] = ()) -> str:
+    deps_digest = hashlib.blake2b(digest_size=16)
+    for option in options:
+        deps_digest.update(f"{option}\0".encode("utf-8"))
+    for dep in deps:
+        stat = os.stat(dep)
+        digest = manifest.digest(dep, dep, stat)
+        manifest.set(dep, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest})
+        deps_digest.update(f"{dep}\0{digest}\0".encode("utf-8"))
+    return deps_digest.hexdigest()
+
+# Decides which of the given sources need rendering and records them in the
+# report.  Returns their (source, output) paths, in order, each mapped to
+# the manifest key and entry to record once it has been rendered: recording
+# a page before then would leave it marked up to date, with a stale output,
+# if the build failed first.
+def plan_pages(files, content_dir: str, dest_dir: str, manifest: Manifest, deps_hash: str, report: SyncReport) -> dict[tuple[str, str], tuple[str, dict]]:
+    dirty = {}
+    intact_dirs = {}
+    for rel_path, src_path, stat in files:
+        key = f"{content_dir}/{rel_path}"
+        dest_path = output_path(rel_path, dest_dir)
+        entry = manifest.get(key)
+        digest = manifest.digest(key, src_path, stat)
+        if (
+            entry is not None
+            and entry["hash"] == digest
+            and entry["deps"] == deps_hash
+            and entry["output"] == dest_path
+            and output_exists(dest_path, manifest, intact_dirs)
+        ):
+            report.unchanged += 1
+            if entry["mtime_ns"] != stat.st_mtime_ns:
+                manifest.set(key, dict(entry, mtime_ns=stat.st_mtime_ns))
+            continue
+
+        dirty[(src_path, dest_path)] = (key, {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest,
+            "output": dest_path,
+            "deps": deps_hash,
+        })
+        if entry is None:
+            report.added.append(rel_path)
+        else:
+            report.updated.append(rel_path)
+    return dirty
+
+def record_pages(manifest: Manifest, planned: dict[tuple[str, str], tuple[str, dict]], rendered: list[tuple[str, str]]):
+    for page in rendered:
+        manifest.set(*planned[page])
+
+# intact_dirs caches, per output directory, whether its mtime still matches
+# the one recorded after the last full build.
+def output_exists(dest_path: str, manifest: Manifest, intact_dirs: dict[str, bool]) -> bool:
+    directory = dest_path.rpartition("/")[0]
+    intact = intact_dirs.get(directory)
+    if intact is None:
+        entry = manifest.get(directory + "/")
+        dir_stat = stat_or_none(directory)
+        intact = entry is not None and dir_stat is not None and dir_stat.st_mtime_ns == entry["mtime_ns"]
+        intact_dirs[directory] = intact
+    return intact or os.path.exists(dest_path)
+
+# Records the mtimes of dirs, the output directories of every page below
+# dest_dir, and forgets the ones no page is written to any more.  Only a
+# full build may do this, having checked or written every output in them.
+def record_output_dirs(manifest: Manifest, dest_dir: str, dirs: set[str]):
+    prefix = f"{dest_dir}/"
+    for key in manifest.paths():
+        if key.endswith("/") and (key == prefix or key.startswith(prefix)) and key[:-1] not in dirs:
+            manifest.remove(key)
+    for directory in dirs:
+        dir_stat = stat_or_none(directory)
+        if dir_stat is not None:
+            manifest.set(directory + "/", {"mtime_ns": dir_stat.st_mtime_ns})
+
+def remove_pages(keys: list[str], content_dir: str, dest_dir: str, manifest: Manifest, report: SyncReport):
+    prefix = f"{content_dir}/"
+    for key in keys:
+        entry = manifest.get(key)
+        if os.path.exists(entry["output"]):
+            os.remove(entry["output"])
+        prune_empty_dirs(os.path.dirname(entry["output"]), dest_dir)
+        manifest.remove(key)
+        report.removed.append(key[len(prefix):])
@@ -1,18 +1,23 @@
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, end_tag, iter_html, iter_html_nodes
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: list[HTMLNode], props: dict[str, str] = None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self) -> str:
+    def to_html(self, minify: bool = False) -> str:
+        return "".join(iter_html(self, minify))
+
+    def html_parts(self, minify: bool = False) -> tuple[str, list[HTMLNode], str]:
         if self.tag is None:
             raise ValueError("ParentNode tag cannot be None")
         if self.children is None:
             raise ValueError("ParentNode children cannot be None")
-        return f"<{self.tag}{self.props_to_html()}>{self.children_to_html()}</{self.tag}>"
-        
-    def children_to_html(self) -> str:
-        return "".join([child.to_html() for child in self.children])
+        return self.start_tag(minify), self.children, end_tag(self.tag)
+
+    def children_to_html(self, minify: bool = False) -> str:
+        return "".join(iter_html_nodes(self.children, minify, self.tag))
     
     def __repr__(self) -> str:
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+# Threads the reads and writes run on.  They spend their time blocked on the
+# disk, not holding the GIL, so more threads than CPUs pays off.
+IO_WORKERS = 8
+# Items each queue holds before the stage feeding it waits: reads in flight
+# ahead of rendering, and rendered outputs waiting to be written.
+QUEUE_SIZE = 32
+
+def read_text(path: str) -> str:
+    with instrument.stage("read", traced=False):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+# Writes through a temporary file, like write_page.
+def write_text(path: str, text: str):
+    with instrument.stage("write", traced=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+# Turns each (source, output) into render(source text, output path) written
+# to output, as three stages connected by bounded queues:
+#
+#   read ahead -> [reads] -> render -> [writes] -> writers
+#
+# Reads and writes run on a pool of io_workers threads, so while a page is
+# rendered (on the event loop's thread) the next queue_size sources are
+# being read and earlier outputs written.  A full queue makes the stage
+# feeding it wait, so memory stays bounded however far the disk falls
+# behind.  Pages are rendered one at a time in the order given, whatever
+# order their reads finish in, so the output is the same as rendering them
+# serially.  The first error cancels the rest and is raised.  Returns the
+# number of outputs written; each item whose output has been written is
+# also appended to done, when given.
+async def run_pipeline_async(items: list[tuple[str, str]], render, io_workers: int = IO_WORKERS, queue_size: int = QUEUE_SIZE, done: list[tuple[str, str]] = None) -> int:
+    loop = asyncio.get_running_loop()
+    reads = asyncio.Queue(queue_size)
+    writes = asyncio.Queue(queue_size)
+    writers = max(1, io_workers // 2)
+    written = 0
+
+    with ThreadPoolExecutor(max_workers=io_workers) as executor:
+        async def read_ahead():
+            for item in items:
+                await reads.put((loop.run_in_executor(executor, read_text, item[0]), item))
+            await reads.put(None)
+
+        async def render_all():
+            while (entry := await reads.get()) is not None:
+                text, item = entry
+                output = render(await text, item[1])
+                await writes.put((item, output))
+            for _ in range(writers):
+                await writes.put(None)
+
+        async def write_all():
+            nonlocal written
+            while (entry := await writes.get()) is not None:
+                item, output = entry
+                await loop.run_in_executor(executor, write_text, item[1], output)
+                written += 1
+                if done is not None:
+                    done.append(item)
+
+        tasks = [asyncio.create_task(read_ahead()), asyncio.create_task(render_all())]
+        tasks.extend(asyncio.create_task(write_all()) for _ in range(writers))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Reads already submitted still complete; nobody awaits them.
+            while not reads.empty():
+                item = reads.get_nowait()
+                if item is not None:
+                    item[0].cancel()
+            raise
+    return written
+
+def run_pipeline(items: list[tuple[str, str]], render, io_workers: int = IO_WORKERS, queue_size: int = QUEUE_SIZE, done: list[tuple[str, str]] = None) -> int:
+    return asyncio.run(run_pipeline_async(items, render, io_workers, queue_size, done))
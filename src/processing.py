@@ -1,6 +1,10 @@
-from src.htmlnode import HTMLNode
-from src.parentnode import ParentNode
+from block_cache import BlockCache
+from htmlnode import HTMLNode
+from parentnode import ParentNode
+import mmap
+import os
 import re
+import textnode
 from textnode import TextNode, TextType
 from enum import Enum
 
@@ -9,6 +13,21 @@ LINK_RE = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
 HEADING_RE = r"^#{1,6} "
 UNORDERED_LIST_RE = r"^[\*\-\+] "
 
+IMAGE_PATTERN = re.compile(IMAGE_RE)
+LINK_PATTERN = re.compile(LINK_RE)
+HEADING_PATTERN = re.compile(HEADING_RE)
+UNORDERED_LIST_PATTERN = re.compile(UNORDERED_LIST_RE)
+
+INLINE_DELIMITERS = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
+INLINE_START_PATTERN = re.compile(r"\*\*|[_`\[]|!\[")
+LINK_START_PATTERN = re.compile(r"!?\[")
+# Heading tags by level, so each heading reuses one interned tag string.
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# Block cache consulted by markdown_to_html_node and write_blocks_html when
+# no cache is passed explicitly.  Off by default; see set_block_cache.
+_block_cache = None
+
 def split_nodes_on(nodes: list[TextNode], split_on: str, text_type: TextType) -> list[TextNode]:
   new_nodes = []
   for node in nodes:
@@ -39,33 +58,84 @@ def split_nodes_on_regex(nodes: list[TextNode], regex: re.Pattern, text_type: Te
   for node in nodes:
     found = []
     text = node.text
+    pos = 0
 
-    while True:
-      match = regex.search(text)
-      if match is None:
-        break
+    for match in regex.finditer(text):
       # Add the text before the match
-      if match.start() > 0:
-        found.append(TextNode(text[:match.start()], TextType.PLAIN))
+      if match.start() > pos:
+        found.append(TextNode(text[pos:match.start()], TextType.PLAIN))
       found.append(TextNode(match.group(1), text_type, match.group(2)))
-      text = text[match.end():]
+      pos = match.end()
 
     if found:
-      if len(text) > 0:
-        found.append(TextNode(text, TextType.PLAIN))
+      if pos < len(text):
+        found.append(TextNode(text[pos:], TextType.PLAIN))
       new_nodes.extend(found)
     else:
       new_nodes.append(node)
     
   return new_nodes
 
+# Scans text[start:end] once, left to right, and yields the inline spans it
+# contains as (text_type, start, end, url_start, url_end) offsets into text;
+# the url offsets are None for everything but links and images.  At each
+# position the first construct to open wins: the body of a code span is
+# taken literally up to its closing delimiter, the body of a bold or italic
+# span is scanned again for links and images only, and a "[" or "![" that
+# doesn't form a complete link or image is ordinary text.  Text between the
+# spans gets text_type.  Working with offsets means no intermediate strings
+# are sliced off while scanning.
+def tokenize_inline(text: str, start: int = 0, end: int = None, text_type: TextType = TextType.PLAIN, pattern: re.Pattern = INLINE_START_PATTERN):
+  if end is None:
+    end = len(text)
+  pos = plain_start = start
+  emitted = False
+  while True:
+    match = pattern.search(text, pos, end)
+    if match is None:
+      break
+    token = match.group()
+    token_start = match.start()
+
+    if token[-1] == "[":
+      if token == "![":
+        span = IMAGE_PATTERN.match(text, token_start, end)
+        link_type = TextType.IMAGE
+      else:
+        span = LINK_PATTERN.match(text, token_start, end)
+        link_type = TextType.LINK
+      if span is None:
+        pos = token_start + 1
+        continue
+      if token_start > plain_start:
+        yield text_type, plain_start, token_start, None, None
+      yield link_type, span.start(1), span.end(1), span.start(2), span.end(2)
+      emitted = True
+      pos = plain_start = span.end()
+      continue
+
+    close = text.find(token, match.end(), end)
+    if close == -1:
+      raise ValueError(f"Unmatched inline delimiter {token!r}")
+    if token_start > plain_start:
+      yield text_type, plain_start, token_start, None, None
+    if token == "`":
+      yield TextType.CODE, match.end(), close, None, None
+    else:
+      yield from tokenize_inline(text, match.end(), close, INLINE_DELIMITERS[token], LINK_START_PATTERN)
+    emitted = True
+    pos = plain_start = close + len(token)
+
+  if plain_start < end or not emitted:
+    yield text_type, plain_start, end, None, None
+
 def text_to_nodes(text: str) -> list[TextNode]:
-  new_nodes = [TextNode(text, TextType.PLAIN)]
-  new_nodes = split_nodes_on(new_nodes, "**", TextType.BOLD)
-  new_nodes = split_nodes_on(new_nodes, "_", TextType.ITALIC)
-  new_nodes = split_nodes_on(new_nodes, "`", TextType.CODE)
-  new_nodes = split_nodes_on_regex(new_nodes, re.compile(IMAGE_RE), TextType.IMAGE)
-  new_nodes = split_nodes_on_regex(new_nodes, re.compile(LINK_RE), TextType.LINK)
+  new_nodes = []
+  for text_type, start, end, url_start, url_end in tokenize_inline(text):
+    if url_start is None:
+      new_nodes.append(TextNode(text[start:end], text_type))
+    else:
+      new_nodes.append(TextNode(text[start:end], text_type, text[url_start:url_end]))
   return new_nodes
 
 def markdown_to_blocks(markdown: str) -> list[str]:
@@ -77,6 +147,52 @@ def markdown_to_blocks(markdown: str) -> list[str]:
       result.append(val)
   return result
 
+# Streaming counterpart of markdown_to_blocks: consumes lines (e.g. an open
+# text file) and yields the same blocks one at a time, holding only the lines
+# of the current block.  A block ends at a line that is completely empty,
+# which is exactly where split("\n\n") would cut.
+def iter_markdown_blocks(lines):
+  block = []
+  for line in lines:
+    if line == "\n" or line == "":
+      if block:
+        val = "".join(block).strip()
+        if val != "":
+          yield val
+        block = []
+      continue
+    block.append(line)
+  if block:
+    val = "".join(block).strip()
+    if val != "":
+      yield val
+
+# Like iter_markdown_blocks, but searches for block boundaries directly in a
+# memory mapped file so only one block at a time is decoded.  Unlike reading
+# in text mode, "\r\n" line endings are not translated.
+def iter_markdown_blocks_mmap(path: str):
+  with open(path, "rb") as f:
+    if os.fstat(f.fileno()).st_size == 0:
+      return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      pos = 0
+      size = len(mm)
+      while pos <= size:
+        end = mm.find(b"\n\n", pos)
+        if end == -1:
+          end = size
+        val = mm[pos:end].decode("utf-8").strip()
+        if val != "":
+          yield val
+        pos = end + 2
+
+def iter_markdown_file_blocks(path: str, use_mmap: bool = False):
+  if use_mmap:
+    yield from iter_markdown_blocks_mmap(path)
+    return
+  with open(path, "r", encoding="utf-8") as f:
+    yield from iter_markdown_blocks(f)
+
 class BlockType(Enum):
   PARAGRAPH = 1
   HEADING = 2
@@ -85,48 +201,78 @@ class BlockType(Enum):
   UNORDERED_LIST = 5
   ORDERED_LIST = 6
   
-def block_to_block_type(block: str) -> BlockType:
+# Prefixes "1. ", "2. ", ... for ordered list items, built once rather than
+# formatted again for every line of every list.
+_ordered_prefixes = ["", "1. "]
+
+def _ordered_prefix(num: int) -> str:
+  while len(_ordered_prefixes) <= num:
+    _ordered_prefixes.append(f"{len(_ordered_prefixes)}. ")
+  return _ordered_prefixes[num]
+
+# Classifies a block with one split and one scan of its lines.  The first
+# line already decides which type the block can be (a quote starts with ">",
+# an unordered list with "*", "-" or "+", an ordered list with "1. "), so the
+# scan only has to check the remaining lines against that one candidate and
+# stops at the first line that rules it out.  Quote content is collected as
+# the lines are checked.  Returns the block type, the block's lines and the
+# quote content (None for the other types).
+def scan_block(block: str) -> tuple[BlockType, list[str], list[str]]:
   lines = block.split("\n")
+  first = lines[0]
 
-  if re.match(HEADING_RE, block):
-    return BlockType.HEADING
+  if first.startswith("#") and HEADING_PATTERN.match(block):
+    return BlockType.HEADING, lines, None
 
-  if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-    return BlockType.CODE
+  if first.startswith("```"):
+    if len(lines) > 1 and lines[-1].startswith("```"):
+      return BlockType.CODE, lines, None
 
-  is_quote = True
-  for line in lines:
-    if not line.startswith(">"):
-      is_quote = False
-      break
-  if is_quote:
-    return BlockType.QUOTE
+  elif first.startswith(">"):
+    quote_items = []
+    for line in lines:
+      if not line.startswith(">"):
+        return BlockType.PARAGRAPH, lines, None
+      quote_items.append(line.lstrip(">").strip())
+    return BlockType.QUOTE, lines, quote_items
 
-  is_unordered_list = True
-  for line in lines:
-    line = line.strip()
-    if line == "":
-      continue
-    if not re.match(UNORDERED_LIST_RE, line):
-      is_unordered_list = False
-      break
-  if is_unordered_list:
-    return BlockType.UNORDERED_LIST
+  # List items may be indented, and a block that wasn't stripped may start
+  # with blank lines, so lists are recognised by the first non-blank line.
+  lead = first.strip()
+  if lead == "":
+    lead = next((line.strip() for line in lines if line.strip() != ""), "")
+
+  if lead == "" or lead[0] in "*-+":
+    for line in lines:
+      line = line.strip()
+      if line != "" and not (len(line) > 1 and line[1] == " " and line[0] in "*-+"):
+        return BlockType.PARAGRAPH, lines, None
+    return BlockType.UNORDERED_LIST, lines, None
+
+  elif lead.startswith("1. "):
+    expected_num = 1
+    for line in lines:
+      line = line.strip()
+      if line == "":
+        continue
+      if not line.startswith(_ordered_prefix(expected_num)):
+        return BlockType.PARAGRAPH, lines, None
+      expected_num += 1
+    return BlockType.ORDERED_LIST, lines, None
+
+  return BlockType.PARAGRAPH, lines, None
 
-  is_ordered_list = True
-  expected_num = 1
+def _ordered_list_items(lines: list[str]) -> list[str]:
+  items = []
   for line in lines:
-    line = line.strip()
-    if line == "":
-      continue
-    if not line.startswith(f"{expected_num}. "):
-      is_ordered_list = False
-      break
-    expected_num += 1
-  if is_ordered_list:
-    return BlockType.ORDERED_LIST
+    _, sep, text = line.partition(". ")
+    if not sep:
+      raise ValueError(f"invalid ordered list item: {line!r}")
+    items.append(text)
+  return items
 
-  return BlockType.PARAGRAPH
+def block_to_block_type(block: str) -> BlockType:
+  return scan_block(block)[0]
 
 def text_to_html_nodes(text: str) -> list[HTMLNode]:
   text_nodes = text_to_nodes(text)
@@ -152,7 +298,8 @@ def heading_to_html_node(block: str) -> HTMLNode:
     raise ValueError(f"Invalid heading level: {level}")
   text = block[level + 1 :]
   children = text_to_html_nodes(text)
-  return ParentNode(f"h{level}", children)
+  tag = HEADING_TAGS[level - 1] if 1 <= level <= len(HEADING_TAGS) else f"h{level}"
+  return ParentNode(tag, children)
 
 def code_to_html_node(block: str) -> HTMLNode:
   if not block.startswith("```") or not block.endswith("```"):
@@ -164,24 +311,18 @@ def code_to_html_node(block: str) -> HTMLNode:
   code = ParentNode("code", [child])
   return ParentNode("pre", [code])
 
-def ordered_list_to_html_node(block: str) -> HTMLNode:
-  lines = block.split("\n")
+def _list_to_html_node(tag: str, items: list[str]) -> HTMLNode:
   children = []
-  for line in lines:
-    parts = line.split(". ", 1)
-    text = parts[1]
+  for text in items:
     nodes = text_to_html_nodes(text)
     children.append(ParentNode("li", nodes))
-  return ParentNode("ol", children)
+  return ParentNode(tag, children)
+
+def ordered_list_to_html_node(block: str) -> HTMLNode:
+  return _list_to_html_node("ol", _ordered_list_items(block.split("\n")))
 
 def unordered_list_to_html_node(block: str) -> HTMLNode:
-  lines = block.split("\n")
-  children = []
-  for line in lines:
-    text = line[2:]
-    nodes = text_to_html_nodes(text)
-    children.append(ParentNode("li", nodes))
-  return ParentNode("ul", children)
+  return _list_to_html_node("ul", [line[2:] for line in block.split("\n")])
 
 def quote_to_html_node(block: str) -> HTMLNode:
   lines = block.split("\n")
@@ -194,27 +335,76 @@ def quote_to_html_node(block: str) -> HTMLNode:
   children = text_to_html_nodes(content)
   return ParentNode("blockquote", children)
 
+# Builds a block's node straight from what scan_block collected, without
+# splitting or scanning the block again.
 def block_to_html_node(block: str) -> HTMLNode:
-  block_type = block_to_block_type(block)
+  block_type, lines, items = scan_block(block)
   if block_type == BlockType.PARAGRAPH:
-    return paragraph_to_html_node(block)
+    return ParentNode("p", text_to_html_nodes(" ".join(lines)))
   elif block_type == BlockType.HEADING:
     return heading_to_html_node(block)
   elif block_type == BlockType.CODE:
     return code_to_html_node(block)
   elif block_type == BlockType.QUOTE:
-    return quote_to_html_node(block)
+    return ParentNode("blockquote", text_to_html_nodes(" ".join(items)))
   elif block_type == BlockType.ORDERED_LIST:
-    return ordered_list_to_html_node(block)
+    return _list_to_html_node("ol", _ordered_list_items(lines))
   elif block_type == BlockType.UNORDERED_LIST:
-    return unordered_list_to_html_node(block)
+    return _list_to_html_node("ul", [line[2:] for line in lines])
   else:
     raise ValueError(f"Unknown block type: {block_type}")
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
+def set_block_cache(cache: BlockCache):
+  global _block_cache
+  _block_cache = cache
+
+def get_block_cache() -> BlockCache:
+  return _block_cache
+
+# Installs the URL map link and image URLs are rewritten through (see
+# textnode.set_url_map).  Cached blocks were rendered with the old map, so
+# the block cache is emptied whenever the map actually changes.
+def set_asset_map(asset_map: dict[str, str]):
+  if (asset_map or None) == textnode.get_url_map():
+    return
+  textnode.set_url_map(asset_map)
+  if _block_cache is not None:
+    _block_cache.clear()
+
+# Same for the image sizes <img> tags are annotated with (see
+# textnode.set_image_sizes); None turns the annotations off.
+def set_image_sizes(image_sizes: dict[str, list[int]]):
+  if image_sizes == textnode.get_image_sizes():
+    return
+  textnode.set_image_sizes(image_sizes)
+  if _block_cache is not None:
+    _block_cache.clear()
+
+def cached_block_to_html_node(block: str, cache: BlockCache = None) -> HTMLNode:
+  if cache is None:
+    cache = _block_cache
+  if cache is None:
+    return block_to_html_node(block)
+  return cache.get_or_render(block, block_to_html_node)
+
+def markdown_to_html_node(markdown: str, cache: BlockCache = None) -> HTMLNode:
   blocks = markdown_to_blocks(markdown)
   children = []
   for block in blocks:
-    html_node = block_to_html_node(block)
+    html_node = cached_block_to_html_node(block, cache)
     children.append(html_node)
-  return ParentNode("div", children, None)
\ No newline at end of file
+  return ParentNode("div", children, None)
+
+# Renders blocks to fp as they arrive, producing the same markup as
+# markdown_to_html_node(markdown).to_html() without ever holding more than
+# one block's tree.  Returns the number of characters written.
+def write_blocks_html(blocks, fp, cache: BlockCache = None) -> int:
+  written = fp.write("<div>")
+  for block in blocks:
+    written += cached_block_to_html_node(block, cache).write_html(fp)
+  written += fp.write("</div>")
+  return written
+
+def markdown_file_to_html(src_path: str, dst_path: str, use_mmap: bool = False, cache: BlockCache = None) -> int:
+  with open(dst_path, "w", encoding="utf-8") as out:
+    return write_blocks_html(iter_markdown_file_blocks(src_path, use_mmap), out, cache)
\ No newline at end of file
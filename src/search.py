@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import instrument
+from htmlnode import HTMLNode
+from manifest import Manifest, write_json_if_changed
+from processing import markdown_to_html_node
+from static_files import SyncReport, remove_if_exists
+
+SEARCH_MANIFEST_PATH = os.path.join(".cache", "search-manifest.json")
+SEARCH_TERMS_DIR = os.path.join(".cache", "search-terms")
+SEARCH_DIR_NAME = "search"
+SEARCH_META_NAME = "index.json"
+# Terms are sharded by their first PREFIX_LENGTH characters, so a query
+# loads one small file per term instead of the whole index.
+PREFIX_LENGTH = 2
+# Longer "words" are hashes, base64 and the like, not search terms.
+MAX_TERM_LENGTH = 40
+TERM_PATTERN = re.compile(r"\w+")
+SHARD_NAME_PATTERN = re.compile(r"[a-z0-9]+")
+# Positions update_index collects from pages before it moves them out to
+# per-shard spill files, which bounds its memory whatever the site's size.
+SPILL_POSITIONS = 1 << 16
+
+# Where pages leave the terms collected while rendering for the index to
+# pick up, or None (the default) when no search index is built.
+_terms_dir = None
+
+def set_terms_dir(path: str):
+    global _terms_dir
+    _terms_dir = path
+
+def get_terms_dir() -> str:
+    return _terms_dir
+
+# The text of a rendered page, leaf by leaf in document order.
+def node_texts(node: HTMLNode):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children is None:
+            if node.value:
+                yield node.value
+        else:
+            stack.extend(reversed(node.children))
+
+# The text of the page's first <h1>, or "" if it has none.
+def node_title(node: HTMLNode) -> str:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag == "h1":
+            return "".join(node_texts(node)).strip()
+        if node.children:
+            stack.extend(reversed(node.children))
+    return ""
+
+# {term: [word positions]} for a page: terms are casefolded words, and a
+# position counts words from the start of the page.
+def page_terms(node: HTMLNode) -> dict[str, list[int]]:
+    terms = {}
+    position = 0
+    for text in node_texts(node):
+        for match in TERM_PATTERN.finditer(text):
+            term = match.group().casefold()
+            if len(term) <= MAX_TERM_LENGTH:
+                terms.setdefault(term, []).append(position)
+            position += 1
+    return terms
+
+def shard_name(term: str) -> str:
+    prefix = term[:PREFIX_LENGTH]
+    if SHARD_NAME_PATTERN.fullmatch(prefix):
+        return prefix
+    # Other prefixes are hex-encoded UTF-8, which is longer than any plain
+    # prefix, so the names can't collide.
+    return "x" + prefix.encode("utf-8").hex()
+
+def terms_path(terms_dir: str, dest_path: str) -> str:
+    return os.path.join(terms_dir, hashlib.blake2b(dest_path.encode("utf-8"), digest_size=16).hexdigest() + ".json")
+
+# Called by write_page (in whichever process renders the page), so the index
+# is built from the tree the page was rendered from rather than by parsing
+# the page again.
+def write_page_terms(terms_dir: str, dest_path: str, node: HTMLNode):
+    os.makedirs(terms_dir, exist_ok=True)
+    path = terms_path(terms_dir, dest_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"title": node_title(node), "terms": page_terms(node)}, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+# The (title, terms) of a page: those its render left in terms_dir (which
+# are consumed), or else from parsing its source.
+def load_page_terms(src_path: str, dest_path: str, terms_dir: str, rendered: bool) -> tuple[str, dict[str, list[int]]]:
+    path = terms_path(terms_dir, dest_path)
+    if rendered and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        os.remove(path)
+        return data["title"], data["terms"]
+    remove_if_exists(path)
+    with open(src_path, "r", encoding="utf-8") as f:
+        node = markdown_to_html_node(f.read())
+    return node_title(node), page_terms(node)
+
+# [page id, first position, gap to the next, ...]: positions are stored as
+# gaps, which are mostly one or two digits.
+def encode_postings(page_id: int, positions: list[int]) -> list[int]:
+    postings = [page_id]
+    previous = 0
+    for position in positions:
+        postings.append(position - previous)
+        previous = position
+    return postings
+
+def shard_path(search_dir: str, name: str) -> str:
+    return os.path.join(search_dir, f"{name}.json")
+
+def _read_shard(path: str) -> dict[str, list[list[int]]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+# Postings moved out of memory while update_index merges pages: one
+# temporary file that each spill appends a {term: postings} line per shard
+# to, and the offsets of each shard's lines, so a shard's postings are read
+# back with a seek per spill and the file is opened once.
+class _PostingsSpill:
+    def __init__(self, directory: str):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        self.offsets: dict[str, list[int]] = {}
+
+    def close(self):
+        self.file.close()
+
+    # Appends the postings collected so far and empties additions.
+    def spill(self, additions: dict[str, dict[str, list[list[int]]]]):
+        for name, terms in additions.items():
+            self.offsets.setdefault(name, []).append(self.file.tell())
+            self.file.write(json.dumps(terms, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n")
+        additions.clear()
+
+    def read(self, name: str):
+        for offset in self.offsets.pop(name, ()):
+            self.file.seek(offset)
+            yield json.loads(self.file.readline())
+
+# Brings the search index in dest_dir/search/ up to date with pages, the
+# (source, output, source hash) of every page on the site, of which the
+# outputs in rendered were just rendered.  The index is:
+#
+#   index.json   {"prefix_length": 2, "pages": [[url, title], ...],
+#                 "shards": [name, ...]}, a page's id being its position
+#                (removed pages leave a null until the id is reused)
+#   <name>.json  {term: [[page id, position, gap, gap...], ...]} for the
+#                terms whose first two characters give the name (see
+#                shard_name), postings in page id order
+#
+# The manifest remembers each page's id, source hash and the shards it has
+# terms in (space-separated, which takes a fraction of the memory of a list
+# of names on a big site), so only pages whose source changed are looked at,
+# and only the shards they had or now have terms in are rewritten; a page
+# keeps its id for as long as it exists.  Pages are merged one at a time
+# from the terms their render left behind, so no page's text is held beyond
+# its own render, and their postings are spilled to disk every
+# SPILL_POSITIONS positions, so at most that many and one shard are in
+# memory at once.  Everything is rebuilt if the index in dest_dir is missing
+# a file.  Returns a report on the shards.
+def update_index(pages: list[tuple[str, str, str]], dest_dir: str, rendered: set[str] = frozenset(), manifest_path: str = SEARCH_MANIFEST_PATH, terms_dir: str = None) -> SyncReport:
+    terms_dir = terms_dir or _terms_dir or SEARCH_TERMS_DIR
+    manifest = Manifest(manifest_path)
+    search_dir = os.path.join(dest_dir, SEARCH_DIR_NAME)
+    known_shards = {name for rel_path in manifest.paths() for name in manifest.get(rel_path)["shards"].split()}
+    rebuild = not os.path.isfile(os.path.join(search_dir, SEARCH_META_NAME)) or not all(os.path.isfile(shard_path(search_dir, name)) for name in known_shards)
+
+    current = set()
+    changed = []
+    for src_path, dest_path, digest in sorted(pages):
+        current.add(src_path)
+        entry = manifest.get(src_path)
+        url = "/" + os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+        if not rebuild and entry is not None and entry["hash"] == digest and entry["url"] == url:
+            if dest_path in rendered:
+                remove_if_exists(terms_path(terms_dir, dest_path))
+            continue
+        changed.append((src_path, dest_path, digest, url))
+    removed = [src_path for src_path in manifest.paths() if src_path not in current]
+
+    # Ids of removed pages are freed before new pages take theirs.
+    stale_ids = set()
+    affected = set(known_shards) if rebuild else set()
+    for src_path in removed:
+        stale_ids.add(manifest.get(src_path)["id"])
+        affected.update(manifest.get(src_path)["shards"].split())
+        manifest.remove(src_path)
+    used_ids = {manifest.get(src_path)["id"] for src_path in manifest.paths()}
+    next_id = 0
+    report = SyncReport()
+    os.makedirs(terms_dir, exist_ok=True)
+    spill = _PostingsSpill(terms_dir)
+    try:
+        additions: dict[str, dict[str, list[list[int]]]] = {}
+        buffered = 0
+        for src_path, dest_path, digest, url in changed:
+            entry = manifest.get(src_path)
+            if entry is not None:
+                page_id = entry["id"]
+                stale_ids.add(page_id)
+                affected.update(entry["shards"].split())
+            else:
+                while next_id in used_ids:
+                    next_id += 1
+                page_id = next_id
+                used_ids.add(page_id)
+            title, terms = load_page_terms(src_path, dest_path, terms_dir, dest_path in rendered)
+            shards = set()
+            for term, positions in terms.items():
+                name = shard_name(term)
+                shards.add(name)
+                additions.setdefault(name, {}).setdefault(term, []).append(encode_postings(page_id, positions))
+                buffered += len(positions)
+            affected.update(shards)
+            manifest.set(src_path, {"id": page_id, "url": url, "title": title, "hash": digest, "shards": " ".join(sorted(shards))})
+            if buffered >= SPILL_POSITIONS:
+                spill.spill(additions)
+                buffered = 0
+
+        live_shards = {name for rel_path in manifest.paths() for name in manifest.get(rel_path)["shards"].split()}
+        for name in sorted(affected):
+            path = shard_path(search_dir, name)
+            existed = os.path.isfile(path)
+            shard = {} if rebuild else _read_shard(path)
+            for term in list(shard):
+                postings = [posting for posting in shard[term] if posting[0] not in stale_ids]
+                if postings:
+                    shard[term] = postings
+                else:
+                    del shard[term]
+            added = set()
+            for terms in spill.read(name):
+                for term, postings in terms.items():
+                    shard.setdefault(term, []).extend(postings)
+                    added.add(term)
+            for term, postings in additions.pop(name, {}).items():
+                shard.setdefault(term, []).extend(postings)
+                added.add(term)
+            for term in added:
+                shard[term].sort()
+            if not shard:
+                if existed:
+                    os.remove(path)
+                    report.removed.append(name)
+                continue
+            if write_json_if_changed(path, shard, compact=True):
+                (report.updated if existed else report.added).append(name)
+            else:
+                report.unchanged += 1
+    finally:
+        spill.close()
+    if rebuild and os.path.isdir(search_dir):
+        for file_name in os.listdir(search_dir):
+            name, ext = os.path.splitext(file_name)
+            if ext == ".json" and file_name != SEARCH_META_NAME and name not in live_shards:
+                os.remove(os.path.join(search_dir, file_name))
+                report.removed.append(name)
+
+    page_list = [None] * (max(used_ids) + 1 if used_ids else 0)
+    for src_path in manifest.paths():
+        entry = manifest.get(src_path)
+        page_list[entry["id"]] = [entry["url"], entry["title"]]
+    while page_list and page_list[-1] is None:
+        page_list.pop()
+    meta = {"prefix_length": PREFIX_LENGTH, "pages": page_list, "shards": sorted(live_shards)}
+    write_json_if_changed(os.path.join(search_dir, SEARCH_META_NAME), meta, compact=True)
+    manifest.save()
+    instrument.count("search pages indexed", len(changed))
+    report.unchanged += len(live_shards) - len(affected & live_shards)
+    return report
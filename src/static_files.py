@@ -1,22 +1,436 @@
+import errno
 import os
 import shutil
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
 
-def copy_to_public():
-    if os.path.exists("public"):
+import instrument
+from manifest import Manifest
+
+STATIC_MANIFEST_PATH = os.path.join(".cache", "static-manifest.json")
+LINK_MANIFEST_PATH = os.path.join(".cache", "link-manifest.json")
+OBJECT_STORE_PATH = os.path.join(".cache", "objects")
+DEFAULT_COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# FICLONE from <linux/fs.h>: share the source extents with the destination
+# (a reflink) on filesystems that support it, such as btrfs and XFS.
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1 << 30
+
+class PublishMode(Enum):
+    FULL = 1
+    SYNC = 2
+    LINK = 3
+
+@dataclass
+class SyncReport:
+    added: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    linked: int = 0
+
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+    def summary(self) -> str:
+        summary = f"{len(self.added)} added, {len(self.updated)} updated, {len(self.removed)} removed, {self.unchanged} unchanged"
+        if self.linked:
+            summary += f", {self.linked} hardlinked"
+        return summary
+
+# With verbose=False only the headline and summary are printed, not a line
+# per file, which at tens of thousands of files costs more than the copy.
+def copy_to_public(mode: PublishMode = PublishMode.FULL, manifest_path: str = None, workers: int = None, verbose: bool = True, public_dir: str = "public", sources: dict[str, tuple[str, str]] = None):
+    if mode in (PublishMode.SYNC, PublishMode.LINK):
+        if mode == PublishMode.LINK:
+            print("Linking static files into public directory...")
+            report = sync_tree("static", public_dir, manifest_path or LINK_MANIFEST_PATH, workers, OBJECT_STORE_PATH, sources)
+        else:
+            print("Syncing static files to public directory...")
+            report = sync_tree("static", public_dir, manifest_path or STATIC_MANIFEST_PATH, workers, sources=sources)
+        print_report(report, verbose)
+        return report
+
+    if os.path.exists(public_dir):
         print("Deleting public directory...")
-        shutil.rmtree("public")
+        shutil.rmtree(public_dir)
 
     print("Copying static files to public directory...")
-    copy_tree("static", "public")
+    if workers is None:
+        copy_tree("static", public_dir, verbose)
+    else:
+        count, size = parallel_copy_tree("static", public_dir, workers)
+        print(f"Copied {count} files ({size} bytes)")
 
-def copy_tree(src: str, dst: str):
+def print_report(report: SyncReport, verbose: bool = True):
+    if verbose:
+        for rel_path in report.added:
+            print(f" + {rel_path}")
+        for rel_path in report.updated:
+            print(f" * {rel_path}")
+        for rel_path in report.removed:
+            print(f" - {rel_path}")
+    print(report.summary())
+
+def copy_tree(src: str, dst: str, verbose: bool = True):
     if not os.path.exists(dst):
         os.mkdir(dst)
     for item in os.listdir(src):
         src_path = os.path.join(src, item)
         dst_path = os.path.join(dst, item)
-        print(f" * {src_path} -> {dst_path}")
+        if verbose:
+            print(f" * {src_path} -> {dst_path}")
         if os.path.isdir(src_path):
-            copy_tree(src_path, dst_path)
+            copy_tree(src_path, dst_path, verbose)
         else:
-            shutil.copy(src_path, dst_path)
\ No newline at end of file
+            shutil.copy(src_path, dst_path)
+            instrument.count("static files copied")
+
+# Devices pairs on which an in-kernel copy path failed, so we only pay for
+# the failed syscall once per filesystem pair rather than once per file.
+_no_reflink = set()
+_no_copy_file_range = set()
+_no_sendfile = set()
+
+# Copies a single file using the cheapest mechanism the kernel offers:
+# a reflink (no data copied at all), then copy_file_range (data stays in the
+# kernel and may be offloaded to the device), then sendfile, then a plain
+# userspace copy.  The source's permission bits are copied too, like
+# shutil.copy.  Returns the number of bytes copied.
+def copy_file(src_path: str, dst_path: str) -> int:
+    with open(src_path, "rb") as src_file, open(dst_path, "wb") as dst_file:
+        src_fd = src_file.fileno()
+        dst_fd = dst_file.fileno()
+        src_stat = os.fstat(src_fd)
+        os.fchmod(dst_fd, stat.S_IMODE(src_stat.st_mode))
+        size = src_stat.st_size
+        devices = (src_stat.st_dev, os.fstat(dst_fd).st_dev)
+        if size == 0:
+            return 0
+
+        if devices not in _no_reflink and _reflink(src_fd, dst_fd):
+            return size
+        _no_reflink.add(devices)
+
+        if devices not in _no_copy_file_range and hasattr(os, "copy_file_range"):
+            if _copy_loop(os.copy_file_range, src_fd, dst_fd, size):
+                return size
+            _no_copy_file_range.add(devices)
+
+        if devices not in _no_sendfile and hasattr(os, "sendfile"):
+            if _copy_loop(_sendfile, src_fd, dst_fd, size):
+                return size
+            _no_sendfile.add(devices)
+
+        src_file.seek(0)
+        dst_file.seek(0)
+        dst_file.truncate()
+        shutil.copyfileobj(src_file, dst_file, 1 << 20)
+        return size
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+def _sendfile(src_fd: int, dst_fd: int, count: int) -> int:
+    return os.sendfile(dst_fd, src_fd, None, count)
+
+# Runs an in-kernel copy primitive until size bytes have been copied.  Returns
+# False if the primitive is not usable here and nothing has been copied yet,
+# so the caller can fall back to the next mechanism.  Running out of data
+# part way (the source was truncated while we copied it) is an error rather
+# than a short copy.
+def _copy_loop(copy_fn, src_fd: int, dst_fd: int, size: int) -> bool:
+    copied = 0
+    while copied < size:
+        try:
+            sent = copy_fn(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+        except OSError as e:
+            if copied == 0 and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP):
+                return False
+            raise
+        if sent == 0:
+            if copied == 0:
+                return False
+            raise OSError(errno.EIO, f"source shrank to {copied} of {size} bytes while being copied")
+        copied += sent
+    return True
+
+# A thread pool that keeps at most a few jobs per worker in flight, so
+# copying a huge tree does not queue one future per file up front.  The first
+# error raised by a job is re-raised when the pool is drained.
+class CopyPool:
+    def __init__(self, workers: int = None):
+        self.workers = workers or DEFAULT_COPY_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(self.workers * 4)
+        self.errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+        if exc_type is None and self.errors:
+            raise self.errors[0]
+
+    def submit(self, fn, *args):
+        if self.errors:
+            raise self.errors[0]
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            self.errors.append(future.exception())
+
+# Copies src into dst like copy_tree, but scans with os.scandir (reusing the
+# directory entry's cached type and stat) and copies files on a bounded
+# thread pool with copy_file.  Returns (files copied, bytes copied).
+def parallel_copy_tree(src: str, dst: str, workers: int = None) -> tuple[int, int]:
+    count = 0
+    total = 0
+    with CopyPool(workers) as pool:
+        stack = [(src, dst)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            os.makedirs(dst_dir, exist_ok=True)
+            with os.scandir(src_dir) as entries:
+                for entry in entries:
+                    dst_path = os.path.join(dst_dir, entry.name)
+                    if entry.is_dir():
+                        stack.append((entry.path, dst_path))
+                    else:
+                        pool.submit(copy_file, entry.path, dst_path)
+                        count += 1
+                        total += entry.stat().st_size
+                        instrument.count("static files copied")
+    return count, total
+
+# Yields (relative path, absolute path, stat) for every file below root.
+# Relative paths always use "/" so manifests are portable.
+def walk_files(root: str):
+    stack = [("", root)]
+    while stack:
+        rel_dir, abs_dir = stack.pop()
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir():
+                    stack.append((rel_path, entry.path))
+                else:
+                    yield rel_path, entry.path, entry.stat()
+
+def stat_or_none(path: str) -> os.stat_result:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+def remove_if_exists(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# Outputs are replaced rather than rewritten in place: the old output may be
+# a hardlink into the object store, and writing through it would corrupt
+# every other file sharing that inode.
+def place_copy(src_path: str, dst_path: str):
+    remove_if_exists(dst_path)
+    copy_file(src_path, dst_path)
+
+def store_object_path(store: str, digest: str) -> str:
+    return os.path.join(store, digest[:2], digest)
+
+# Publishes src_path at dst_path as a hardlink to its object in the
+# content-addressed store, adding the object first if needed.  Identical
+# files therefore share a single inode.  Objects are made read-only to guard
+# against in-place edits through one of the links.  When linking is not
+# possible (the store is on another filesystem, the filesystem has no
+# hardlinks, the link count is exhausted) the file is copied instead.
+def _place_link(store: str, digest: str, src_path: str, dst_path: str):
+    object_path = store_object_path(store, digest)
+    if not os.path.exists(object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        copy_file(src_path, tmp_path)
+        os.chmod(tmp_path, 0o444)
+        # Another worker may be adding the same content concurrently; linking
+        # (unlike replacing) keeps whichever object landed first, so every
+        # output still ends up on the same inode.
+        try:
+            os.link(tmp_path, object_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            os.replace(tmp_path, object_path)
+        remove_if_exists(tmp_path)
+    remove_if_exists(dst_path)
+    try:
+        os.link(object_path, dst_path)
+    except OSError:
+        copy_file(object_path, dst_path)
+        os.chmod(dst_path, 0o644)
+
+# Removes store objects that no output refers to any more.  Temporary files
+# are left alone: they are objects another build sharing the store is still
+# adding (see _place_link), and removing one would fail its os.link.
+def collect_garbage(store: str, referenced: set[str]) -> int:
+    removed = 0
+    if not os.path.isdir(store):
+        return removed
+    for _, object_path, _ in walk_files(store):
+        name = os.path.basename(object_path)
+        if name not in referenced and not name.endswith(".tmp"):
+            os.remove(object_path)
+            removed += 1
+    return removed
+
+# Incrementally mirrors src into dst.  Each synced file is recorded in the
+# manifest with the source's size, mtime and content hash plus the size,
+# mtime and inode of the output we wrote, so on the next run a file whose
+# source and output are both untouched costs two stats and no reads.  When
+# the source stat changes we hash it and only rewrite the output if the
+# content really changed.  Files that disappeared from src are deleted from
+# dst; anything in dst that we never wrote (e.g. generated pages) is left
+# alone.
+#
+# With a store directory, outputs are hardlinked from a content-addressed
+# object store instead of copied (see _place_link), and objects no longer
+# referenced are garbage collected after outputs change.
+#
+# sources maps relative paths to (path, hash) of a processed version to
+# publish in place of the source file, such as an optimized image.
+def sync_tree(src: str, dst: str, manifest_path: str = STATIC_MANIFEST_PATH, workers: int = None, store: str = None, sources: dict[str, tuple[str, str]] = None) -> SyncReport:
+    manifest = Manifest(manifest_path)
+    files = list(walk_files(src))
+    report = sync_files(files, dst, manifest, workers, store, sources)
+    seen = {rel_path for rel_path, _, _ in files}
+    remove_outputs([rel_path for rel_path in manifest.paths() if rel_path not in seen], dst, manifest, report)
+    finish_sync(report, manifest, store)
+    return report
+
+# Syncs only the given paths below src, e.g. the ones a file watcher saw
+# change; paths that no longer exist in src have their outputs removed.
+# The caller owns the manifest and decides when to save it.
+def sync_paths(src: str, dst: str, rel_paths: list[str], manifest: Manifest, store: str = None, sources: dict[str, tuple[str, str]] = None) -> SyncReport:
+    files = []
+    missing = []
+    for rel_path in rel_paths:
+        src_path = os.path.join(src, rel_path)
+        src_stat = stat_or_none(src_path)
+        if src_stat is None or not os.path.isfile(src_path):
+            missing.append(rel_path)
+        else:
+            files.append((rel_path, src_path, src_stat))
+    report = sync_files(files, dst, manifest, 1, store, sources)
+    remove_outputs([rel_path for rel_path in missing if rel_path in manifest], dst, manifest, report)
+    finish_sync(report, manifest, store, save=False)
+    return report
+
+def sync_files(files, dst: str, manifest: Manifest, workers: int = None, store: str = None, sources: dict[str, tuple[str, str]] = None) -> SyncReport:
+    report = SyncReport()
+    made_dirs = set()
+    copies = []
+
+    for rel_path, src_path, src_stat in files:
+        dst_path = os.path.join(dst, rel_path)
+        entry = manifest.get(rel_path)
+        dst_stat = stat_or_none(dst_path)
+        source = sources.get(rel_path) if sources else None
+        published = source[1] if source else None
+        dst_intact = (
+            entry is not None
+            and dst_stat is not None
+            and dst_stat.st_size == entry["dst_size"]
+            and dst_stat.st_mtime_ns == entry["dst_mtime_ns"]
+            and dst_stat.st_ino == entry.get("dst_ino")
+            and entry.get("published") == published
+        )
+        digest = manifest.digest(rel_path, src_path, src_stat)
+        if dst_intact and digest == entry["hash"]:
+            report.unchanged += 1
+            if dst_stat.st_nlink > 1 and store is not None:
+                report.linked += 1
+            entry = dict(entry, size=src_stat.st_size, mtime_ns=src_stat.st_mtime_ns)
+            manifest.set(rel_path, entry)
+            continue
+
+        dst_dir = os.path.dirname(dst_path)
+        if dst_dir not in made_dirs:
+            os.makedirs(dst_dir, exist_ok=True)
+            made_dirs.add(dst_dir)
+        copies.append((rel_path, src_path, dst_path, src_stat, digest, source))
+        if entry is None:
+            report.added.append(rel_path)
+        else:
+            report.updated.append(rel_path)
+
+    with CopyPool(workers) as pool:
+        for _, src_path, dst_path, _, digest, source in copies:
+            if source is not None:
+                src_path, digest = source
+            if store is None:
+                pool.submit(place_copy, src_path, dst_path)
+            else:
+                pool.submit(_place_link, store, digest, src_path, dst_path)
+    instrument.count("static files copied", len(copies))
+    for rel_path, _, dst_path, src_stat, digest, source in copies:
+        dst_stat = os.stat(dst_path)
+        if dst_stat.st_nlink > 1 and store is not None:
+            report.linked += 1
+        entry = {
+            "size": src_stat.st_size,
+            "mtime_ns": src_stat.st_mtime_ns,
+            "hash": digest,
+            "dst_size": dst_stat.st_size,
+            "dst_mtime_ns": dst_stat.st_mtime_ns,
+            "dst_ino": dst_stat.st_ino,
+        }
+        if source is not None:
+            entry["published"] = source[1]
+        manifest.set(rel_path, entry)
+    return report
+
+def remove_outputs(rel_paths: list[str], dst: str, manifest: Manifest, report: SyncReport):
+    for rel_path in rel_paths:
+        dst_path = os.path.join(dst, rel_path)
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        prune_empty_dirs(os.path.dirname(dst_path), dst)
+        manifest.remove(rel_path)
+        report.removed.append(rel_path)
+
+def finish_sync(report: SyncReport, manifest: Manifest, store: str = None, save: bool = True):
+    if store is not None and (report.updated or report.removed):
+        collect_garbage(store, {entry.get("published", entry["hash"]) for entry in manifest.entries.values()})
+    if save:
+        manifest.save()
+    report.added.sort()
+    report.updated.sort()
+    report.removed.sort()
+
+def prune_empty_dirs(directory: str, root: str):
+    root = os.path.normpath(root)
+    directory = os.path.normpath(directory)
+    while directory != root and directory.startswith(root + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
@@ -0,0 +1,51 @@
+import unittest
+
+from block_cache import BlockCache
+from processing import markdown_to_html_node, set_block_cache, block_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BlockCache(8)
+        first = cache.get_or_render("- a\n- b", block_to_html_node)
+        second = cache.get_or_render("- a\n- b", block_to_html_node)
+        self.assertIs(first, second)
+        self.assertEqual(cache.stats(), {"size": 1, "maxsize": 8, "hits": 1, "misses": 1, "evictions": 0})
+
+    def test_lru_eviction(self):
+        cache = BlockCache(2)
+        cache.get_or_render("one", block_to_html_node)
+        cache.get_or_render("two", block_to_html_node)
+        cache.get_or_render("one", block_to_html_node)
+        cache.get_or_render("three", block_to_html_node)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(len(cache), 2)
+        cache.get_or_render("one", block_to_html_node)
+        self.assertEqual(cache.hits, 2)
+        cache.get_or_render("two", block_to_html_node)
+        self.assertEqual(cache.misses, 4)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            BlockCache(0)
+
+    def test_markdown_to_html_node_with_cache(self):
+        md = "# Title\n\nShared **notice**\n\n- a\n- b\n\nShared **notice**"
+        cache = BlockCache()
+        node = markdown_to_html_node(md, cache)
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertIs(node.children[1], node.children[3])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_default_cache_is_consulted(self):
+        cache = BlockCache()
+        set_block_cache(cache)
+        try:
+            markdown_to_html_node("same\n\nsame")
+        finally:
+            set_block_cache(None)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
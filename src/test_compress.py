@@ -0,0 +1,85 @@
+import gzip
+import os
+import random
+import tempfile
+import unittest
+
+import compress
+from compress import ENCODINGS, precompress_tree
+
+
+class TestPrecompressTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "public")
+        self.manifest = os.path.join(self.tmp.name, "manifest.json")
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.html = b"<p>" + b"hello world " * 200 + b"</p>"
+        self.write("index.html", self.html)
+        self.write("blog/post.html", self.html * 2)
+        self.write("small.css", b"body{}")
+        self.write("image.png", b"\x89PNG" + b"\x00" * 1000)
+
+    def write(self, rel_path: str, data: bytes):
+        with open(os.path.join(self.root, *rel_path.split("/")), "wb") as f:
+            f.write(data)
+
+    def path(self, rel_path: str) -> str:
+        return os.path.join(self.root, *rel_path.split("/"))
+
+    def precompress(self, **kwargs):
+        return precompress_tree(self.root, self.manifest, **kwargs)
+
+    def test_writes_siblings_for_compressible_files(self):
+        report = self.precompress(workers=1)
+        self.assertEqual(report.added, ["blog/post.html", "index.html"])
+        with gzip.open(self.path("index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), self.html)
+        for suffix in ENCODINGS:
+            self.assertTrue(os.path.exists(self.path("index.html" + suffix)))
+        self.assertFalse(os.path.exists(self.path("small.css.gz")))
+        self.assertFalse(os.path.exists(self.path("image.png.gz")))
+
+    def test_process_pool_matches_serial_output(self):
+        self.precompress(workers=2)
+        with open(self.path("blog/post.html.gz"), "rb") as f:
+            pooled = f.read()
+        self.assertEqual(pooled, compress.gzip_compress(self.html * 2))
+
+    def test_unchanged_content_is_not_recompressed(self):
+        self.precompress(workers=1)
+        os.utime(self.path("index.html.gz"), ns=(0, 0))
+        self.write("index.html", self.html)
+        report = self.precompress(workers=1)
+        self.assertEqual(report.unchanged, 2)
+        self.assertFalse(report.changed())
+        self.assertEqual(os.stat(self.path("index.html.gz")).st_mtime_ns, 0)
+
+    def test_changed_and_missing_siblings_are_rewritten(self):
+        self.precompress(workers=1)
+        self.write("index.html", self.html + b"<p>more</p>")
+        os.remove(self.path("blog/post.html.gz"))
+        report = self.precompress(workers=1)
+        self.assertEqual(report.updated, ["blog/post.html", "index.html"])
+        with gzip.open(self.path("index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), self.html + b"<p>more</p>")
+
+    def test_incompressible_file_stops_early_and_loses_stale_siblings(self):
+        self.precompress(workers=1)
+        noise = random.Random(0).randbytes(compress.PROBE_SIZE * 2)
+        self.write("index.html", noise)
+        self.precompress(workers=1)
+        for suffix in ENCODINGS:
+            self.assertFalse(os.path.exists(self.path("index.html" + suffix)))
+
+    def test_deleted_file_loses_siblings(self):
+        self.precompress(workers=1)
+        os.remove(self.path("index.html"))
+        report = self.precompress(workers=1)
+        self.assertEqual(report.removed, ["index.html"])
+        self.assertEqual(sorted(os.listdir(self.root)), ["blog", "image.png", "small.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from corpus import PROFILES, generate_page, page_path, write_corpus
+from processing import markdown_to_html_node
+
+
+class TestCorpus(unittest.TestCase):
+    def test_pages_are_deterministic(self):
+        for profile in PROFILES:
+            self.assertEqual(generate_page(7, profile, seed=3), generate_page(7, profile, seed=3))
+        self.assertNotEqual(generate_page(7), generate_page(8))
+        self.assertNotEqual(generate_page(7, seed=1), generate_page(7, seed=2))
+
+    def test_every_profile_renders(self):
+        for profile in PROFILES:
+            for index in range(20):
+                markdown = generate_page(index, profile, blocks=10)
+                self.assertTrue(markdown.startswith(f"# Page {index}: "))
+                markdown_to_html_node(markdown)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            generate_page(0, "huge")
+
+    def test_write_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_corpus(tmp, 3, "nested", blocks=2, assets=2, asset_size=16)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "template.html")))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "static", "index.css")))
+            page = os.path.join(tmp, "content", *page_path(2, "nested").split("/"))
+            with open(page) as f:
+                self.assertEqual(f.read(), generate_page(2, "nested", blocks=2))
+            files = [name for _, _, names in os.walk(os.path.join(tmp, "static")) for name in names]
+            self.assertEqual(len(files), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
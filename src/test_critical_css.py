@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+import critical_css
+import textnode
+from critical_css import StyleIndex, build_style_index, parse_rules, selector_tokens, split_selectors
+from leafnode import LeafNode
+from pages import generate_pages, template_dependencies
+from parentnode import ParentNode
+
+STYLESHEET = """
+/* site styles */
+@import "fonts.css";
+body { margin: 0 }
+h1, h2, .title { color: red }
+p a:hover, nav a { color: blue }
+ul li:not(.done) { list-style: square }
+#hero .title > b { font-weight: 900 }
+::selection { background: #000 }
+code { font-family: "Courier  New" }
+.banner { background: url(../images/banner.png) }
+@media (max-width: 600px) { p { margin: 0 } .sidebar { display: none } }
+@font-face { font-family: X; src: url(x.woff2) }
+"""
+TEMPLATE = '<html><head><link href="/css/site.css" rel="stylesheet"></head><body>{{ Content }}</body></html>'
+
+
+class TestSelectors(unittest.TestCase):
+    def test_selector_tokens(self):
+        self.assertEqual(selector_tokens("ul li:not(.done)"), {"ul", "li"})
+        self.assertEqual(selector_tokens("#hero .title > B"), {"#hero", ".title", "b"})
+        self.assertEqual(selector_tokens("a[href^='http']::after"), {"a"})
+        self.assertEqual(selector_tokens("::-webkit-scrollbar"), set())
+        self.assertEqual(selector_tokens("*"), set())
+
+    def test_split_selectors(self):
+        self.assertEqual(split_selectors("h1, :is(h2, h3) > a,p"), ["h1", ":is(h2, h3) > a", "p"])
+
+    def test_parse_rules(self):
+        rules = parse_rules("a { x: 1 } @media print { b { y: 2 } } @charset 'utf-8';")
+        self.assertEqual(rules, [(None, "a", "x: 1"), ("@media print", "b", "y: 2"), (None, "@charset 'utf-8'", None)])
+
+
+class TestStyleIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = StyleIndex([("/css/site.css", STYLESHEET)], TEMPLATE)
+
+    def test_selects_rules_the_page_can_use(self):
+        node = ParentNode("div", [ParentNode("h1", [LeafNode(None, "Title")]), ParentNode("p", [LeafNode("a", "link", {"href": "/"})])])
+        self.assertEqual(
+            self.index.critical_css(node),
+            "body{margin: 0}h1{color: red}p a:hover{color: blue}::selection{background: #000}"
+            "@media (max-width: 600px){p{margin: 0}}@font-face{font-family: X; src: url(/css/x.woff2)}",
+        )
+
+    def test_classes_ids_and_urls(self):
+        node = ParentNode("div", [
+            ParentNode("section", [ParentNode("p", [LeafNode("b", "x")], {"class": "title banner"})], {"id": "hero"}),
+            ParentNode("pre", [LeafNode("code", "x")]),
+        ])
+        css = self.index.critical_css(node)
+        self.assertIn(".title{color: red}", css)
+        self.assertIn("#hero .title > b{font-weight: 900}", css)
+        self.assertIn('code{font-family: "Courier  New"}', css)
+        self.assertIn(".banner{background: url(/images/banner.png)}", css)
+        self.assertNotIn("ul li", css)
+        self.assertNotIn("@import", css)
+
+    def test_pages_with_the_same_tokens_share_a_selection(self):
+        self.index.critical_css(ParentNode("div", [ParentNode("p", [LeafNode(None, "one")])]))
+        self.index.critical_css(ParentNode("div", [ParentNode("p", [LeafNode(None, "two")])]))
+        self.assertEqual(len(self.index.selections), 1)
+
+    def test_defer_stylesheets(self):
+        self.assertEqual(
+            self.index.defer_stylesheets(TEMPLATE),
+            '<html><head><style>{{ Critical CSS }}</style>'
+            '<link href="/css/site.css" rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            '<noscript><link href="/css/site.css" rel="stylesheet"></noscript></head><body>{{ Content }}</body></html>',
+        )
+        other = '<link href="/other.css" rel="stylesheet"><link href="/css/site.css" rel="icon">'
+        self.assertEqual(self.index.defer_stylesheets(other), other)
+
+
+class TestCriticalPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.manifest = os.path.join(self.tmp.name, "pages.json")
+        os.makedirs(self.content)
+        os.makedirs(os.path.join(self.public, "css"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.public, "css", "site.3f2a.css"), "h1 { color: red } ul { margin: 0 }")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.addCleanup(critical_css.set_style_index, None)
+        self.addCleanup(textnode.set_url_map, None)
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def build(self):
+        return generate_pages(self.content, self.template, self.public, self.manifest, template_dependencies(self.template))
+
+    def test_inlines_critical_css_from_published_stylesheet(self):
+        self.build()
+        textnode.set_url_map({"/css/site.css": "/css/site.3f2a.css"})
+        critical_css.set_style_index(build_style_index(self.template, self.public))
+        report = self.build()
+        self.assertEqual(report.updated, ["index.md"])
+        with open(os.path.join(self.public, "index.html")) as f:
+            html = f.read()
+        self.assertTrue(html.startswith("<html><head><style>h1{color: red}</style><link href=\"/css/site.3f2a.css\" rel=\"preload\""))
+        self.assertIn("<body><div><h1>Home</h1></div></body>", html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+import processing
+from client import request_build
+from daemon import BuildDaemon
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site = os.path.join(self.tmp.name, "site")
+        os.makedirs(os.path.join(self.site, "static"))
+        os.makedirs(os.path.join(self.site, "content"))
+        self.write("template.html", "<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.write("static/index.css", "body {}")
+        self.write("content/index.md", "# Home\n\nHello")
+        self.socket_path = os.path.join(self.tmp.name, "daemon.sock")
+        self.daemon = BuildDaemon(self.socket_path)
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        processing.set_block_cache(None)
+        self.tmp.cleanup()
+
+    def write(self, rel_path, content):
+        with open(os.path.join(self.site, rel_path), "w") as f:
+            f.write(content)
+
+    def build(self, argv):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        status = request_build(self.socket_path, self.site, argv, stdout, stderr)
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_build_and_rebuild(self):
+        cwd = os.getcwd()
+        status, stdout, _ = self.build(["-q", "-o", "out"])
+        self.assertEqual(status, 0)
+        self.assertIn("1 added, 0 updated, 0 removed, 0 unchanged", stdout)
+        with open(os.path.join(self.site, "out", "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Home</title><body><div><h1>Home</h1><p>Hello</p></div></body>")
+        self.assertTrue(os.path.exists(os.path.join(self.site, "out", "index.css")))
+        self.assertEqual(os.getcwd(), cwd)
+
+        self.write("content/about.md", "# About\n\nHello")
+        status, stdout, _ = self.build(["-q", "-o", "out"])
+        self.assertEqual(status, 0)
+        self.assertIn("1 added, 0 updated, 0 removed, 1 unchanged", stdout)
+        self.assertEqual(self.daemon.builds, 2)
+        self.assertGreater(self.daemon.block_cache.hits, 0)
+
+    def test_usage_error(self):
+        status, _, stderr = self.build(["--bogus"])
+        self.assertEqual(status, 2)
+        self.assertIn("unrecognized arguments: --bogus", stderr)
+
+    def test_failed_build(self):
+        self.write("content/broken.md", "no title here")
+        status, _, stderr = self.build(["-q"])
+        self.assertEqual(status, 1)
+        self.assertIn("ValueError: page has no h1 title", stderr)
+
+    def test_watch_is_refused(self):
+        status, _, stderr = self.build(["--watch"])
+        self.assertEqual(status, 2)
+        self.assertIn("not available through the daemon", stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from devserver import LIVE_RELOAD_SCRIPT, LiveReload, SiteWatcher, diff_snapshots, inject_live_reload, snapshot, start_server
+import textnode
+from fingerprint import fingerprint_tree
+from pages import generate_pages, template_dependencies
+from processing import set_asset_map
+from static_files import sync_tree
+
+
+class TestSnapshots(unittest.TestCase):
+    def test_diff_snapshots(self):
+        old = {"a.md": (1, 10), "b.md": (1, 10), "gone.md": (1, 10)}
+        new = {"a.md": (1, 10), "b.md": (2, 10), "new.md": (1, 10)}
+        self.assertEqual(diff_snapshots(old, new), ["b.md", "gone.md", "new.md"])
+
+    def test_snapshot_of_missing_directory(self):
+        self.assertEqual(snapshot("/nonexistent/dir"), {})
+
+    def test_inject_live_reload(self):
+        self.assertEqual(inject_live_reload("<body>hi</body></html>"), f"<body>hi{LIVE_RELOAD_SCRIPT}</body></html>")
+        self.assertEqual(inject_live_reload("bare"), "bare" + LIVE_RELOAD_SCRIPT)
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        self.static_manifest = os.path.join(root, "cache", "static.json")
+        self.pages_manifest = os.path.join(root, "cache", "pages.json")
+        os.makedirs(self.content)
+        os.makedirs(self.static)
+        self.write(self.template, '<link href="/index.css" rel="stylesheet"><body>{{ Content }}</body>')
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nUs")
+        sync_tree(self.static, self.public, self.static_manifest)
+        generate_pages(self.content, self.template, self.public, self.pages_manifest, template_dependencies(self.template, self.static))
+        self.watcher = SiteWatcher(self.static, self.content, self.template, self.public, self.static_manifest, self.pages_manifest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+        # Bump the mtime so back-to-back edits are never mistaken for no change.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_no_changes(self):
+        self.assertIsNone(self.watcher.poll())
+
+    def test_edit_renders_only_that_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        static_report, pages_report = self.watcher.poll()
+        self.assertFalse(static_report.changed())
+        self.assertEqual(pages_report.updated, ["index.md"])
+        self.assertEqual(pages_report.unchanged, 0)
+        self.assertIn("<p>Edited</p>", self.read(os.path.join(self.public, "index.html")))
+
+    def test_failed_rebuild_is_retried(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nan _unmatched delimiter")
+        self.write(self.template, '<link href="/index.css" rel="stylesheet"><main>{{ Content }}</main>')
+        with self.assertRaises(ValueError):
+            self.watcher.poll()
+        with self.assertRaises(ValueError):
+            self.watcher.poll()
+        self.assertIn("<main>", self.read(os.path.join(self.public, "about.html")))
+        self.assertIn("<body>", self.read(os.path.join(self.public, "index.html")))
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nFixed")
+        _, pages_report = self.watcher.poll()
+        self.assertEqual(pages_report.updated, ["index.md"])
+        self.assertEqual(pages_report.unchanged, 1)
+        self.assertIn("<main><div><h1>Home</h1><p>Fixed</p></div></main>", self.read(os.path.join(self.public, "index.html")))
+        self.watcher.save()
+        report = generate_pages(self.content, self.template, self.public, self.pages_manifest, template_dependencies(self.template, self.static))
+        self.assertEqual(report.unchanged, 2)
+
+    def test_new_asset_and_deleted_page(self):
+        self.write(os.path.join(self.static, "logo.svg"), "<svg/>")
+        os.remove(os.path.join(self.content, "about.md"))
+        static_report, pages_report = self.watcher.poll()
+        self.assertEqual(static_report.added, ["logo.svg"])
+        self.assertEqual(pages_report.removed, ["about.md"])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "logo.svg")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "about.html")))
+
+    def test_store_links_synced_assets(self):
+        store = os.path.join(self.tmp.name, "cache", "objects")
+        watcher = SiteWatcher(self.static, self.content, self.template, self.public, self.static_manifest, self.pages_manifest, store=store)
+        self.write(os.path.join(self.static, "logo.svg"), "<svg/>")
+        static_report, _ = watcher.poll()
+        self.assertEqual(static_report.added, ["logo.svg"])
+        self.assertEqual(static_report.linked, 1)
+        self.assertEqual(os.stat(os.path.join(self.public, "logo.svg")).st_nlink, 2)
+
+    def test_stylesheet_change_renders_every_page(self):
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        static_report, pages_report = self.watcher.poll()
+        self.assertEqual(static_report.updated, ["index.css"])
+        self.assertEqual(pages_report.updated, ["about.md", "index.md"])
+
+    def test_fingerprinted_asset_change_renders_every_page(self):
+        fingerprint_manifest = os.path.join(self.tmp.name, "cache", "fingerprint.json")
+        _, asset_map = fingerprint_tree(self.static, self.public, fingerprint_manifest)
+        set_asset_map(asset_map)
+        self.addCleanup(set_asset_map, None)
+        watcher = SiteWatcher(self.static, self.content, self.template, self.public, self.static_manifest, self.pages_manifest, True, fingerprint_manifest)
+        watcher.poll()
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        static_report, pages_report = watcher.poll()
+        self.assertEqual(static_report.updated, ["index.css"])
+        self.assertEqual(pages_report.updated, ["about.md", "index.md"])
+        self.assertIn(textnode.rewrite_url("/index.css"), self.read(os.path.join(self.public, "index.html")))
+        self.assertNotEqual(textnode.rewrite_url("/index.css"), asset_map["/index.css"])
+
+    def test_save_persists_manifests(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.watcher.poll()
+        self.watcher.save()
+        report = generate_pages(self.content, self.template, self.public, self.pages_manifest, template_dependencies(self.template, self.static))
+        self.assertEqual(report.unchanged, 2)
+        self.assertFalse(report.changed())
+
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "index.html"), "w") as f:
+            f.write("<body>page</body>")
+        self.live_reload = LiveReload()
+        self.server = start_server(self.tmp.name, "127.0.0.1", 0, self.live_reload)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_serves_html_with_live_reload(self):
+        with urllib.request.urlopen(self.base + "/") as response:
+            self.assertEqual(response.read().decode(), f"<body>page{LIVE_RELOAD_SCRIPT}</body>")
+
+    def test_requests_are_only_logged_on_request(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            urllib.request.urlopen(self.base + "/").close()
+        self.assertEqual(stderr.getvalue(), "")
+        server = start_server(self.tmp.name, "127.0.0.1", 0, self.live_reload, log_requests=True)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with contextlib.redirect_stderr(stderr):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/").close()
+        self.assertIn('"GET / HTTP/1.1" 200', stderr.getvalue())
+
+    def test_pushes_reload_event(self):
+        with urllib.request.urlopen(self.base + "/__livereload", timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+            threading.Timer(0.05, self.live_reload.notify).start()
+            self.assertEqual(response.readline(), b"data: reload\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import main
+import processing
+import textnode
+from block_cache import BlockCache
+from fingerprint import ASSET_MAP_NAME, FINGERPRINT_MANIFEST_PATH, fingerprint_tree, fingerprinted_path, remove_fingerprinted, rewrite_css, rewrite_html_references
+
+
+class TestFingerprintHelpers(unittest.TestCase):
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path("images/logo.png", "0123456789abcdef"), "images/logo.0123456789ab.png")
+        self.assertEqual(fingerprinted_path("robots.txt", "0123456789abcdef"), "robots.txt")
+        self.assertEqual(fingerprinted_path(".well-known", "0123456789abcdef"), ".well-known")
+
+    def test_rewrite_css(self):
+        outputs = {"images/a.png": "images/a.1.png", "css/b.css": "css/b.2.css", "plain.txt": "plain.txt"}
+        css = 'a{background:url("/images/a.png")} b{background:url(../images/a.png?x#y)} @import "b.css"; c{background:url(data:x)} d{background:url(https://cdn/a.png)} e{background:url(/plain.txt)}'
+        self.assertEqual(
+            rewrite_css(css, "css/site.css", outputs),
+            'a{background:url("/images/a.1.png")} b{background:url(../images/a.1.png?x#y)} @import "b.2.css"; c{background:url(data:x)} d{background:url(https://cdn/a.png)} e{background:url(/plain.txt)}',
+        )
+
+    def test_rewrite_html_references(self):
+        html = '<link href="/index.css" rel="stylesheet"><a href="https://x/index.css"></a><img src=\'/a.png\'>'
+        rewritten = rewrite_html_references(html, {"/index.css": "/index.1.css", "/a.png": "/a.2.png"}.get)
+        self.assertEqual(rewritten, '<link href="/index.1.css" rel="stylesheet"><a href="https://x/index.css"></a><img src=\'/a.2.png\'>')
+
+
+class TestFingerprintTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        self.manifest = os.path.join(self.tmp.name, "cache", "fingerprint.json")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write("images/logo.png", "png-bytes")
+        self.write("index.css", "body{background:url(images/logo.png)}")
+        self.write("robots.txt", "User-agent: *")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, content):
+        path = os.path.join(self.src, rel_path)
+        with open(path, "w") as f:
+            f.write(content)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def published(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.dst).replace(os.sep, "/")
+            for root, _, names in os.walk(self.dst) for name in names
+        )
+
+    def test_publishes_hashed_names_and_map(self):
+        report, asset_map = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.added, ["images/logo.png", "index.css", "robots.txt"])
+        logo = asset_map["/images/logo.png"][1:]
+        css = asset_map["/index.css"][1:]
+        self.assertRegex(logo, r"^images/logo\.[0-9a-f]{12}\.png$")
+        self.assertEqual(self.published(), sorted([ASSET_MAP_NAME, logo, css, "robots.txt"]))
+        with open(os.path.join(self.dst, css)) as f:
+            self.assertEqual(f.read(), f"body{{background:url({logo})}}")
+        with open(os.path.join(self.dst, ASSET_MAP_NAME)) as f:
+            self.assertEqual(json.load(f), asset_map)
+
+    def test_unchanged_files_keep_their_names(self):
+        _, first = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.write("robots.txt", "User-agent: *")
+        report, second = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(first, second)
+        self.assertFalse(report.changed())
+        self.assertEqual(report.unchanged, 3)
+
+    def test_changed_asset_renames_it_and_the_stylesheet_using_it(self):
+        _, first = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.write("images/logo.png", "new-png-bytes")
+        report, second = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.updated, ["images/logo.png", "index.css"])
+        self.assertNotEqual(first["/images/logo.png"], second["/images/logo.png"])
+        self.assertNotEqual(first["/index.css"], second["/index.css"])
+        self.assertNotIn(first["/images/logo.png"][1:], self.published())
+        self.assertNotIn(first["/index.css"][1:], self.published())
+
+    def test_deleted_source_removes_output(self):
+        _, asset_map = fingerprint_tree(self.src, self.dst, self.manifest)
+        os.remove(os.path.join(self.src, "images", "logo.png"))
+        report, _ = fingerprint_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.removed, ["images/logo.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+
+    def test_remove_fingerprinted(self):
+        fingerprint_tree(self.src, self.dst, self.manifest)
+        report = remove_fingerprinted(self.dst, self.manifest)
+        self.assertEqual(report.removed, ["images/logo.png", "index.css", "robots.txt"])
+        self.assertEqual(self.published(), [])
+        self.assertFalse(os.path.exists(self.manifest))
+        self.assertFalse(remove_fingerprinted(self.dst, self.manifest).changed())
+
+    def test_build_without_fingerprint_removes_hashed_outputs(self):
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "content"))
+        with open(os.path.join(root, "content", "index.md"), "w") as f:
+            f.write("# Home")
+        with open(os.path.join(root, "template.html"), "w") as f:
+            f.write('<link href="/index.css" rel="stylesheet"><body>{{ Content }}</body>')
+        old_cwd = os.getcwd()
+        os.chdir(root)
+        self.addCleanup(processing.set_asset_map, None)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.run_build(main.parse_args(["--fingerprint", "-q"]))
+                self.assertIn(ASSET_MAP_NAME, self.published())
+                main.run_build(main.parse_args(["-q"]))
+        finally:
+            os.chdir(old_cwd)
+        self.assertEqual(self.published(), ["images/logo.png", "index.css", "index.html", "robots.txt"])
+        self.assertFalse(os.path.exists(os.path.join(root, FINGERPRINT_MANIFEST_PATH)))
+        with open(os.path.join(self.dst, "index.html")) as f:
+            self.assertIn('href="/index.css"', f.read())
+
+
+class TestAssetMap(unittest.TestCase):
+    def tearDown(self):
+        processing.set_block_cache(None)
+        processing.set_asset_map(None)
+
+    def test_pages_link_to_published_names(self):
+        processing.set_asset_map({"/a.png": "/a.1.png"})
+        html = processing.markdown_to_html_node("![a](/a.png) [b](/b)").to_html()
+        self.assertEqual(html, '<div><p><img src="/a.1.png"></img> <a href="/b">b</a></p></div>')
+
+    def test_changing_the_map_clears_the_block_cache(self):
+        cache = BlockCache()
+        processing.set_block_cache(cache)
+        processing.markdown_to_html_node("![a](/a.png)")
+        processing.set_asset_map(None)
+        self.assertEqual(len(cache), 1)
+        processing.set_asset_map({"/a.png": "/a.1.png"})
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(textnode.get_url_map(), {"/a.png": "/a.1.png"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import io
+import unittest
+
+import textnode
+from corpus import PROFILES, generate_page
+from flatdoc import TAG_IDS, FlatDocument, block_spans, parse_document
+from leafnode import LeafNode
+from parentnode import ParentNode
+from processing import markdown_to_blocks, markdown_to_html_node
+
+MARKDOWN = """# Title with **bold**
+
+A paragraph with _italic_, `code` and a [link](/docs/page.html)
+that continues ![an image](/images/cat.png) on the next line.
+
+```
+code block
+  indented
+```
+
+> quoted **text**
+>   over _two_ lines
+
+- one
+- two with [a link](/x)
+
+1. first
+2. second `code`
+"""
+
+
+class TestFlatDocument(unittest.TestCase):
+    def tearDown(self):
+        textnode.set_url_map(None)
+        textnode.set_image_sizes(None)
+
+    def test_matches_tree(self):
+        document = parse_document(MARKDOWN)
+        self.assertEqual(document.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+
+    def test_matches_tree_on_corpus(self):
+        for profile in PROFILES:
+            for index in range(5):
+                markdown = generate_page(index, profile)
+                self.assertEqual(parse_document(markdown).to_html(), markdown_to_html_node(markdown).to_html())
+
+    def test_spans_point_into_source(self):
+        document = parse_document(MARKDOWN)
+        self.assertIs(document.source, MARKDOWN)
+        # Only the quote's text is copied.
+        self.assertEqual(document.derived, "quoted **text** over _two_ lines")
+        texts = [document.text(index) for index in range(len(document)) if document.text(index)]
+        self.assertIn("A paragraph with ", texts)
+        self.assertIn("code block\n  indented\n", texts)
+        # A paragraph's lines are joined with spaces, as in the tree.
+        self.assertIn(" on the next line.", texts)
+        self.assertIn(" that continues ", texts)
+
+    def test_structure(self):
+        document = parse_document("# T\n\n- a\n- b")
+        root_children = list(document.children(0))
+        self.assertEqual([document.tags[index] for index in root_children], [TAG_IDS["h1"], TAG_IDS["ul"]])
+        items = list(document.children(root_children[1]))
+        self.assertEqual([document.text(index + 1) for index in items], ["a", "b"])
+        self.assertTrue(all(document.parents[index] == root_children[1] for index in items))
+        self.assertEqual(document.subtree_ends[0], len(document))
+
+    def test_props_follow_url_map(self):
+        document = parse_document("[a](/css/site.css) ![b](/cat.png)")
+        textnode.set_url_map({"/css/site.css": "/css/site.123.css"})
+        textnode.set_image_sizes({"/cat.png": [4, 3]})
+        self.assertEqual(
+            document.to_html(),
+            '<div><p><a href="/css/site.123.css">a</a> '
+            '<img src="/cat.png" width="4" height="3" loading="lazy" decoding="async"></img></p></div>',
+        )
+
+    def test_write_html(self):
+        document = parse_document(MARKDOWN)
+        out = io.StringIO()
+        written = document.write_html(out)
+        self.assertEqual(out.getvalue(), document.to_html())
+        self.assertEqual(written, len(out.getvalue()))
+
+    def test_to_tree(self):
+        tree = parse_document(MARKDOWN).to_tree()
+        self.assertEqual(tree.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual(tree.to_html(minify=True), markdown_to_html_node(MARKDOWN).to_html(minify=True))
+
+    def test_from_tree(self):
+        node = ParentNode("div", [
+            ParentNode("section", [LeafNode(None, "hi "), LeafNode("span", "there", {"class": "x"})], {"id": "s"}),
+            ParentNode("ul", []),
+        ])
+        document = FlatDocument.from_tree(node)
+        self.assertEqual(document.to_html(), node.to_html())
+        self.assertEqual(document.to_tree().to_html(), node.to_html())
+
+    def test_errors_match_tree(self):
+        for markdown in ("a **b", "- `x", "```\ncode\n```x"):
+            with self.assertRaises(ValueError):
+                markdown_to_html_node(markdown)
+            with self.assertRaises(ValueError):
+                parse_document(markdown)
+
+    def test_malformed_blocks_match_tree(self):
+        for markdown in ("#", "1. a\n2 b", "> a\nb", "-"):
+            self.assertEqual(parse_document(markdown).to_html(), markdown_to_html_node(markdown).to_html())
+
+    def test_block_spans(self):
+        markdown = "\n\n  one \n\n\n two\nlines\n\n   \n\nthree"
+        self.assertEqual([markdown[start:end] for start, end in block_spans(markdown)], markdown_to_blocks(markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import pickle
 import unittest
 
-from htmlnode import HTMLNode
+from htmlnode import HTMLNode, SharedProps, end_tag, start_tag
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -30,3 +31,28 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode("a", "link", None, {"href": "https://www.google.com", "target": "_blank"})
         self.assertEqual(node.props_to_html(), ' href="https://www.google.com" target="_blank"')
 
+    def test_props_to_html_minify(self):
+        node = HTMLNode("a", "link", None, {"href": "https://example.com/a?b=c", "title": "a title", "class": "", "data-x": "it's"})
+        self.assertEqual(node.props_to_html(minify=True), ' href="https://example.com/a?b=c" title="a title" class="" data-x="it\'s"')
+        self.assertEqual(HTMLNode("a", "link", None, {"href": "/about", "rel": "next"}).props_to_html(minify=True), " href=/about rel=next")
+
+    def test_shared_props(self):
+        props = SharedProps(href="/a b", rel="next")
+        self.assertEqual(props, {"href": "/a b", "rel": "next"})
+        with self.assertRaises(TypeError):
+            props["href"] = "/other"
+        with self.assertRaises(TypeError):
+            props.update(title="x")
+        node = HTMLNode("a", "link", None, props)
+        self.assertEqual(node.props_to_html(), ' href="/a b" rel="next"')
+        self.assertIs(node.props_to_html(), node.props_to_html())
+        self.assertEqual(node.props_to_html(minify=True), ' href="/a b" rel=next')
+        self.assertIs(node.start_tag(), HTMLNode("a", "other", None, props).start_tag())
+        self.assertEqual(node.start_tag(), '<a href="/a b" rel="next">')
+        self.assertEqual(pickle.loads(pickle.dumps(props)), props)
+
+    def test_cached_tags(self):
+        self.assertIs(start_tag("section"), start_tag("".join(["sec", "tion"])))
+        self.assertEqual(end_tag("section"), "</section>")
+        self.assertIs(HTMLNode("section").start_tag(), start_tag("section"))
+
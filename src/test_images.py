@@ -0,0 +1,114 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from images import image_size, image_sizes, image_sources, iter_png_chunks, optimize_png, png_chunk, process_images
+
+
+def make_png(width: int, height: int, extra_chunks: list[tuple[bytes, bytes]] = ()) -> bytes:
+    raw = b"".join(b"\x00" + bytes((x * 7 + y) % 256 for x in range(width * 3)) for y in range(height))
+    data = zlib.compress(raw, 1)
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunks = [png_chunk(b"IHDR", ihdr)]
+    chunks += [png_chunk(chunk_type, body) for chunk_type, body in extra_chunks]
+    chunks += [png_chunk(b"IDAT", data[:len(data) // 2]), png_chunk(b"IDAT", data[len(data) // 2:]), png_chunk(b"IEND", b"")]
+    return b"\x89PNG\r\n\x1a\n" + b"".join(chunks)
+
+
+def idat(png: bytes) -> bytes:
+    return zlib.decompress(b"".join(body for chunk_type, body in iter_png_chunks(png) if chunk_type == b"IDAT"))
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_png(self):
+        self.assertEqual(image_size(self.write("a.png", make_png(30, 20))), (30, 20))
+
+    def test_gif(self):
+        self.assertEqual(image_size(self.write("a.gif", b"GIF89a" + struct.pack("<HH", 17, 9) + b"\x00" * 10)), (17, 9))
+
+    def test_jpeg_skips_segments_before_frame(self):
+        app1 = b"\xff\xe1" + struct.pack(">H", 2 + 100) + b"\xff" * 100
+        sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, 240, 320, 3)
+        self.assertEqual(image_size(self.write("a.jpg", b"\xff\xd8" + app1 + sof + b"\xff\xd9")), (320, 240))
+
+    def test_unknown(self):
+        self.assertIsNone(image_size(self.write("a.bmp", b"BM" + b"\x00" * 30)))
+        self.assertIsNone(image_size(self.write("b.jpg", b"\xff\xd8\xff\xd9")))
+
+
+class TestOptimizePng(unittest.TestCase):
+    def test_keeps_pixels_and_strips_metadata(self):
+        original = make_png(64, 64, [(b"tEXt", b"Comment\x00" + b"x" * 200), (b"gAMA", struct.pack(">I", 45455))])
+        optimized = optimize_png(original)
+        self.assertLess(len(optimized), len(original))
+        self.assertEqual(idat(optimized), idat(original))
+        chunk_types = [chunk_type for chunk_type, _ in iter_png_chunks(optimized)]
+        self.assertEqual(chunk_types, [b"IHDR", b"gAMA", b"IDAT", b"IEND"])
+
+    def test_leaves_animated_and_malformed_pngs(self):
+        animated = make_png(4, 4, [(b"acTL", struct.pack(">II", 1, 0))])
+        self.assertEqual(optimize_png(animated), animated)
+        self.assertEqual(optimize_png(animated[:40]), animated[:40])
+        self.assertEqual(optimize_png(b"not a png"), b"not a png")
+
+
+class TestProcessImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "static")
+        self.manifest = os.path.join(self.tmp.name, "manifest.json")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write("images/a.png", make_png(32, 16, [(b"tEXt", b"c\x00" + b"x" * 100)]))
+        self.write("images/b.gif", b"GIF89a" + struct.pack("<HH", 5, 6) + b"\x00" * 10)
+        self.write("index.css", b"body{}")
+
+    def write(self, rel_path: str, data: bytes):
+        with open(os.path.join(self.src, *rel_path.split("/")), "wb") as f:
+            f.write(data)
+
+    def process(self) -> dict:
+        return process_images(self.src, self.manifest, self.cache)
+
+    def test_sizes_and_optimized_sources(self):
+        images = self.process()
+        self.assertEqual(image_sizes(images), {"/images/a.png": [32, 16], "/images/b.gif": [5, 6]})
+        sources = image_sources(images)
+        self.assertEqual(list(sources), ["images/a.png"])
+        output, _ = sources["images/a.png"]
+        with open(output, "rb") as f:
+            self.assertEqual([chunk_type for chunk_type, _ in iter_png_chunks(f.read())], [b"IHDR", b"IDAT", b"IEND"])
+
+    def test_unchanged_images_are_not_reprocessed(self):
+        first = self.process()
+        output = first["images/a.png"]["output"]
+        os.utime(output, ns=(0, 0))
+        second = self.process()
+        self.assertEqual(second, first)
+        self.assertEqual(os.stat(output).st_mtime_ns, 0)
+
+    def test_changed_image_replaces_cached_copy(self):
+        old_output = self.process()["images/a.png"]["output"]
+        self.write("images/a.png", make_png(8, 8))
+        images = self.process()
+        self.assertEqual(images["images/a.png"]["width"], 8)
+        self.assertNotEqual(images["images/a.png"]["output"], old_output)
+        self.assertFalse(os.path.exists(old_output))
+        self.assertEqual(os.listdir(self.cache), [os.path.basename(images["images/a.png"]["output"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import instrument
+import processing
+from processing import markdown_to_html_node
+
+
+class TestInstrument(unittest.TestCase):
+    def tearDown(self):
+        instrument.disable()
+
+    def test_disabled_is_a_no_op(self):
+        original = processing.scan_block
+        self.assertIsNone(instrument.active())
+        with instrument.stage("anything"):
+            instrument.count("things")
+        fp = io.StringIO()
+        self.assertIs(instrument.writer(fp), fp)
+        self.assertIs(processing.scan_block, original)
+
+    def test_enable_wraps_and_disable_restores(self):
+        original = processing.scan_block
+        instrument.enable()
+        self.assertIsNot(processing.scan_block, original)
+        self.assertIs(processing.scan_block.__wrapped__, original)
+        instrument.disable()
+        self.assertIs(processing.scan_block, original)
+
+    def test_pipeline_stages_are_counted(self):
+        profiler = instrument.enable()
+        node = markdown_to_html_node("# Title\n\nSome **bold** text\n\n- a\n- b")
+        node.write_html(instrument.writer(io.StringIO()))
+        instrument.disable()
+        self.assertEqual(profiler.stages["split"][0], 1)
+        self.assertEqual(profiler.stages["classify"][0], 3)
+        self.assertEqual(profiler.stages["build"][0], 3)
+        self.assertEqual(profiler.stages["serialize"][0], 1)
+        self.assertEqual(profiler.stages["write"][0], 1)
+        self.assertGreaterEqual(profiler.stages["inline"][0], 3)
+
+    def test_self_time_excludes_nested_stages(self):
+        profiler = instrument.enable()
+        with instrument.stage("outer"):
+            with instrument.stage("inner"):
+                time.sleep(0.02)
+        calls, total, self_time = profiler.stages["outer"]
+        self.assertEqual(calls, 1)
+        self.assertGreaterEqual(total, 0.02)
+        self.assertLess(self_time, 0.02)
+        self.assertGreaterEqual(profiler.stages["inner"][2], 0.02)
+
+    def test_counters_and_merge(self):
+        profiler = instrument.enable()
+        instrument.count("pages", 2)
+        worker = instrument.Profiler()
+        with worker.stage("page"):
+            pass
+        worker.count("pages", 3)
+        profiler.merge(worker.snapshot())
+        self.assertEqual(profiler.counters, {"pages": 5})
+        self.assertEqual(profiler.stages["page"][0], 1)
+        self.assertEqual(len(profiler.events), 1)
+        self.assertIn("pages: 5", profiler.summary())
+
+    def test_write_trace(self):
+        profiler = instrument.enable()
+        with instrument.stage("static"):
+            pass
+        with instrument.stage("block", traced=False):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out", "trace.json")
+            profiler.write_trace(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual([event["name"] for event in data["traceEvents"]], ["static"])
+        self.assertEqual(data["traceEvents"][0]["ph"], "X")
+        self.assertGreaterEqual(data["traceEvents"][0]["ts"], 0)
+        self.assertEqual(set(data["stages"]), {"static", "block"})
+
+    def test_progress_on_a_non_terminal_prints_only_the_final_line(self):
+        stream = io.StringIO()
+        instrument.enable(trace=False, progress=stream)
+        for _ in range(3):
+            instrument.count("pages rendered")
+        instrument.disable()
+        self.assertEqual(stream.getvalue(), "3 pages rendered\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,17 @@ class TestLeafNode(unittest.TestCase):
         node = LeafNode("div", "This is a text node", {"class": "test"})
         self.assertEqual(node.to_html(), "<div class=\"test\">This is a text node</div>")
 
+    def test_no_instance_dict(self):
+        node = LeafNode("div", "This is a text node")
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_to_html_no_value(self):
         node = LeafNode("p", None)
         with self.assertRaises(ValueError):
-            node.to_html()
\ No newline at end of file
+            node.to_html()
+
+    def test_to_html_minify(self):
+        self.assertEqual(LeafNode("img", "", {"src": "/a.png", "alt": "two words"}).to_html(minify=True), '<img src=/a.png alt="two words">')
+        self.assertEqual(LeafNode("b", "bold   \n text").to_html(minify=True), "<b>bold text</b>")
+        self.assertEqual(LeafNode("code", "x  =\n  1").to_html(minify=True), "<code>x  =\n  1</code>")
+        self.assertEqual(LeafNode(None, "plain\t\ttext").to_html(minify=True), "plain text")
\ No newline at end of file
@@ -0,0 +1,119 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import main
+import textnode
+from linkcheck import PathIndex, build_path_index, check_links, page_url, resolve_reference
+
+
+class TestResolveReference(unittest.TestCase):
+    def test_absolute_and_relative(self):
+        self.assertEqual(resolve_reference("/a/b.html", "/x/y.html"), ("/a/b.html", ""))
+        self.assertEqual(resolve_reference("b.html#top", "/x/y.html"), ("/x/b.html", "top"))
+        self.assertEqual(resolve_reference("../b.png?v=2", "/x/y.html"), ("/b.png", ""))
+        self.assertEqual(resolve_reference("sub/", "/x/y.html"), ("/x/sub/", ""))
+        self.assertEqual(resolve_reference("/a/./b%20c.html", "/y.html"), ("/a/b c.html", ""))
+
+    def test_fragment_only(self):
+        self.assertEqual(resolve_reference("#faq", "/x/y.html"), ("/x/y.html", "faq"))
+
+    def test_external(self):
+        for url in ("https://example.com/", "mailto:a@b.c", "//cdn.example.com/x.js", "data:image/png;base64,AA"):
+            self.assertIsNone(resolve_reference(url, "/y.html"))
+
+    def test_page_url(self):
+        self.assertEqual(page_url("blog/post.md"), "/blog/post.html")
+
+
+class TestPathIndex(unittest.TestCase):
+    def test_check(self):
+        index = PathIndex()
+        index.add("/blog/index.html", frozenset({"main"}))
+        index.add("/images/cat.png")
+        self.assertIsNone(index.check("/blog/", "/index.html"))
+        self.assertIsNone(index.check("/blog", "/index.html"))
+        self.assertIsNone(index.check("/blog/index.html#main", "/index.html"))
+        self.assertIsNone(index.check("cat.png#anything", "/images/x.html"))
+        self.assertEqual(index.check("/blog/#nope", "/index.html"), "missing-anchor")
+        self.assertEqual(index.check("/dog.png", "/index.html"), "missing")
+        self.assertIsNone(index.check("https://example.com/nope", "/index.html"))
+
+
+class TestCheckLinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(os.path.join(self.public, "blog"))
+        os.makedirs(os.path.join(self.public, "images"))
+        self.write(self.template, '<main id="content">{{ Content }}</main>')
+        self.write(os.path.join(self.content, "index.md"), (
+            "# Home\n\n"
+            "[post](/blog/post.html) and [gone](/gone.html)\n"
+            "![cat](/images/cat.png) ![dog](images/dog.png) [x](https://example.com)\n\n"
+            "> [quoted](/blog/missing.html)\n\n"
+            "```\n[in code](/not-a-link.html)\n```\n"
+        ))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n[home](../index.html#content) [top](#nope)")
+        self.write(os.path.join(self.public, "index.html"), "")
+        self.write(os.path.join(self.public, "blog", "post.html"), "")
+        self.write(os.path.join(self.public, "images", "cat.png"), "")
+
+    def tearDown(self):
+        textnode.set_url_map(None)
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def broken(self, report):
+        return [(os.path.relpath(entry["source"], self.content), entry["line"], entry["type"], entry["url"], entry["reason"]) for entry in report.broken]
+
+    def test_reports_broken_references(self):
+        report = check_links(self.content, self.public, self.template)
+        self.assertEqual(report.references, 8)
+        self.assertEqual(report.external, 1)
+        self.assertEqual(self.broken(report), [
+            (os.path.join("blog", "post.md"), 3, "link", "#nope", "missing-anchor"),
+            ("index.md", None, "link", "/blog/missing.html", "missing"),
+            ("index.md", 3, "link", "/gone.html", "missing"),
+            ("index.md", 4, "image", "images/dog.png", "missing"),
+        ])
+
+    def test_parallel_matches_serial(self):
+        self.assertEqual(check_links(self.content, self.public, self.template, jobs=2), check_links(self.content, self.public, self.template))
+
+    def test_checks_published_urls(self):
+        os.rename(os.path.join(self.public, "images", "cat.png"), os.path.join(self.public, "images", "cat.123.png"))
+        self.assertIn("/images/cat.png", [entry["url"] for entry in check_links(self.content, self.public, self.template).broken])
+        textnode.set_url_map({"/images/cat.png": "/images/cat.123.png"})
+        self.assertNotIn("/images/cat.png", [entry["url"] for entry in check_links(self.content, self.public, self.template).broken])
+
+    def test_static_html_anchors(self):
+        self.write(os.path.join(self.public, "about.html"), '<h2 id="faq">FAQ</h2>')
+        index = build_path_index(self.public, set())
+        self.assertIsNone(index.check("/about.html#faq", "/index.html"))
+        self.assertEqual(index.check("/about.html#nope", "/index.html"), "missing-anchor")
+
+    def test_report_on_stdout_is_only_json(self):
+        os.makedirs(os.path.join(self.tmp.name, "static"))
+        old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        stdout = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(io.StringIO()):
+                main.run_build(main.parse_args(["--check-links", "-", "-q"]))
+        finally:
+            os.chdir(old_cwd)
+        self.assertEqual([entry["url"] for entry in json.loads(stdout.getvalue())], ["#nope", "/blog/missing.html", "/gone.html", "images/dog.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
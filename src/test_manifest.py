@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+
+import manifest
+from manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entry(self, n):
+        return {"size": n, "mtime_ns": n, "hash": f"h{n}"}
+
+    def test_full_write_is_sorted(self):
+        m = Manifest(self.path)
+        for name in ["b", "c", "a"]:
+            m.set(name, self.entry(1))
+        m.save()
+        with open(self.path) as f:
+            text = f.read()
+        self.assertEqual(list(json.loads(text)), ["a", "b", "c"])
+        self.assertEqual(text, json.dumps(json.loads(text), separators=(",", ":"), sort_keys=True))
+        self.assertFalse(os.path.exists(self.path + ".log"))
+
+    def test_small_saves_are_journaled_and_replayed(self):
+        m = Manifest(self.path)
+        m.set("a", self.entry(1))
+        m.set("b", self.entry(2))
+        m.save()
+        with open(self.path) as f:
+            snapshot = f.read()
+        m.set("a", self.entry(3))
+        m.remove("b")
+        m.set("c", self.entry(4))
+        m.save()
+        with open(self.path) as f:
+            self.assertEqual(f.read(), snapshot)
+        loaded = Manifest(self.path)
+        self.assertEqual(loaded.entries, {"a": self.entry(3), "c": self.entry(4)})
+        self.assertFalse(loaded.dirty)
+
+    def test_long_journal_is_folded_back(self):
+        m = Manifest(self.path)
+        m.set("a", self.entry(0))
+        m.save()
+        for n in range(1, manifest.JOURNAL_MIN_LINES + 2):
+            m.set("a", self.entry(n))
+            m.save()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertEqual(Manifest(self.path).get("a"), self.entry(manifest.JOURNAL_MIN_LINES + 1))
+
+    def test_torn_journal_line_is_ignored(self):
+        m = Manifest(self.path)
+        m.set("a", self.entry(1))
+        m.save()
+        m.set("b", self.entry(2))
+        m.save()
+        with open(self.path + ".log", "a") as f:
+            f.write('["c",{"size"')
+        loaded = Manifest(self.path)
+        self.assertEqual(loaded.paths(), ["a", "b"])
+        loaded.set("d", self.entry(4))
+        loaded.save()
+        self.assertFalse(os.path.exists(self.path + ".log"))
+        self.assertEqual(Manifest(self.path).paths(), ["a", "b", "d"])
+
+
+if __name__ == "__main__":
+    unittest.main()
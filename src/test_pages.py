@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import instrument
+from pages import extract_title, generate_pages, output_path, template_dependencies, chunk_pages
+
+
+class TestPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.manifest = os.path.join(self.tmp.name, "cache", "pages.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, '<link href="/index.css" rel="stylesheet"><title>{{ Title }}</title><main>{{ Content }}</main>')
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome **home**")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\n- one\n- two")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def build(self):
+        deps = template_dependencies(self.template, self.static)
+        return generate_pages(self.content, self.template, self.public, self.manifest, deps)
+
+    def test_extract_title(self):
+        self.assertEqual(extract_title("intro\n# Hello  \n## Sub"), "Hello")
+        with self.assertRaises(ValueError):
+            extract_title("## Only a subheading")
+
+    def test_output_path(self):
+        self.assertEqual(output_path("blog/post.md", "public"), "public/blog/post.html")
+
+    def test_template_dependencies(self):
+        self.assertEqual(template_dependencies(self.template, self.static), [self.template, os.path.join(self.static, "index.css")])
+
+    def test_generate_pages(self):
+        report = self.build()
+        self.assertEqual(report.added, ["blog/post.md", "index.md"])
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")),
+            '<link href="/index.css" rel="stylesheet"><title>Home</title><main><div><h1>Home</h1><p>Welcome <b>home</b></p></div></main>',
+        )
+
+    def test_noop_rebuild_renders_nothing(self):
+        self.build()
+        with patch("pages.write_page") as mock_write:
+            report = self.build()
+        mock_write.assert_not_called()
+        self.assertEqual(report.unchanged, 2)
+
+    def test_only_edited_page_is_rendered(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        report = self.build()
+        self.assertEqual(report.updated, ["index.md"])
+        self.assertEqual(report.unchanged, 1)
+        self.assertIn("<p>Edited</p>", self.read(os.path.join(self.public, "index.html")))
+
+    def test_dependency_change_rebuilds_everything(self):
+        self.build()
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        report = self.build()
+        self.assertEqual(report.updated, ["blog/post.md", "index.md"])
+
+    def test_minify_toggle_rebuilds_everything(self):
+        self.build()
+        deps = template_dependencies(self.template, self.static)
+        report = generate_pages(self.content, self.template, self.public, self.manifest, deps, minify=True)
+        self.assertEqual(report.updated, ["blog/post.md", "index.md"])
+        self.assertIn("<main><div><h1>Post</h1><ul><li>one<li>two</ul></div></main>", self.read(os.path.join(self.public, "blog", "post.html")))
+        report = generate_pages(self.content, self.template, self.public, self.manifest, deps, minify=True)
+        self.assertEqual(report.unchanged, 2)
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        report = self.build()
+        self.assertEqual(report.removed, ["blog/post.md"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        report = self.build()
+        self.assertEqual(report.updated, ["index.md"])
+
+    def test_intact_output_dirs_skip_output_stats(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        self.build()
+        with patch("pages.os.path.exists", wraps=os.path.exists) as mock_exists:
+            report = self.build()
+        self.assertFalse([args for args, _ in mock_exists.call_args_list if args[0].endswith(".html")])
+        self.assertEqual(report.unchanged, 2)
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        report = self.build()
+        self.assertEqual(report.updated, ["blog/post.md"])
+
+    def test_parallel_build_is_byte_identical(self):
+        for i in range(40):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# Post {i}\n\nBody _{i}_\n\n1. a\n2. b")
+        self.build()
+        parallel_public = os.path.join(self.tmp.name, "parallel")
+        deps = template_dependencies(self.template, self.static)
+        report = generate_pages(self.content, self.template, parallel_public, os.path.join(self.tmp.name, "cache", "parallel.json"), deps, jobs=3)
+        self.assertEqual(len(report.added), 42)
+        for rel in ["index.html", "blog/post.html"] + [f"blog/p{i}.html" for i in range(40)]:
+            with open(os.path.join(self.public, rel), "rb") as a, open(os.path.join(parallel_public, rel), "rb") as b:
+                self.assertEqual(a.read(), b.read(), rel)
+
+    def test_async_io_build_is_byte_identical(self):
+        for i in range(40):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# Post {i}\n\nBody _{i}_\n\n1. a\n2. b")
+        self.build()
+        async_public = os.path.join(self.tmp.name, "async")
+        deps = template_dependencies(self.template, self.static)
+        report = generate_pages(self.content, self.template, async_public, os.path.join(self.tmp.name, "cache", "async.json"), deps, async_io=True)
+        self.assertEqual(len(report.added), 42)
+        for rel in ["index.html", "blog/post.html"] + [f"blog/p{i}.html" for i in range(40)]:
+            with open(os.path.join(self.public, rel), "rb") as a, open(os.path.join(async_public, rel), "rb") as b:
+                self.assertEqual(a.read(), b.read(), rel)
+
+    def test_profiled_parallel_build_collects_worker_stages(self):
+        for i in range(10):
+            self.write(os.path.join(self.content, "blog", f"p{i}.md"), f"# Post {i}\n\nBody")
+        profiler = instrument.enable()
+        try:
+            deps = template_dependencies(self.template, self.static)
+            generate_pages(self.content, self.template, self.public, self.manifest, deps, jobs=2)
+        finally:
+            instrument.disable()
+        self.assertEqual(profiler.counters["pages rendered"], 12)
+        self.assertEqual(profiler.stages["page"][0], 12)
+        self.assertEqual(profiler.stages["split"][0], 12)
+
+    def test_chunk_pages(self):
+        pages = [(str(i), str(i)) for i in range(100)]
+        chunks = chunk_pages(pages, 4)
+        self.assertEqual(sum(chunks, []), pages)
+        self.assertEqual(len(chunks), 17)
+        self.assertEqual(chunk_pages(pages[:3], 8), [[p] for p in pages[:3]])
+
+
+if __name__ == "__main__":
+    unittest.main()
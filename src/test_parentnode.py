@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from parentnode import ParentNode
@@ -47,5 +48,59 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaises(ValueError):
             node.to_html()
 
+    def test_to_html_deeply_nested(self):
+        node = LeafNode("b", "deep")
+        for _ in range(50_000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 50_000 * len("<span></span>") + len("<b>deep</b>"))
+
+    def test_iter_html_chunks(self):
+        node = ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")], {"class": "x"})
+        self.assertEqual(list(node.iter_html()), ['<p class="x">', "a ", "<b>bold</b>", "</p>"])
+
+    def test_write_html(self):
+        children = [LeafNode("i", str(i)) for i in range(20_000)]
+        node = ParentNode("div", children)
+        out = io.StringIO()
+        written = node.write_html(out)
+        self.assertEqual(out.getvalue(), node.to_html())
+        self.assertEqual(written, len(out.getvalue()))
+
+    def test_children_to_html(self):
+        node = ParentNode("div", [LeafNode("b", "one"), ParentNode("p", [LeafNode(None, "two")])])
+        self.assertEqual(node.children_to_html(), "<b>one</b><p>two</p>")
+
+    def test_minify_omits_optional_closing_tags(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "one")]),
+            ParentNode("p", [LeafNode(None, "two")]),
+            ParentNode("ul", [ParentNode("li", [LeafNode(None, "a")]), ParentNode("li", [LeafNode(None, "b")])]),
+            ParentNode("p", [LeafNode(None, "three")]),
+            LeafNode("span", "inline"),
+            ParentNode("p", [LeafNode(None, "four")]),
+        ])
+        self.assertEqual(node.to_html(minify=True), "<div><p>one<p>two<ul><li>a<li>b</ul><p>three</p><span>inline</span><p>four</div>")
+
+    def test_minify_keeps_closing_tags_it_cannot_infer(self):
+        node = ParentNode("a", [ParentNode("p", [LeafNode(None, "x")])], {"href": "/"})
+        self.assertEqual(node.to_html(minify=True), "<a href=/><p>x</p></a>")
+        self.assertEqual(ParentNode("p", [LeafNode(None, "x")]).to_html(minify=True), "<p>x</p>")
+
+    def test_minify_collapses_whitespace_outside_pre(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a  \n b "), LeafNode("code", "x  y")]),
+            ParentNode("pre", [ParentNode("code", [LeafNode(None, "keep\n    this")])]),
+            ParentNode("p", [LeafNode(None, "c\u00a0\u00a0d")]),
+        ])
+        self.assertEqual(node.to_html(minify=True), "<div><p>a b <code>x  y</code><pre><code>keep\n    this</code></pre><p>c\u00a0\u00a0d</div>")
+
+    def test_minified_write_html_matches_to_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, f"item  {i}")]) for i in range(5_000)])
+        out = io.StringIO()
+        node.write_html(out, minify=True)
+        self.assertEqual(out.getvalue(), node.to_html(minify=True))
+
 if __name__ == "__main__":
     unittest.main()
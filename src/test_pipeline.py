@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from pipeline import run_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.items = []
+        for i in range(50):
+            src_path = os.path.join(self.tmp.name, "in", f"{i}.txt")
+            os.makedirs(os.path.dirname(src_path), exist_ok=True)
+            with open(src_path, "w") as f:
+                f.write(f"page {i}")
+            self.items.append((src_path, os.path.join(self.tmp.name, "out", str(i % 5), f"{i}.txt")))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_renders_in_order_and_writes_every_output(self):
+        rendered = []
+
+        def render(text, dest_path):
+            rendered.append(dest_path)
+            return text.upper()
+
+        done = []
+        self.assertEqual(run_pipeline(self.items, render, io_workers=3, queue_size=2, done=done), 50)
+        self.assertEqual(sorted(done), sorted(self.items))
+        self.assertEqual(rendered, [dest_path for _, dest_path in self.items])
+        for i, (_, dest_path) in enumerate(self.items):
+            self.assertEqual(self.read(dest_path), f"PAGE {i}")
+            self.assertFalse(os.path.exists(dest_path + ".tmp"))
+
+    def test_single_worker_and_slot(self):
+        self.assertEqual(run_pipeline(self.items, lambda text, dest_path: text, io_workers=1, queue_size=1), 50)
+        self.assertEqual(self.read(self.items[-1][1]), "page 49")
+
+    def test_render_error_is_raised(self):
+        def render(text, dest_path):
+            if text == "page 7":
+                raise ValueError(text)
+            return text
+
+        done = []
+        with self.assertRaisesRegex(ValueError, "page 7"):
+            run_pipeline(self.items, render, queue_size=4, done=done)
+        self.assertLessEqual(set(done), set(self.items[:7]))
+        for src_path, dest_path in done:
+            self.assertEqual(self.read(dest_path), self.read(src_path))
+
+    def test_missing_source_is_raised(self):
+        os.remove(self.items[20][0])
+        with self.assertRaises(FileNotFoundError):
+            run_pipeline(self.items, lambda text, dest_path: text)
+
+    def test_empty(self):
+        self.assertEqual(run_pipeline([], lambda text, dest_path: text), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
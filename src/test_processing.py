@@ -1,7 +1,13 @@
+import io
+import os
+import random
 import re
+import tempfile
+import time
 import unittest
 
-from processing import split_nodes_on, split_nodes_on_regex, text_to_nodes, markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node
+from processing import split_nodes_on, split_nodes_on_regex, text_to_nodes, tokenize_inline, markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node
+from processing import scan_block, block_to_html_node, iter_markdown_blocks, iter_markdown_file_blocks, write_blocks_html, markdown_file_to_html
 from textnode import TextNode, TextType
 
 class TestProcessing(unittest.TestCase):
@@ -135,6 +141,112 @@ class TestProcessing(unittest.TestCase):
         nodes,
     )
 
+  def test_text_to_nodes_repeated_delimiters(self):
+    nodes = text_to_nodes("**one** and **two** and _three_ and _four_")
+    self.assertListEqual(
+        [
+            TextNode("one", TextType.BOLD),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("two", TextType.BOLD),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("three", TextType.ITALIC),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("four", TextType.ITALIC),
+        ],
+        nodes,
+    )
+
+  def test_text_to_nodes_code_is_literal(self):
+    nodes = text_to_nodes("call `snake_case_name` with **care**")
+    self.assertListEqual(
+        [
+            TextNode("call ", TextType.PLAIN),
+            TextNode("snake_case_name", TextType.CODE),
+            TextNode(" with ", TextType.PLAIN),
+            TextNode("care", TextType.BOLD),
+        ],
+        nodes,
+    )
+
+  def test_text_to_nodes_underscore_in_url(self):
+    nodes = text_to_nodes("see [the docs](https://example.com/my_page) and _this_")
+    self.assertListEqual(
+        [
+            TextNode("see ", TextType.PLAIN),
+            TextNode("the docs", TextType.LINK, "https://example.com/my_page"),
+            TextNode(" and ", TextType.PLAIN),
+            TextNode("this", TextType.ITALIC),
+        ],
+        nodes,
+    )
+
+  def test_text_to_nodes_link_inside_bold(self):
+    nodes = text_to_nodes("see **[a](u)** x")
+    self.assertListEqual(
+        [
+            TextNode("see ", TextType.PLAIN),
+            TextNode("a", TextType.LINK, "u"),
+            TextNode(" x", TextType.PLAIN),
+        ],
+        nodes,
+    )
+
+  def test_text_to_nodes_links_inside_italic_keep_surrounding_text(self):
+    nodes = text_to_nodes("_go to [a](u) or ![b](i.png) now_")
+    self.assertListEqual(
+        [
+            TextNode("go to ", TextType.ITALIC),
+            TextNode("a", TextType.LINK, "u"),
+            TextNode(" or ", TextType.ITALIC),
+            TextNode("b", TextType.IMAGE, "i.png"),
+            TextNode(" now", TextType.ITALIC),
+        ],
+        nodes,
+    )
+
+  def test_text_to_nodes_empty_bold(self):
+    self.assertListEqual([TextNode("", TextType.BOLD)], text_to_nodes("****"))
+
+  def test_text_to_nodes_incomplete_link_is_text(self):
+    nodes = text_to_nodes("[not a link and ![not an image](")
+    self.assertListEqual([TextNode("[not a link and ![not an image](", TextType.PLAIN)], nodes)
+
+  def test_text_to_nodes_empty(self):
+    self.assertListEqual([TextNode("", TextType.PLAIN)], text_to_nodes(""))
+
+  def test_text_to_nodes_unmatched_delimiter(self):
+    with self.assertRaises(ValueError):
+      text_to_nodes("one **two three")
+
+  def test_tokenize_inline_offsets(self):
+    text = "ab **cd** [e](f)"
+    self.assertListEqual(
+        [
+            (TextType.PLAIN, 0, 3, None, None),
+            (TextType.BOLD, 5, 7, None, None),
+            (TextType.PLAIN, 9, 10, None, None),
+            (TextType.LINK, 11, 12, 14, 15),
+        ],
+        list(tokenize_inline(text)),
+    )
+    self.assertListEqual([(TextType.BOLD, 5, 7, None, None)], list(tokenize_inline(text, 3, 9)))
+
+  def test_text_to_nodes_scales_linearly(self):
+    def best_time(text):
+      best = None
+      for _ in range(3):
+        start = time.perf_counter()
+        text_to_nodes(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+      return best
+
+    unit = "see [a link](https://example.com/x) and ![an image](/i.png) "
+    small = best_time(unit * 2_000)
+    large = best_time(unit * 16_000)
+    # 8x the input; a quadratic scan would take ~64x as long.
+    self.assertLess(large / small, 24)
+
   def test_markdown_to_blocks_empty(self):
     md = ""
     blocks = markdown_to_blocks(md)
@@ -198,6 +310,42 @@ This is a single block
     blocks = markdown_to_blocks(md)
     self.assertEqual(blocks, ["This is a single block"])
   
+  def test_iter_markdown_blocks_matches_markdown_to_blocks(self):
+    rng = random.Random(7)
+    pieces = ["para", "- item", "> quote", "```", "  ", " ", "", "\n", "**b**"]
+    for _ in range(2000):
+      md = "\n".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+      lines = io.StringIO(md)
+      self.assertEqual(list(iter_markdown_blocks(lines)), markdown_to_blocks(md), repr(md))
+
+  def test_iter_markdown_file_blocks(self):
+    md = "# Title\n\n\nA paragraph\nover lines\n\n- a\n- b\n"
+    with tempfile.TemporaryDirectory() as tmp:
+      path = os.path.join(tmp, "page.md")
+      with open(path, "w") as f:
+        f.write(md)
+      self.assertEqual(list(iter_markdown_file_blocks(path)), markdown_to_blocks(md))
+      self.assertEqual(list(iter_markdown_file_blocks(path, use_mmap=True)), markdown_to_blocks(md))
+      open(path, "w").close()
+      self.assertEqual(list(iter_markdown_file_blocks(path, use_mmap=True)), [])
+
+  def test_markdown_file_to_html(self):
+    md = "# Title\n\nSome **bold** text\n\n> quote\n\n1. one\n2. two\n"
+    with tempfile.TemporaryDirectory() as tmp:
+      src = os.path.join(tmp, "page.md")
+      dst = os.path.join(tmp, "page.html")
+      with open(src, "w") as f:
+        f.write(md)
+      for use_mmap in (False, True):
+        markdown_file_to_html(src, dst, use_mmap)
+        with open(dst) as f:
+          self.assertEqual(f.read(), markdown_to_html_node(md).to_html())
+
+  def test_write_blocks_html_empty(self):
+    out = io.StringIO()
+    write_blocks_html([], out)
+    self.assertEqual(out.getvalue(), "<div></div>")
+
   def test_block_to_block_type(self):
     self.assertEqual(block_to_block_type("# Heading"), BlockType.HEADING)
     self.assertEqual(block_to_block_type("> Quote"), BlockType.QUOTE)
@@ -225,6 +373,21 @@ This is a single block
     self.assertEqual(block_to_block_type("> Single line quote"), BlockType.QUOTE)
     self.assertEqual(block_to_block_type("    Just some indented text, not code block"), BlockType.PARAGRAPH)
   
+  def test_scan_block(self):
+    self.assertEqual(scan_block("> one\n>two  "), (BlockType.QUOTE, ["> one", ">two  "], ["one", "two"]))
+    self.assertEqual(scan_block("- a\n- b"), (BlockType.UNORDERED_LIST, ["- a", "- b"], None))
+    self.assertEqual(scan_block("  - indented\n- b")[0], BlockType.UNORDERED_LIST)
+    self.assertEqual(scan_block("> one\nnot quoted")[0], BlockType.PARAGRAPH)
+    self.assertEqual(scan_block("```\nnot closed")[0], BlockType.PARAGRAPH)
+
+  def test_block_to_html_node_indented_lists(self):
+    self.assertEqual(block_to_html_node("1. one  \n  2. two").to_html(), "<ol><li>one  </li><li>two</li></ol>")
+    self.assertEqual(block_to_html_node("- one\n  - two").to_html(), "<ul><li>one</li><li>- two</li></ul>")
+
+  def test_block_to_html_node_invalid_ordered_item(self):
+    with self.assertRaises(ValueError):
+      block_to_html_node("1. one\n  \n2. two")
+
   def test_block_to_block_type_unordered_list(self):
     self.assertEqual(block_to_block_type("- list item\n- another item\n"), BlockType.UNORDERED_LIST)
   
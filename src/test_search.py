@@ -0,0 +1,162 @@
+import json
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+import search
+from pages import generate_pages, template_dependencies
+from processing import markdown_to_html_node
+from search import encode_postings, node_title, page_terms, shard_name
+
+
+class TestTerms(unittest.TestCase):
+    def test_page_terms(self):
+        node = markdown_to_html_node("# The Ring\n\nthe **ring**, and [the](/x) end")
+        self.assertEqual(page_terms(node), {"the": [0, 2, 5], "ring": [1, 3], "and": [4], "end": [6]})
+        self.assertEqual(node_title(node), "The Ring")
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("ring"), "ri")
+        self.assertEqual(shard_name("a"), "a")
+        self.assertEqual(shard_name("über"), "xc3bc62")
+        self.assertEqual(shard_name("_x"), "x5f78")
+
+    def test_encode_postings(self):
+        self.assertEqual(encode_postings(3, [2, 5, 9]), [3, 2, 3, 4])
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.pages_manifest = os.path.join(self.tmp.name, "cache", "pages.json")
+        self.search_dir = os.path.join(self.public, "search")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the shire")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nThe ring goes to the mountain")
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        search.set_terms_dir(os.path.join(self.tmp.name, "cache", "terms"))
+
+    def tearDown(self):
+        search.set_terms_dir(None)
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read_json(self, name):
+        with open(os.path.join(self.search_dir, name)) as f:
+            return json.load(f)
+
+    def build(self, jobs=1):
+        deps = template_dependencies(self.template, self.tmp.name)
+        return generate_pages(self.content, self.template, self.public, self.pages_manifest, deps, jobs=jobs)
+
+    def test_builds_sharded_index(self):
+        self.build()
+        meta = self.read_json("index.json")
+        self.assertEqual(meta["pages"], [["/blog/post.html", "Post"], ["/index.html", "Home"]])
+        self.assertEqual(meta["prefix_length"], 2)
+        self.assertIn("ri", meta["shards"])
+        self.assertEqual(self.read_json("th.json")["the"], [[0, 1, 4], [1, 3]])
+        self.assertEqual(self.read_json("ri.json"), {"ring": [[0, 2]]})
+        # The terms written while rendering are consumed.
+        self.assertEqual(os.listdir(search.get_terms_dir()), [])
+
+    def test_edit_rewrites_only_affected_shards(self):
+        self.build()
+        mountain = os.path.join(self.search_dir, "mo.json")
+        mtime = os.stat(mountain).st_mtime_ns
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the ring")
+        self.build()
+        self.assertEqual(os.stat(mountain).st_mtime_ns, mtime)
+        self.assertEqual(self.read_json("ri.json"), {"ring": [[0, 2], [1, 4]]})
+        self.assertFalse(os.path.exists(os.path.join(self.search_dir, "sh.json")))
+        self.assertNotIn("sh", self.read_json("index.json")["shards"])
+
+    def test_removed_page_frees_its_id(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertEqual(self.read_json("index.json")["pages"], [None, ["/index.html", "Home"]])
+        self.assertFalse(os.path.exists(os.path.join(self.search_dir, "ri.json")))
+        self.write(os.path.join(self.content, "new.md"), "# New\n\nA ring")
+        self.build()
+        self.assertEqual(self.read_json("index.json")["pages"], [["/new.html", "New"], ["/index.html", "Home"]])
+        self.assertEqual(self.read_json("ri.json"), {"ring": [[0, 2]]})
+
+    def test_missing_index_is_rebuilt_from_sources(self):
+        self.build()
+        expected = {name: self.read_json(name) for name in os.listdir(self.search_dir)}
+        os.remove(os.path.join(self.search_dir, "ri.json"))
+        self.build()
+        self.assertEqual({name: self.read_json(name) for name in os.listdir(self.search_dir)}, expected)
+
+    def test_parallel_build_matches_serial(self):
+        self.build(jobs=2)
+        parallel = {name: self.read_json(name) for name in os.listdir(self.search_dir)}
+        for name in os.listdir(self.search_dir):
+            os.remove(os.path.join(self.search_dir, name))
+        os.remove(os.path.join(self.tmp.name, ".cache", "search-manifest.json"))
+        os.remove(self.pages_manifest)
+        self.build()
+        self.assertEqual({name: self.read_json(name) for name in os.listdir(self.search_dir)}, parallel)
+
+    def test_spilled_build_matches_in_memory(self):
+        self.build()
+        expected = {name: self.read_json(name) for name in os.listdir(self.search_dir)}
+        for name in os.listdir(self.search_dir):
+            os.remove(os.path.join(self.search_dir, name))
+        with patch.object(search, "SPILL_POSITIONS", 1):
+            self.build()
+        self.assertEqual({name: self.read_json(name) for name in os.listdir(self.search_dir)}, expected)
+        self.assertEqual(os.listdir(search.get_terms_dir()), [])
+
+
+class TestIndexMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = random.Random(0)
+        self.vocabulary = ["".join(rng.choice("abcdefgh") for _ in range(6)) for _ in range(3000)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    # 150 random words per page, standing in for the terms a render leaves.
+    def load_page_terms(self, src_path, dest_path, terms_dir, rendered):
+        rng = random.Random(src_path)
+        terms = {}
+        for position in range(150):
+            terms.setdefault(rng.choice(self.vocabulary), []).append(position)
+        return src_path, terms
+
+    def peak(self, pages):
+        root = os.path.join(self.tmp.name, str(pages))
+        site = [(f"{number}.md", os.path.join(root, "public", f"{number}.html"), str(number)) for number in range(pages)]
+        with patch.object(search, "load_page_terms", self.load_page_terms):
+            tracemalloc.start()
+            try:
+                search.update_index(site, os.path.join(root, "public"), set(), os.path.join(root, "search.json"), os.path.join(root, "terms"))
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    # Four times the pages hold four times the postings, but only the spill
+    # buffer, one shard and the manifest are ever in memory.
+    def test_peak_stays_flat_as_pages_grow(self):
+        with patch.object(search, "SPILL_POSITIONS", 2000):
+            small = self.peak(25)
+            large = self.peak(100)
+        self.assertLess(large, small * 1.3)
+
+if __name__ == "__main__":
+    unittest.main()
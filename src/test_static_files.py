@@ -1,8 +1,14 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
+import contextlib
+import errno
+import io
 import os
 import shutil
-from src.static_files import copy_to_public
+import stat
+import tempfile
+import main
+from src.static_files import copy_to_public, sync_tree, copy_file, parallel_copy_tree, CopyPool
 
 class TestStaticFiles(unittest.TestCase):
     @patch('src.static_files.os.mkdir')
@@ -64,6 +70,243 @@ class TestStaticFiles(unittest.TestCase):
         # 3. File copying
         mock_copy.assert_any_call("static/file1.txt", "public/file1.txt")
         mock_copy.assert_any_call("static/subdir/file2.txt", "public/subdir/file2.txt")
-        
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        self.manifest = os.path.join(self.tmp.name, "cache", "manifest.json")
+        os.makedirs(os.path.join(self.src, "images"))
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_initial_sync_copies_everything(self):
+        report = sync_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.added, ["images/a.png", "index.css"])
+        self.assertEqual(self.read(os.path.join(self.dst, "images", "a.png")), "png")
+
+    def test_noop_sync_copies_nothing(self):
+        sync_tree(self.src, self.dst, self.manifest)
+        with patch("src.static_files.copy_file") as mock_copy, patch("manifest.file_digest") as mock_digest:
+            report = sync_tree(self.src, self.dst, self.manifest)
+        mock_copy.assert_not_called()
+        mock_digest.assert_not_called()
+        self.assertFalse(report.changed())
+        self.assertEqual(report.unchanged, 2)
+
+    def test_touched_but_identical_file_is_not_copied(self):
+        sync_tree(self.src, self.dst, self.manifest)
+        os.utime(os.path.join(self.src, "index.css"), ns=(1, 1))
+        with patch("src.static_files.copy_file") as mock_copy:
+            report = sync_tree(self.src, self.dst, self.manifest)
+        mock_copy.assert_not_called()
+        self.assertFalse(report.changed())
+
+    def test_changed_file_is_copied(self):
+        sync_tree(self.src, self.dst, self.manifest)
+        self.write(os.path.join(self.src, "index.css"), "body { color: red; }")
+        report = sync_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.updated, ["index.css"])
+        self.assertEqual(self.read(os.path.join(self.dst, "index.css")), "body { color: red; }")
+
+    def test_deleted_output_is_restored(self):
+        sync_tree(self.src, self.dst, self.manifest)
+        os.remove(os.path.join(self.dst, "index.css"))
+        report = sync_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.updated, ["index.css"])
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "index.css")))
+
+    def test_stale_outputs_are_removed(self):
+        sync_tree(self.src, self.dst, self.manifest)
+        self.write(os.path.join(self.dst, "page.html"), "<p>generated</p>")
+        shutil.rmtree(os.path.join(self.src, "images"))
+        report = sync_tree(self.src, self.dst, self.manifest)
+        self.assertEqual(report.removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "page.html")))
+
+
+class TestLinkPublish(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        self.store = os.path.join(self.tmp.name, "cache", "objects")
+        self.manifest = os.path.join(self.tmp.name, "cache", "link-manifest.json")
+        os.makedirs(os.path.join(self.src, "a"))
+        os.makedirs(os.path.join(self.src, "b"))
+        self.write(os.path.join(self.src, "a", "logo.png"), "same bytes")
+        self.write(os.path.join(self.src, "b", "logo.png"), "same bytes")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def sync(self):
+        return sync_tree(self.src, self.dst, self.manifest, store=self.store)
+
+    def test_identical_files_share_one_inode(self):
+        report = self.sync()
+        self.assertEqual(report.linked, 3)
+        a = os.stat(os.path.join(self.dst, "a", "logo.png"))
+        b = os.stat(os.path.join(self.dst, "b", "logo.png"))
+        self.assertEqual(a.st_ino, b.st_ino)
+        self.assertEqual(a.st_nlink, 3)
+
+    def test_noop_publish_touches_nothing(self):
+        self.sync()
+        with patch("src.static_files._place_link") as mock_link:
+            report = self.sync()
+        mock_link.assert_not_called()
+        self.assertFalse(report.changed())
+        self.assertEqual(report.unchanged, 3)
+
+    def test_changed_file_gets_new_object_and_old_one_is_collected(self):
+        self.sync()
+        old_object = os.stat(os.path.join(self.dst, "index.css"))
+        self.write(os.path.join(self.src, "index.css"), "body { color: red; }")
+        report = self.sync()
+        self.assertEqual(report.updated, ["index.css"])
+        new_object = os.stat(os.path.join(self.dst, "index.css"))
+        self.assertNotEqual(old_object.st_ino, new_object.st_ino)
+        objects = [name for _, _, names in os.walk(self.store) for name in names]
+        self.assertEqual(len(objects), 2)
+
+    def test_collection_keeps_objects_being_added(self):
+        self.sync()
+        in_flight = os.path.join(self.store, "ab", "ab12.4242.7.tmp")
+        os.makedirs(os.path.dirname(in_flight), exist_ok=True)
+        self.write(in_flight, "half")
+        self.write(os.path.join(self.src, "index.css"), "body { color: red; }")
+        self.sync()
+        self.assertTrue(os.path.exists(in_flight))
+
+    def test_falls_back_to_copy_when_hardlinks_fail(self):
+        with patch("src.static_files.os.link", side_effect=OSError(errno.EXDEV, "cross-device")):
+            report = self.sync()
+        self.assertEqual(report.linked, 0)
+        with open(os.path.join(self.dst, "b", "logo.png")) as f:
+            self.assertEqual(f.read(), "same bytes")
+        self.assertEqual(os.stat(os.path.join(self.dst, "b", "logo.png")).st_nlink, 1)
+
+    def test_sync_copy_does_not_write_through_store_links(self):
+        self.sync()
+        self.write(os.path.join(self.src, "a", "logo.png"), "new bytes")
+        sync_tree(self.src, self.dst, os.path.join(self.tmp.name, "cache", "sync.json"))
+        with open(os.path.join(self.dst, "b", "logo.png")) as f:
+            self.assertEqual(f.read(), "same bytes")
+
+    def test_link_flag_publishes_hardlinks(self):
+        old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.run_build(main.parse_args(["--link", "-q"]))
+        finally:
+            os.chdir(old_cwd)
+        self.assertEqual(os.stat(os.path.join(self.dst, "a", "logo.png")).st_nlink, 3)
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, ".cache", "objects")))
+        with patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+            main.parse_args(["--link", "--fingerprint"])
+
+
+class TestParallelCopy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.src, "images", "empty"))
+        with open(os.path.join(self.src, "index.css"), "w") as f:
+            f.write("body {}")
+        with open(os.path.join(self.src, "images", "a.png"), "wb") as f:
+            f.write(os.urandom(100_000))
+        open(os.path.join(self.src, "images", "blank.txt"), "w").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertSameFile(self, a, b):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            self.assertEqual(fa.read(), fb.read())
+
+    def test_parallel_copy_tree(self):
+        count, size = parallel_copy_tree(self.src, self.dst, workers=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(size, 100_007)
+        self.assertTrue(os.path.isdir(os.path.join(self.dst, "images", "empty")))
+        self.assertSameFile(os.path.join(self.src, "images", "a.png"), os.path.join(self.dst, "images", "a.png"))
+        self.assertSameFile(os.path.join(self.src, "images", "blank.txt"), os.path.join(self.dst, "images", "blank.txt"))
+
+    def test_parallel_copy_tree_raises_copy_errors(self):
+        with patch('src.static_files.copy_file', side_effect=PermissionError("denied")):
+            with self.assertRaises(PermissionError):
+                parallel_copy_tree(self.src, self.dst, workers=2)
+
+    @patch('src.static_files._reflink', return_value=False)
+    def test_copy_file_falls_back_when_kernel_copy_unsupported(self, mock_reflink):
+        src_path = os.path.join(self.src, "images", "a.png")
+        dst_path = os.path.join(self.tmp.name, "a.png")
+        with patch('src.static_files.os.copy_file_range', side_effect=OSError(errno.EXDEV, "cross-device"), create=True), \
+             patch('src.static_files.os.sendfile', side_effect=OSError(errno.EINVAL, "unsupported"), create=True), \
+             patch('src.static_files._no_copy_file_range', set()), \
+             patch('src.static_files._no_sendfile', set()):
+            self.assertEqual(copy_file(src_path, dst_path), 100_000)
+        self.assertSameFile(src_path, dst_path)
+
+    @patch('src.static_files._reflink', return_value=False)
+    def test_copy_file_raises_when_source_shrinks(self, mock_reflink):
+        src_path = os.path.join(self.src, "images", "a.png")
+        dst_path = os.path.join(self.tmp.name, "a.png")
+        sends = iter([40_000, 0])
+        with patch('src.static_files.os.copy_file_range', side_effect=lambda *args: next(sends), create=True), \
+             patch('src.static_files._no_copy_file_range', set()):
+            with self.assertRaises(OSError):
+                copy_file(src_path, dst_path)
+
+    @patch('src.static_files._reflink', return_value=False)
+    def test_copy_file_keeps_mode_bits(self, mock_reflink):
+        for name in ("a.png", "blank.txt"):
+            src_path = os.path.join(self.src, "images", name)
+            dst_path = os.path.join(self.tmp.name, name)
+            os.chmod(src_path, 0o755)
+            copy_file(src_path, dst_path)
+            self.assertEqual(stat.S_IMODE(os.stat(dst_path).st_mode), 0o755)
+
+    def test_copy_workers_flag_reaches_copy(self):
+        old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            with patch.object(main, 'copy_to_public') as mock_copy, contextlib.redirect_stdout(io.StringIO()):
+                main.run_build(main.parse_args(["--copy-workers", "3", "-q"]))
+        finally:
+            os.chdir(old_cwd)
+        self.assertEqual(mock_copy.call_args.kwargs["workers"], 3)
+        with patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+            main.parse_args(["--copy-workers", "0"])
+
+    def test_copy_pool_releases_slot_when_submit_fails(self):
+        pool = CopyPool(1)
+        pool.executor.shutdown()
+        for _ in range(4):
+            with self.assertRaises(RuntimeError):
+                pool.submit(print)
+        self.assertEqual(pool.slots._value, 4)
+
 if __name__ == '__main__':
     unittest.main()
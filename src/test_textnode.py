@@ -1,5 +1,6 @@
 import unittest
 
+import textnode
 from textnode import TextNode, TextType
 
 
@@ -76,10 +77,51 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.LINK, "https://google.com")
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
     def test_url_is_none(self):
         node = TextNode("This is a text node", TextType.PLAIN)
         self.assertIsNone(node.url)
 
+    def test_url_map_rewrites_links_and_images(self):
+        textnode.set_url_map({"/images/a.png": "/images/a.123.png"})
+        try:
+            image = TextNode("alt", TextType.IMAGE, "/images/a.png?v=2").to_html_node()
+            link = TextNode("a", TextType.LINK, "/images/a.png#top").to_html_node()
+            other = TextNode("b", TextType.LINK, "/about").to_html_node()
+        finally:
+            textnode.set_url_map(None)
+        self.assertEqual(image.props, {"src": "/images/a.123.png?v=2"})
+        self.assertEqual(link.props, {"href": "/images/a.123.png#top"})
+        self.assertEqual(other.props, {"href": "/about"})
+
+    def test_link_and_image_props_are_shared(self):
+        first = TextNode("a", TextType.LINK, "/about").to_html_node()
+        second = TextNode("b", TextType.LINK, "/about").to_html_node()
+        self.assertIs(first.props, second.props)
+        image = TextNode("alt", TextType.IMAGE, "/a.png").to_html_node()
+        self.assertIs(image.props, TextNode("other", TextType.IMAGE, "/a.png").to_html_node().props)
+        textnode.set_url_map({"/about": "/about.1.html"})
+        try:
+            self.assertEqual(TextNode("a", TextType.LINK, "/about").to_html_node().props, {"href": "/about.1.html"})
+        finally:
+            textnode.set_url_map(None)
+        self.assertEqual(TextNode("a", TextType.LINK, "/about").to_html_node().props, {"href": "/about"})
+
+    def test_image_sizes_add_dimensions_and_lazy_loading(self):
+        textnode.set_image_sizes({"/images/a.png": [640, 480]})
+        try:
+            known = TextNode("alt", TextType.IMAGE, "/images/a.png?v=2").to_html_node()
+            unknown = TextNode("alt", TextType.IMAGE, "https://example.com/b.png").to_html_node()
+        finally:
+            textnode.set_image_sizes(None)
+        self.assertEqual(known.props, {"src": "/images/a.png?v=2", "width": "640", "height": "480", "loading": "lazy", "decoding": "async"})
+        self.assertEqual(unknown.props, {"src": "https://example.com/b.png", "loading": "lazy", "decoding": "async"})
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+from htmlnode import SharedProps
 from leafnode import LeafNode
 from enum import Enum
 
@@ -8,8 +9,92 @@ class TextType(Enum):
     CODE = 4
     LINK = 5
     IMAGE = 6
-    
+
+# Maps site URLs to the URLs they are actually published under, e.g.
+# "/images/logo.png" -> "/images/logo.3f2a9c81d0e4.png" when assets are
+# fingerprinted.  Link and image URLs found in the map are rewritten as nodes
+# are converted to HTML; anything else passes through untouched.
+_url_map = None
+
+# Link and image props by URL.  Every node for the same URL shares one
+# SharedProps, which renders its attributes once.  Emptied whenever what
+# they are built from changes, and when they grow past PROPS_CACHE_SIZE.
+PROPS_CACHE_SIZE = 1 << 16
+_link_props: dict[str, SharedProps] = {}
+_image_props: dict[str, SharedProps] = {}
+
+def set_url_map(url_map: dict[str, str]):
+    global _url_map
+    _url_map = url_map or None
+    _link_props.clear()
+    _image_props.clear()
+
+def get_url_map() -> dict[str, str]:
+    return _url_map
+
+# Intrinsic image sizes by site URL, {url: [width, height]}.  While set,
+# generated <img> tags get width and height (when known) so the page doesn't
+# reflow as images arrive, and loading="lazy" and decoding="async" so
+# off-screen images don't hold up the page.
+_image_sizes = None
+
+def set_image_sizes(image_sizes: dict[str, list[int]]):
+    global _image_sizes
+    _image_sizes = image_sizes
+    _image_props.clear()
+
+def get_image_sizes() -> dict[str, list[int]]:
+    return _image_sizes
+
+# "/a.png?v=1#top" -> ("/a.png", "?v=1#top")
+def split_url_suffix(url: str) -> tuple[str, str]:
+    end = len(url)
+    for mark in "?#":
+        index = url.find(mark)
+        if index != -1 and index < end:
+            end = index
+    return url[:end], url[end:]
+
+def rewrite_url(url: str) -> str:
+    if _url_map is None or not url:
+        return url
+    path, suffix = split_url_suffix(url)
+    published = _url_map.get(path)
+    if published is None:
+        return url
+    return published + suffix
+
+def link_props(url: str) -> SharedProps:
+    props = _link_props.get(url)
+    if props is None:
+        if len(_link_props) >= PROPS_CACHE_SIZE:
+            _link_props.clear()
+        props = _link_props[url] = SharedProps(href=rewrite_url(url))
+    return props
+
+def image_props(url: str) -> SharedProps:
+    props = _image_props.get(url)
+    if props is None:
+        if len(_image_props) >= PROPS_CACHE_SIZE:
+            _image_props.clear()
+        props = _image_props[url] = SharedProps(build_image_props(url))
+    return props
+
+def build_image_props(url: str) -> dict[str, str]:
+    props = {"src": rewrite_url(url)}
+    if _image_sizes is None:
+        return props
+    size = _image_sizes.get(split_url_suffix(url)[0]) if url else None
+    if size is not None:
+        props["width"] = str(size[0])
+        props["height"] = str(size[1])
+    props["loading"] = "lazy"
+    props["decoding"] = "async"
+    return props
+
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str = None):
         self.text = text
         self.text_type = text_type
@@ -31,7 +116,7 @@ class TextNode:
         elif self.text_type == TextType.CODE:
             return LeafNode("code", self.text)
         elif self.text_type == TextType.LINK:
-            return LeafNode("a", self.text, {"href": self.url})
+            return LeafNode("a", self.text, link_props(self.url))
         elif self.text_type == TextType.IMAGE:
-            return LeafNode("img", "", {"src": self.url})
+            return LeafNode("img", "", image_props(self.url))
         raise ValueError(f"Invalid text type: {self.text_type}")
\ No newline at end of file